@@ -0,0 +1,186 @@
+# scripts/sweep.py
+# Hyperparameter sweep for TinyConvNet: grid or random search over lr,
+# weight_decay, batch_size and augmentation strength, trials run in parallel
+# processes with a capped torch thread count each. The decoded dataset cache
+# (dataset_cache.py) is memory-mapped by every trial, so the images sit in the
+# page cache once. Trials that fall below the median of the others at the same
+# epoch are stopped early. Decision thresholds are scored on every trial's
+# validation probabilities, they need no training of their own.
+#
+#   python sweep.py --lr 1e-3 3e-4 --weight_decay 1e-4 0 --batch_size 32 64 \
+#                   --aug_strength 0.5 1.0 --threads 1
+#   python sweep.py --search random --trials 12 --lr 1e-4 3e-3
+import argparse, csv, itertools, math, os, random, statistics, time
+import numpy as np
+from pathlib import Path
+import multiprocessing as mp
+from sklearn.metrics import precision_recall_fscore_support
+
+import torch
+import torch.nn as nn
+
+from model import TinyConvNet
+from dataset_cache import CHANNELS, CachedImageFolder, build_cache
+from batch_augment import BatchAugment
+from train import AUG, MEAN, STD, evaluate, make_batch_augment, seed_everything
+
+def scale_aug(aug, strength):
+    """AUG with all ranges scaled by strength (0 = no augmentation but flips)."""
+    out = dict(aug)
+    for k in ("brightness", "contrast", "saturation", "hue", "degrees", "rotation"):
+        if k in out:
+            out[k] = out[k] * strength
+    if "translate" in out:
+        out["translate"] = tuple(t * strength for t in out["translate"])
+    if "scale" in out:
+        lo, hi = out["scale"]
+        out["scale"] = (1 - (1 - lo) * strength, 1 + (hi - 1) * strength)
+    return out
+
+def make_trials(args):
+    space = {"lr": args.lr, "weight_decay": args.weight_decay,
+             "batch_size": args.batch_size, "aug_strength": args.aug_strength}
+    if args.search == "grid":
+        keys = list(space)
+        return [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+    rng = random.Random(args.seed)
+    def log_uniform(values):
+        lo, hi = min(values), max(values)
+        if lo <= 0 or lo == hi:
+            return rng.choice(values)
+        return math.exp(rng.uniform(math.log(lo), math.log(hi)))
+    return [{"lr": log_uniform(args.lr), "weight_decay": log_uniform(args.weight_decay),
+             "batch_size": rng.choice(args.batch_size), "aug_strength": rng.choice(args.aug_strength)}
+            for _ in range(args.trials)]
+
+def best_threshold(probs, y, thresholds):
+    best = (-1.0, None, 0.0, 0.0)
+    for t in thresholds:
+        p, r, f1, _ = precision_recall_fscore_support(y, (probs >= t).astype(np.int64),
+                                                      average="binary", zero_division=0)
+        if f1 > best[0]:
+            best = (f1, t, p, r)
+    return best
+
+def batches(ds, batch_size, shuffle):
+    # slice the memory map directly: no DataLoader worker processes per trial
+    n = len(ds)
+    order = torch.randperm(n).numpy() if shuffle else np.arange(n)
+    targets = torch.tensor(ds.targets)
+    for i in range(0, n, batch_size):
+        idx = np.sort(order[i:i + batch_size])      # sorted: sequential reads from the map
+        yield torch.from_numpy(ds.images[idx]), targets[idx]
+
+def should_prune(score, epoch, history, trial_id, grace):
+    """
+    Median stopping rule: prune once score (best f1 so far) is below the
+    median of the other trials' best f1 at the same epoch. Needs epoch >= grace
+    and at least two other trials that got this far. history: trial id ->
+    best f1 after each epoch (a dict or a Manager dict shared by the trials).
+    """
+    others = [h[epoch - 1] for t, h in history.items() if t != trial_id and len(h) >= epoch]
+    return epoch >= grace and len(others) >= 2 and score < statistics.median(others)
+
+def run_trial(trial_id, cfg, args, train_dir, val_dir, history):
+    torch.set_num_threads(args.threads)
+    seed_everything(args.seed)                      # same init for every trial: fair comparison
+    train_ds, val_ds = CachedImageFolder(train_dir), CachedImageFolder(val_dir)
+    augment = make_batch_augment(scale_aug(AUG, cfg["aug_strength"]))
+    to_input = BatchAugment(flip_p=0, mean=MEAN, std=STD)   # eval: only /255 + normalize
+
+    model = TinyConvNet()
+    num_healthy = sum(1 for t in train_ds.targets if t == 0)
+    pos_weight = torch.tensor([num_healthy / max(len(train_ds) - num_healthy, 1)])
+    criterion = nn.BCEWithLogitsLoss(pos_weight=pos_weight)
+    opt = torch.optim.Adam(model.parameters(), lr=cfg["lr"], weight_decay=cfg["weight_decay"])
+
+    best = {"f1": -1.0, "epoch": 0}
+    status, scores, start = "done", [], time.time()
+    for epoch in range(1, args.epochs + 1):
+        model.train()
+        for x, y in batches(train_ds, cfg["batch_size"], shuffle=True):
+            x = augment(x)
+            opt.zero_grad()
+            loss = criterion(model(x), y.float())
+            loss.backward()
+            opt.step()
+
+        val = [(to_input(x), y) for x, y in batches(val_ds, 256, shuffle=False)]
+        acc, _, _, _, _, probs, y = evaluate(model, val, "cpu", threshold=0.5)
+        f1, thr, p, r = best_threshold(probs, y, args.thresholds)
+        if f1 > best["f1"]:
+            best = {"f1": f1, "epoch": epoch, "threshold": thr, "precision": p, "recall": r, "acc": acc,
+                    "state_dict": {k: v.detach().clone() for k, v in model.state_dict().items()}}
+        scores.append(best["f1"])
+        history[trial_id] = scores                  # reassign: Manager dicts do not see in-place edits
+
+        if epoch - best["epoch"] >= args.patience:
+            status = "early_stop"
+            break
+        if should_prune(best["f1"], epoch, history, trial_id, args.grace):
+            status = "pruned"
+            break
+
+    ckpt = os.path.join(args.out, f"trial_{trial_id:03d}.pt")
+    torch.save({"state_dict": best.pop("state_dict"), "classes": train_ds.classes, "config": cfg,
+                "threshold": best.get("threshold")}, ckpt)
+    print(f"[trial {trial_id}] {status} after {epoch} epochs, f1={best['f1']:.3f} "
+          f"@{best.get('threshold')} {cfg}", flush=True)
+    return dict(trial=trial_id, **cfg, status=status, epochs=epoch, best_epoch=best["epoch"],
+                f1=round(best["f1"], 4), threshold=best.get("threshold"),
+                precision=round(best.get("precision", 0.0), 4), recall=round(best.get("recall", 0.0), 4),
+                acc=round(best.get("acc", 0.0), 4), seconds=round(time.time() - start, 1), checkpoint=ckpt)
+
+def main():
+    root = Path(__file__).resolve().parents[1]
+    ap = argparse.ArgumentParser(description="Parallel hyperparameter sweep for TinyConvNet.")
+    ap.add_argument("--data_root", default=str(root / "data"))
+    ap.add_argument("--cache_dir", default=str(root / "cache"))
+    ap.add_argument("--out", default=str(root / "weights" / f"sweep-{time.strftime('%Y%m%d-%H%M%S')}"))
+    ap.add_argument("--search", choices=["grid", "random"], default="grid")
+    ap.add_argument("--trials", type=int, default=16, help="random search: number of trials")
+    ap.add_argument("--lr", type=float, nargs="+", default=[1e-3, 3e-4])
+    ap.add_argument("--weight_decay", type=float, nargs="+", default=[1e-4, 0.0])
+    ap.add_argument("--batch_size", type=int, nargs="+", default=[32])
+    ap.add_argument("--aug_strength", type=float, nargs="+", default=[0.5, 1.0])
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.35, 0.4, 0.45, 0.5])
+    ap.add_argument("--epochs", type=int, default=50)
+    ap.add_argument("--patience", type=int, default=8)
+    ap.add_argument("--grace", type=int, default=5, help="epochs before a trial can be pruned")
+    ap.add_argument("--threads", type=int, default=1, help="torch threads per trial")
+    ap.add_argument("--workers", type=int, default=0, help="parallel trials (0 = cores / threads)")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    train_dir = build_cache(os.path.join(args.data_root, "train"), args.cache_dir, 128, CHANNELS)
+    val_dir = build_cache(os.path.join(args.data_root, "val"), args.cache_dir, 128, CHANNELS)
+    trials = make_trials(args)
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads)
+    print(f"[sweep] {len(trials)} trials, {workers} in parallel x {args.threads} threads -> {args.out}")
+
+    # spawn, not fork: a forked torch/OpenMP runtime can hang in the children
+    ctx = mp.get_context("spawn")
+    with ctx.Manager() as manager, ctx.Pool(min(workers, len(trials))) as pool:
+        history = manager.dict()
+        jobs = [pool.apply_async(run_trial, (i, cfg, args, train_dir, val_dir, history))
+                for i, cfg in enumerate(trials)]
+        results = [job.get() for job in jobs]
+
+    results.sort(key=lambda row: row["f1"], reverse=True)
+    table = os.path.join(args.out, "sweep_results.csv")
+    with open(table, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+    cols = ["trial", "lr", "weight_decay", "batch_size", "aug_strength", "status",
+            "epochs", "f1", "threshold", "precision", "recall"]
+    print("\n" + "  ".join(f"{c:>12}" for c in cols))
+    for row in results:
+        print("  ".join(f"{row[c]:>12.4g}" if isinstance(row[c], float) else f"{str(row[c]):>12}"
+                        for c in cols))
+    print(f"\nResults → {table}\nBest checkpoint → {results[0]['checkpoint']}")
+
+if __name__ == "__main__":
+    main()
@@ -11,32 +11,49 @@ from torch.utils.data import DataLoader, WeightedRandomSampler
 from torchvision import datasets, transforms
 
 from model import TinyConvNet  # ensure model.forward returns logits (no sigmoid)
+from dataset_cache import CachedImageFolder
+from batch_augment import BatchAugment
 
 def seed_everything(seed=42):
     random.seed(seed); np.random.seed(seed); torch.manual_seed(seed); torch.cuda.manual_seed_all(seed)
 
-def get_loaders(data_root, img_size=128, batch_size=32):
-    train_tfms = transforms.Compose([
-        transforms.Grayscale(num_output_channels=1),
-        transforms.Resize((img_size, img_size)),
-        transforms.RandomHorizontalFlip(p=0.5),
-        transforms.ColorJitter(brightness=0.1, contrast=0.1),
-        transforms.RandomAffine(degrees=5, translate=(0.02,0.02), scale=(0.95,1.05)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.5], std=[0.5])  # [-1,1]
-    ])
-    eval_tfms = transforms.Compose([
-        transforms.Grayscale(num_output_channels=1),
-        transforms.Resize((img_size, img_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.5], std=[0.5])
-    ])
+# training augmentation, used by the PIL transforms and by BatchAugment
+AUG = dict(flip_p=0.5, brightness=0.1, contrast=0.1,
+           degrees=5, translate=(0.02,0.02), scale=(0.95,1.05))
+MEAN, STD = [0.5], [0.5]  # [-1,1]
+
+def make_batch_augment(aug=AUG):
+    return BatchAugment(mean=MEAN, std=STD, **aug)
+
+def get_loaders(data_root, img_size=128, batch_size=32, cache_dir=None, batch_aug=False):
+    augment = [
+        transforms.RandomHorizontalFlip(p=AUG["flip_p"]),
+        transforms.ColorJitter(brightness=AUG["brightness"], contrast=AUG["contrast"]),
+        transforms.RandomAffine(degrees=AUG["degrees"], translate=AUG["translate"], scale=AUG["scale"]),
+    ]
+    normalize = transforms.Normalize(mean=MEAN, std=STD)
+    if batch_aug:
+        augment = None          # uint8 batches, make_batch_augment() runs in the training loop
 
     train_dir = os.path.join(data_root, "train")
     val_dir   = os.path.join(data_root, "val")
 
-    train_ds = datasets.ImageFolder(train_dir, transform=train_tfms)
-    val_ds   = datasets.ImageFolder(val_dir,   transform=eval_tfms)
+    if cache_dir:
+        # cached images are already grayscale, resized uint8 tensors (dataset_cache.py)
+        to_float = transforms.ConvertImageDtype(torch.float32)   # /255 like ToTensor
+        train_tfms = None if augment is None else transforms.Compose(augment + [to_float, normalize])
+        eval_tfms = transforms.Compose([to_float, normalize])
+        train_ds = CachedImageFolder.build(train_dir, cache_dir, img_size, channels=1, transform=train_tfms)
+        val_ds   = CachedImageFolder.build(val_dir,   cache_dir, img_size, channels=1, transform=eval_tfms)
+    else:
+        prep = [transforms.Grayscale(num_output_channels=1), transforms.Resize((img_size, img_size))]
+        if augment is None:
+            train_tfms = transforms.Compose(prep + [transforms.PILToTensor()])
+        else:
+            train_tfms = transforms.Compose(prep + augment + [transforms.ToTensor(), normalize])
+        eval_tfms = transforms.Compose(prep + [transforms.ToTensor(), normalize])
+        train_ds = datasets.ImageFolder(train_dir, transform=train_tfms)
+        val_ds   = datasets.ImageFolder(val_dir,   transform=eval_tfms)
 
     train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True, num_workers=2, pin_memory=True)
     val_loader   = DataLoader(val_ds,   batch_size=batch_size, shuffle=False, num_workers=2, pin_memory=True)
@@ -71,12 +88,20 @@ def main():
     ap.add_argument("--patience", type=int, default=8)
     ap.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
     ap.add_argument("--out", default=str(Path(__file__).resolve().parents[1] / "weights"))
+    ap.add_argument("--cache_dir", default=str(Path(__file__).resolve().parents[1] / "cache"),
+                    help="decoded image cache (dataset_cache.py)")
+    ap.add_argument("--no_cache", action="store_true", help="decode the JPEGs every epoch")
+    ap.add_argument("--aug", choices=["batch", "pil"], default="batch",
+                    help="augment whole batches (batch_augment.py) or each image in the workers")
     args = ap.parse_args()
 
     seed_everything(42)
     os.makedirs(args.out, exist_ok=True)
 
-    train_loader, val_loader, classes = get_loaders(args.data_root, img_size=128, batch_size=args.batch_size)
+    train_loader, val_loader, classes = get_loaders(args.data_root, img_size=128, batch_size=args.batch_size,
+                                                    cache_dir=None if args.no_cache else args.cache_dir,
+                                                    batch_aug=args.aug == "batch")
+    augment = make_batch_augment() if args.aug == "batch" else None
     assert set(classes) == {"healthy", "unhealthy"} or set(classes) == {"unhealthy","healthy"}, \
         f"Expected classes healthy/unhealthy, got {classes}"
 
@@ -103,6 +128,8 @@ def main():
         running = 0.0
         for x, y in tqdm(train_loader, desc=f"Epoch {epoch}/{args.epochs}"):
             x = x.to(device)
+            if augment is not None:
+                x = augment(x)               # per-sample flips/jitter/warps on the whole batch
             y = y.float().to(device)         # targets {0,1} as float for BCEWithLogitsLoss
             opt.zero_grad()
             logits = model(x)                 # (B,)
@@ -0,0 +1,145 @@
+# scripts/batch_augment.py
+# Training augmentation on whole [B,C,H,W] batches instead of per image on PIL
+# objects in the DataLoader workers. Same recipe as the torchvision transforms
+# in train.py, parameters drawn per sample:
+#   RandomHorizontalFlip -> ColorJitter -> RandomAffine -> RandomRotation
+# The affine and rotation are folded into one matrix per sample and applied
+# with a single grid_sample. Random numbers come from torch's global RNG (or
+# `generator`), so seed_everything() makes a run reproducible.
+import math
+import torch
+import torch.nn.functional as F
+
+def _grayscale(x):
+    # same weights as torchvision rgb_to_grayscale, keeps the channel dim
+    if x.shape[1] == 1:
+        return x
+    r, g, b = x.unbind(1)
+    return (0.2989 * r + 0.587 * g + 0.114 * b).unsqueeze(1)
+
+def _rgb_to_hsv(x):
+    r, g, b = x.unbind(1)
+    maxc = x.amax(1)                                 # amax/amin: much faster than max(1) with indices
+    cr = maxc - x.amin(1)
+    s = cr / torch.where(maxc == 0, torch.ones_like(maxc), maxc)
+    cr = torch.where(cr == 0, torch.ones_like(cr), cr)
+    # ties: r before g before b, like torchvision
+    h = torch.where(r == maxc, (g - b) / cr,
+                    torch.where(g == maxc, 2.0 + (b - r) / cr, 4.0 + (r - g) / cr))
+    return torch.stack((torch.remainder(h / 6.0, 1.0), s, maxc), 1)
+
+def _hsv_to_rgb(x):
+    # closed form per channel: c = v - v*s*clamp(min(k, 4 - k), 0, 1),
+    # k = (n + 6h) mod 6 with n = 5, 3, 1 for r, g, b
+    h, s, v = x.unsqueeze(2).unbind(1)
+    n = torch.tensor([5.0, 3.0, 1.0], device=x.device).view(1, 3, 1, 1)
+    k = torch.remainder(n + h * 6, 6)
+    return v - v * s * torch.minimum(k, 4 - k).clamp(0, 1)
+
+# ColorJitter adjustments with one factor per sample ([B,1,1,1], hue [B,1,1])
+def _brightness(x, f):
+    return (x * f).clamp(0, 1)
+
+def _contrast(x, f):
+    mean = _grayscale(x).mean((1, 2, 3), keepdim=True)
+    return ((x - mean) * f + mean).clamp(0, 1)
+
+def _saturation(x, f):
+    gray = _grayscale(x)
+    return ((x - gray) * f + gray).clamp(0, 1)
+
+def _hue(x, shift):
+    h, s, v = _rgb_to_hsv(x).unbind(1)
+    return _hsv_to_rgb(torch.stack((torch.remainder(h + shift, 1.0), s, v), 1))
+
+class BatchAugment:
+    """
+    Callable: uint8 or float [0,1] batch [B,C,H,W] -> augmented, normalized
+    float batch. Ranges follow the torchvision arguments of the same name.
+    """
+    def __init__(self, flip_p=0.5, brightness=0.0, contrast=0.0, saturation=0.0, hue=0.0,
+                 degrees=0.0, translate=(0.0, 0.0), scale=(1.0, 1.0), rotation=0.0,
+                 mean=None, std=None, mode="nearest", generator=None):
+        self.flip_p = flip_p
+        self.brightness, self.contrast = brightness, contrast
+        self.saturation, self.hue = saturation, hue
+        self.degrees, self.translate, self.scale, self.rotation = degrees, translate, scale, rotation
+        self.mean, self.std = mean, std
+        self.mode = mode                              # torchvision default: nearest, fill 0
+        self.generator = generator
+
+    def _uniform(self, n, lo, hi, device):
+        return torch.rand(n, generator=self.generator, device=device) * (hi - lo) + lo
+
+    def _factors(self, n, amount, device):
+        # ColorJitter draws factors from [1 - amount, 1 + amount]
+        return self._uniform(n, max(0.0, 1 - amount), 1 + amount, device).view(-1, 1, 1, 1)
+
+    def color_jitter(self, x):
+        n, c, device = x.shape[0], x.shape[1], x.device
+        ops = []
+        if self.brightness:
+            ops.append((_brightness, self._factors(n, self.brightness, device)))
+        if self.contrast:
+            ops.append((_contrast, self._factors(n, self.contrast, device)))
+        if self.saturation and c == 3:
+            ops.append((_saturation, self._factors(n, self.saturation, device)))
+        if self.hue and c == 3:
+            ops.append((_hue, self._uniform(n, -self.hue, self.hue, device).view(-1, 1, 1)))
+        if not ops:
+            return x
+        # ColorJitter applies its adjustments in random order, drawn per image:
+        # the argsort of random keys is one permutation per row. Step k runs
+        # each op on the images that have it in place k, so every image still
+        # goes through each op exactly once.
+        keys = torch.rand(n, len(ops), generator=self.generator, device=device)
+        order = keys.argsort(1)
+        x = x.clone()                                 # updated in place below
+        for k in range(len(ops)):
+            for j, (op, factor) in enumerate(ops):
+                idx = (order[:, k] == j).nonzero().squeeze(1)
+                if idx.numel():
+                    x.index_copy_(0, idx, op(x[idx], factor[idx]))
+        return x
+
+    def affine(self, x):
+        n, _, h, w = x.shape
+        device = x.device
+        if not (self.degrees or self.rotation or any(self.translate) or self.scale != (1.0, 1.0)):
+            return x
+        a1 = self._uniform(n, -self.degrees, self.degrees, device) * (math.pi / 180)
+        a2 = self._uniform(n, -self.rotation, self.rotation, device) * (math.pi / 180)
+        s = self._uniform(n, self.scale[0], self.scale[1], device)
+        tx = self._uniform(n, -self.translate[0], self.translate[0], device) * w
+        ty = self._uniform(n, -self.translate[1], self.translate[1], device) * h
+        # RandomRotation(a2) after RandomAffine(a1, t, s), both about the centre:
+        #   out = R(a2) (s R(a1) in + t) = s R(a1 + a2) in + R(a2) t
+        a = a1 + a2
+        cos2, sin2 = torch.cos(a2), torch.sin(a2)
+        t = torch.stack((cos2 * tx - sin2 * ty, sin2 * tx + cos2 * ty), 1)
+        # affine_grid wants the inverse (output -> input) in normalized coords
+        cos, sin = torch.cos(a) / s, torch.sin(a) / s
+        inv = torch.stack((torch.stack((cos, sin), 1), torch.stack((-sin, cos), 1)), 1)  # [B,2,2]
+        inv_t = -(inv @ t.unsqueeze(2)).squeeze(2)
+        theta = torch.cat((inv, inv_t.unsqueeze(2)), 2)
+        theta[:, 0, 1] *= h / w
+        theta[:, 1, 0] *= w / h
+        theta[:, 0, 2] /= w / 2
+        theta[:, 1, 2] /= h / 2
+        grid = F.affine_grid(theta, list(x.shape), align_corners=False)
+        return F.grid_sample(x, grid, mode=self.mode, padding_mode="zeros", align_corners=False)
+
+    def __call__(self, x):
+        if x.dtype == torch.uint8:
+            x = x.float().div_(255)                   # = ToTensor / ConvertImageDtype
+        n = x.shape[0]
+        if self.flip_p:
+            flip = (torch.rand(n, generator=self.generator, device=x.device) < self.flip_p)
+            x = torch.where(flip.view(-1, 1, 1, 1), x.flip(-1), x)
+        x = self.color_jitter(x)
+        x = self.affine(x)
+        if self.mean is not None:
+            mean = torch.tensor(self.mean, device=x.device).view(1, -1, 1, 1)
+            std = torch.tensor(self.std, device=x.device).view(1, -1, 1, 1)
+            x = (x - mean) / std
+        return x
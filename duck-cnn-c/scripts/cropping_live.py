@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os
+import sys
 import argparse
 from pathlib import Path
 
@@ -91,15 +92,67 @@ def load_roi_polygon(roi_json_path: Path):
 def ensure_dir(path: Path):
     path.mkdir(parents=True, exist_ok=True)
 
-def find_duck_bboxes(img_bgr, roi_poly=None, debug=False):
+def open_thermal_hints(name: str, debug: bool = False):
+    """
+    Attach to the region hints published by thermal_tracking.py --hints NAME.
+    Returns a HintSubscriber or None if the thermal process is not publishing.
+    """
+    thermal_dir = Path(__file__).resolve().parents[2] / "thermal"
+    if str(thermal_dir) not in sys.path:
+        sys.path.insert(0, str(thermal_dir))
+    from region_hints import HintSubscriber
+
+    try:
+        return HintSubscriber(name)
+    except FileNotFoundError:
+        if debug:
+            print(f"[DEBUG] No thermal hints published as '{name}' → full search.")
+        return None
+
+def hint_search_rects(hints, img_w, img_h, padding_factor=1.5):
+    """
+    Turn thermal hints (JPEG coordinates) into padded search rectangles
+    (x1, y1, x2, y2) clamped to the image. The thermal boxes are coarse,
+    so they are grown around their center by padding_factor.
+    """
+    rects = []
+    for hint in hints:
+        cx = (hint["x0"] + hint["x1"]) / 2.0
+        cy = (hint["y0"] + hint["y1"]) / 2.0
+        half_w = (hint["x1"] - hint["x0"]) * padding_factor / 2.0
+        half_h = (hint["y1"] - hint["y0"]) * padding_factor / 2.0
+        x1, y1 = max(0, int(cx - half_w)), max(0, int(cy - half_h))
+        x2, y2 = min(img_w, int(cx + half_w)), min(img_h, int(cy + half_h))
+        if x2 > x1 and y2 > y1:
+            rects.append((x1, y1, x2, y2))
+    return rects
+
+def find_duck_bboxes(img_bgr, roi_poly=None, debug=False, search_rects=None):
     """
     Find *all* duck-like bounding boxes for multiple colors.
-    Optionally restrict search to an ROI polygon.
+    Optionally restrict search to an ROI polygon and/or to search_rects
+    [(x1, y1, x2, y2), ...] (thermal hints). With search_rects only the
+    window around them is converted and thresholded.
     Returns a list of (x, y, w, h, color_name).
     """
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
     H_img, W_img = img_bgr.shape[:2]
 
+    # ----- search window (whole image unless thermal hints narrow it) -----
+    hint_mask = None
+    wx1, wy1, wx2, wy2 = 0, 0, W_img, H_img
+    if search_rects:
+        wx1 = min(r[0] for r in search_rects)
+        wy1 = min(r[1] for r in search_rects)
+        wx2 = max(r[2] for r in search_rects)
+        wy2 = max(r[3] for r in search_rects)
+        hint_mask = np.zeros((H_img, W_img), dtype=np.uint8)
+        for (x1, y1, x2, y2) in search_rects:
+            hint_mask[y1:y2, x1:x2] = 255
+        if debug:
+            print(f"[DEBUG] Thermal hints: searching {len(search_rects)} rect(s) "
+                  f"in window x={wx1}..{wx2}, y={wy1}..{wy2}")
+    hsv = cv2.cvtColor(img_bgr[wy1:wy2, wx1:wx2], cv2.COLOR_BGR2HSV)
+
     # --- your tuned color ranges here (use what you have working now) ---
     lower_pink   = np.array([150, 10, 190], dtype=np.uint8)
     upper_pink   = np.array([179, 255, 255], dtype=np.uint8)
@@ -173,10 +226,13 @@ def find_duck_bboxes(img_bgr, roi_poly=None, debug=False):
 
     all_bboxes = []
     for color_name, lo, hi in color_ranges:
-        mask = cv2.inRange(hsv, lo, hi)
+        mask = np.zeros((H_img, W_img), dtype=np.uint8)
+        mask[wy1:wy2, wx1:wx2] = cv2.inRange(hsv, lo, hi)
         # restrict to ROI if mask exists
         if roi_mask is not None:
             mask = cv2.bitwise_and(mask, roi_mask)
+        if hint_mask is not None:
+            mask = cv2.bitwise_and(mask, hint_mask)
         all_bboxes.extend(bboxes_from_mask(mask, color_name))
 
     if debug:
@@ -231,11 +287,15 @@ def center_crop_square(img_bgr):
     y2 = y1 + side
     return img_bgr[y1:y2, x1:x2]
 
-def process_image(src_path: Path, dst_path: Path, resize_to=None, debug=False, roi_root: Path | None = None):
+def process_image(src_path: Path, dst_path: Path, resize_to=None, debug=False, roi_root: Path | None = None,
+                  hints=None):
     """
     Load an image, find ALL duck bboxes in the (optional) ROI,
     crop each (with padding), optionally resize, and save multiple outputs.
 
+    If thermal hints (region_hints.HINT_DTYPE records, already checked for
+    camera and age) are given, only their areas are searched; the full ROI
+    only when there are no hints or nothing is found there.
     If no valid ducks found, fall back to single center-crop.
     If >4 ducks found, treat as faulty and fall back to center-crop.
     """
@@ -269,8 +329,18 @@ def process_image(src_path: Path, dst_path: Path, resize_to=None, debug=False, r
         if debug:
             print(f"[DEBUG] No roi_root provided; using FULL image for camera '{cam_name}'.")
 
-    # --- Find duck bounding boxes inside ROI (if any) ---
-    bboxes = find_duck_bboxes(img_bgr, roi_poly=roi_poly, debug=debug)
+    # --- Find duck bounding boxes inside ROI (if any), thermal hints first ---
+    bboxes = []
+    hint_rects = None
+    if hints is not None and len(hints):
+        H, W = img_bgr.shape[:2]
+        hint_rects = hint_search_rects(hints, W, H)
+    if hint_rects:
+        bboxes = find_duck_bboxes(img_bgr, roi_poly=roi_poly, debug=debug, search_rects=hint_rects)
+        if not bboxes and debug:
+            print("[DEBUG] Nothing found in thermal hints → searching full ROI.")
+    if not bboxes:
+        bboxes = find_duck_bboxes(img_bgr, roi_poly=roi_poly, debug=debug)
 
     # Discard if too many detections (treat as faulty)
     if len(bboxes) > 4:
@@ -323,11 +393,18 @@ def process_image(src_path: Path, dst_path: Path, resize_to=None, debug=False, r
 
 
 def copy_and_crop_dataset(src_root: Path, dst_root: Path,
-                          resize_to=None, debug=False, roi_root: Path | None = None):
+                          resize_to=None, debug=False, roi_root: Path | None = None,
+                          thermal_hints: str | None = None, hint_max_age=2.0):
     """
     Walk src_root, process all images, and mirror the directory structure
     into dst_root with cropped images.
+
+    If thermal_hints names a segment published by thermal_tracking.py,
+    the latest thermal regions narrow the duck search, but only for the
+    camera they are mapped to and only if the thermal frame was captured
+    within hint_max_age seconds of the image (file modification time).
     """
+    hint_sub = open_thermal_hints(thermal_hints, debug=debug) if thermal_hints else None
     src_root = src_root.resolve()
     dst_root = dst_root.resolve()
 
@@ -346,7 +423,22 @@ def copy_and_crop_dataset(src_root: Path, dst_root: Path,
                 continue
 
             dst_path = dst_root / rel_dir / fname
-            process_image(src_path, dst_path, resize_to=resize_to, debug=debug, roi_root=roi_root)
+
+            hints = None
+            if hint_sub is not None:
+                # same camera folder name as process_image uses for the ROI
+                latest = hint_sub.read(max_age=hint_max_age, camera=src_path.parents[1].name,
+                                       at=src_path.stat().st_mtime)
+                if latest is not None:
+                    hints = latest[1]
+                elif debug:
+                    print(f"[DEBUG] No thermal hints for {src_path} (other camera or too old).")
+
+            process_image(src_path, dst_path, resize_to=resize_to, debug=debug, roi_root=roi_root,
+                          hints=hints)
+
+    if hint_sub is not None:
+        hint_sub.close()
 
 
 def main():
@@ -384,6 +476,19 @@ def main():
     help="Directory containing ROI JSON files (roi_camX.json).",
     )
 
+    parser.add_argument(
+        "--thermal_hints",
+        type=str,
+        default=None,
+        help="Shared-memory name used by thermal_tracking.py --hints; search its regions first.",
+    )
+    parser.add_argument(
+        "--hint_max_age",
+        type=float,
+        default=2.0,
+        help="Ignore thermal hints captured more than this many seconds from the image.",
+    )
+
     args = parser.parse_args()
 
     roi_root_path = Path(args.roi_root).resolve() if args.roi_root else None
@@ -394,6 +499,8 @@ def main():
         resize_to=args.resize_to,
         debug=args.debug,
         roi_root=roi_root_path,
+        thermal_hints=args.thermal_hints,
+        hint_max_age=args.hint_max_age,
     )
 
 
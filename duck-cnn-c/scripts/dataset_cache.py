@@ -0,0 +1,155 @@
+# scripts/dataset_cache.py
+# Decode + resize an ImageFolder split once into a uint8 [N,C,H,W] .npy that
+# training memory-maps, instead of decoding every JPEG on every epoch.
+#
+#   cache/<split>_<size>px_<C>ch/images.npy   uint8 [N,C,size,size]
+#                               labels.npy   int64 [N]
+#                               index.json   classes + (path, label, sha1) per row
+#
+# The cache is valid while every (path, label, hash) row and the split root
+# match. Decoded images are reused by file content hash: a rebuild only
+# decodes new/changed images and copies the rest from the old cache, also
+# when files were renamed or moved between classes. Row order = ImageFolder order.
+import argparse, hashlib, json, os
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from torch.utils.data import Dataset
+from torchvision import datasets
+from torchvision.transforms import functional as TF
+
+CHANNELS = 3  # RGB, as train.py feeds the model
+VERSION = 1
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_image(path, img_size, channels):
+    img = datasets.folder.pil_loader(path)           # RGB, like ImageFolder
+    if channels == 1:
+        img = img.convert("L")                       # = transforms.Grayscale(1)
+    img = TF.resize(img, [img_size, img_size])       # = transforms.Resize((s, s))
+    arr = np.asarray(img, dtype=np.uint8)
+    return arr[None] if arr.ndim == 2 else arr.transpose(2, 0, 1)
+
+def cache_path(cache_dir, split_dir, img_size, channels):
+    return Path(cache_dir) / f"{Path(split_dir).name}_{img_size}px_{channels}ch"
+
+def build_cache(split_dir, cache_dir, img_size=128, channels=CHANNELS, workers=None):
+    """
+    Create or update the cache of one split (e.g. data/train).
+    Returns the cache folder.
+    """
+    out = cache_path(cache_dir, split_dir, img_size, channels)
+    folder = datasets.ImageFolder(split_dir)         # only lists files
+    samples = folder.samples
+    workers = workers or os.cpu_count() or 2
+    with ThreadPoolExecutor(workers) as pool:
+        hashes = list(pool.map(file_hash, [p for p, _ in samples]))
+    root = str(Path(split_dir).resolve())
+    rows = [[os.path.relpath(p, split_dir), lbl, h] for (p, lbl), h in zip(samples, hashes)]
+
+    old_rows, old_images = {}, None
+    index_path = out / "index.json"
+    if index_path.exists():
+        with open(index_path) as f:
+            old = json.load(f)
+        if old.get("version") == VERSION:
+            # a label swap between two identical files or a rename changes
+            # the rows, not the hashes: compare the paths too
+            if (old["samples"] == rows and old["classes"] == folder.classes
+                    and old.get("root") == root):
+                return out                           # nothing changed
+            old_images = np.load(out / "images.npy", mmap_mode="r")
+            old_rows = {h: i for i, (_, _, h) in enumerate(old["samples"])}
+
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = out / "images.tmp.npy"
+    images = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8,
+                                       shape=(len(samples), channels, img_size, img_size))
+    todo = []
+    for i, ((path, _), h) in enumerate(zip(samples, hashes)):
+        if h in old_rows:
+            images[i] = old_images[old_rows[h]]
+        else:
+            todo.append(i)
+
+    def decode(i):
+        images[i] = load_image(samples[i][0], img_size, channels)
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(decode, todo))                 # PIL decodes/resizes without the GIL
+    images.flush()
+    del images, old_images
+
+    os.replace(tmp, out / "images.npy")
+    np.save(out / "labels.npy", np.array([lbl for _, lbl in samples], dtype=np.int64))
+    index = {"version": VERSION, "classes": folder.classes, "img_size": img_size,
+             "channels": channels, "root": root, "samples": rows}
+    with open(out / "index.tmp.json", "w") as f:
+        json.dump(index, f)
+    os.replace(out / "index.tmp.json", index_path)   # written last: marks the cache valid
+    print(f"[cache] {out.name}: {len(samples)} images, {len(todo)} decoded, "
+          f"{len(samples) - len(todo)} reused")
+    return out
+
+class CachedImageFolder(Dataset):
+    """
+    ImageFolder over a cache folder. Items are (uint8 tensor [C,H,W], label);
+    the tensor is a view of the memory map (copy-on-write), so transforms see
+    tensors, not PIL images. Has classes / samples / targets like ImageFolder.
+    """
+    def __init__(self, cache_dir, transform=None):
+        self.cache_dir = Path(cache_dir)
+        self.transform = transform
+        with open(self.cache_dir / "index.json") as f:
+            index = json.load(f)
+        self.classes = index["classes"]
+        self.class_to_idx = {c: i for i, c in enumerate(self.classes)}
+        self.samples = [(os.path.join(index["root"], p), lbl) for p, lbl, _ in index["samples"]]
+        self.targets = [lbl for _, lbl in self.samples]
+        self._images = None                          # opened lazily, once per worker
+
+    @classmethod
+    def build(cls, split_dir, cache_dir, img_size=128, channels=CHANNELS, transform=None):
+        return cls(build_cache(split_dir, cache_dir, img_size, channels), transform)
+
+    @property
+    def images(self):
+        if self._images is None:
+            self._images = np.load(self.cache_dir / "images.npy", mmap_mode="c")
+        return self._images
+
+    def __getstate__(self):
+        # spawned DataLoader workers reopen the map instead of pickling the array
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, i):
+        x = torch.from_numpy(self.images[i])
+        if self.transform is not None:
+            x = self.transform(x)
+        return x, self.targets[i]
+
+def main():
+    ap = argparse.ArgumentParser(description="Build/update the preprocessed dataset cache.")
+    ap.add_argument("--data_root", default=str(Path(__file__).resolve().parents[1] / "data"))
+    ap.add_argument("--cache_dir", default=str(Path(__file__).resolve().parents[1] / "cache"))
+    ap.add_argument("--splits", nargs="+", default=["train", "val", "test"])
+    ap.add_argument("--img_size", type=int, default=128)
+    ap.add_argument("--channels", type=int, default=CHANNELS, choices=[1, 3])
+    args = ap.parse_args()
+
+    for split in args.splits:
+        split_dir = os.path.join(args.data_root, split)
+        if os.path.isdir(split_dir):
+            build_cache(split_dir, args.cache_dir, args.img_size, args.channels)
+
+if __name__ == "__main__":
+    main()
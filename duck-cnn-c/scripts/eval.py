@@ -1,57 +1,139 @@
 # scripts/eval.py
-import argparse, os
+# Runs a checkpoint over a split once and caches the per-image logits, labels
+# and paths under eval_cache/<checkpoint sha1>_<split>.npz. Later runs with the
+# same checkpoint contents and the same images (paths, sizes and mtimes, so an
+# image overwritten in place is noticed) answer from the cache: metrics at
+# any thresholds, best-F1 threshold, best recall at a precision target and
+# PR/ROC curves, without re-running the model.
+#
+#   python eval.py                                   # infer (or reuse cache), report
+#   python eval.py --thresholds 0.25 0.3 0.35 --min_precision 0.95 --curves out/duck
+import argparse, hashlib, os, time
 import numpy as np
-from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix, roc_auc_score
+from sklearn.metrics import (accuracy_score, precision_recall_fscore_support, confusion_matrix,
+                             roc_auc_score, precision_recall_curve, roc_curve)
 import torch
 from torch.utils.data import DataLoader
 from torchvision import datasets, transforms
 from model import TinyConvNet
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--data_root", default=os.path.join(os.path.dirname(__file__), "..", "data"))
-    ap.add_argument("--ckpt", default=os.path.join(os.path.dirname(__file__), "..", "weights", "tinyconvnet_best.pt"))
-    ap.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
-    args = ap.parse_args()
+PROD_THRESH = 0.3  # THRESH in run_pipeline.sh
 
-    ckpt = torch.load(args.ckpt, map_location="cpu")
-    classes = ckpt["classes"]
-    print("Class index mapping:", dict(enumerate(classes)))
+def file_stats(paths):
+    """[N, 2] int64 (size, mtime in ns) per file: cheap, no image is read."""
+    stats = [os.stat(p) for p in paths]
+    return np.array([(st.st_size, st.st_mtime_ns) for st in stats], dtype=np.int64).reshape(-1, 2)
 
-    tfms = transforms.Compose([
-        transforms.Resize((128,128)),
-        transforms.ToTensor(),
-        transforms.Normalize([0.5,0.5,0.5], [0.5,0.5,0.5])
-    ])
+def ckpt_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
 
-    ds = datasets.ImageFolder(os.path.join(args.data_root, "test"), transform=tfms)
+def infer(args, ds):
+    ckpt = torch.load(args.ckpt, map_location="cpu")
+    print("Class index mapping:", dict(enumerate(ckpt["classes"])))
     loader = DataLoader(ds, batch_size=32, shuffle=False)
 
     model = TinyConvNet().to(args.device)
     model.load_state_dict(ckpt["state_dict"])
     model.eval()
 
-    probs_all, y_all = [], []
+    logits_all, y_all = [], []
     with torch.no_grad():
         for x, y in loader:
             x = x.to(args.device)
-            logits = model(x)                     # forward returns raw logits
-            probs = torch.sigmoid(logits)         # convert logits → probabilities
-            probs_all.append(probs.cpu().numpy())
+            logits_all.append(model(x).cpu().numpy())   # forward returns raw logits
             y_all.append(y.numpy())
+    return np.concatenate(logits_all), np.concatenate(y_all), ckpt["classes"]
 
-    probs = np.concatenate(probs_all)
-    y = np.concatenate(y_all)
+def load_or_infer(args):
+    """Returns logits, labels, paths, classes and whether they came from the cache."""
+    tfms = transforms.Compose([
+        transforms.Resize((128,128)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.5,0.5,0.5], [0.5,0.5,0.5])
+    ])
+    split_dir = os.path.join(args.data_root, args.split)
+    ds = datasets.ImageFolder(split_dir, transform=tfms)   # lists the files, decodes lazily
+    paths = np.array([os.path.relpath(p, split_dir) for p, _ in ds.samples])
+    stats = file_stats([p for p, _ in ds.samples])
+
+    # the checkpoint is keyed by its content hash, the images by path, size and mtime
+    cache = os.path.join(args.cache_dir, f"{ckpt_hash(args.ckpt)}_{args.split}.npz")
+    if os.path.exists(cache) and not args.refresh:
+        z = np.load(cache)
+        if (np.array_equal(z["paths"], paths) and "stats" in z.files
+                and np.array_equal(z["stats"], stats)):
+            return z["logits"], z["labels"], paths, list(z["classes"]), True
+        print(f"[INFO] {args.split} images changed since {cache}, re-running inference")
+
+    logits, labels, classes = infer(args, ds)
+    os.makedirs(args.cache_dir, exist_ok=True)
+    np.savez(cache, logits=logits, labels=labels, paths=paths, stats=stats,
+             classes=np.array(classes))
+    print(f"[INFO] cached logits → {cache}")
+    return logits, labels, paths, classes, False
 
-    preds = (probs >= 0.5).astype(np.int64)
-    acc = accuracy_score(y, preds)
-    p, r, f1, _ = precision_recall_fscore_support(y, preds, average='binary', zero_division=0)
-    cm = confusion_matrix(y, preds)
+def report(probs, y, args):
+    name = args.split.upper()
     try:
         auc = roc_auc_score(y, probs)
     except Exception:
         auc = float("nan")
-    print(f"[TEST] acc={acc:.3f} p={p:.3f} r={r:.3f} f1={f1:.3f} auc={auc:.3f}\nConfusion:\n{cm}")
+    for t in args.thresholds:
+        preds = (probs >= t).astype(np.int64)
+        acc = accuracy_score(y, preds)
+        p, r, f1, _ = precision_recall_fscore_support(y, preds, average='binary', zero_division=0)
+        cm = confusion_matrix(y, preds, labels=[0, 1])
+        print(f"[{name}] thr={t:.3f} acc={acc:.3f} p={p:.3f} r={r:.3f} f1={f1:.3f} auc={auc:.3f}\nConfusion:\n{cm}")
+
+    # PR curve points: predict 1 when prob >= thr[i]; prec/rec have one extra end point
+    prec, rec, thr = precision_recall_curve(y, probs)
+    prec, rec = prec[:-1], rec[:-1]
+    f1 = 2 * prec * rec / np.maximum(prec + rec, 1e-12)
+    i = int(np.argmax(f1))
+    print(f"[{name}] best F1 threshold={thr[i]:.4f} f1={f1[i]:.3f} p={prec[i]:.3f} r={rec[i]:.3f}")
+
+    ok = np.flatnonzero(prec >= args.min_precision)
+    if ok.size:
+        # highest recall, then the highest threshold giving it
+        j = ok[np.lexsort((thr[ok], rec[ok]))[-1]]
+        print(f"[{name}] best recall at precision>={args.min_precision:.2f}: "
+              f"threshold={thr[j]:.4f} p={prec[j]:.3f} r={rec[j]:.3f}")
+    else:
+        print(f"[{name}] no threshold reaches precision {args.min_precision:.2f}")
+
+    if args.curves:
+        os.makedirs(os.path.dirname(os.path.abspath(args.curves)), exist_ok=True)
+        np.savetxt(f"{args.curves}_pr.csv", np.column_stack([thr, prec, rec, f1]),
+                   delimiter=",", header="threshold,precision,recall,f1", comments="", fmt="%.6f")
+        fpr, tpr, roc_thr = roc_curve(y, probs)
+        np.savetxt(f"{args.curves}_roc.csv", np.column_stack([roc_thr, fpr, tpr]),
+                   delimiter=",", header="threshold,fpr,tpr", comments="", fmt="%.6f")
+        print(f"Curves → {args.curves}_pr.csv, {args.curves}_roc.csv")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data_root", default=os.path.join(os.path.dirname(__file__), "..", "data"))
+    ap.add_argument("--ckpt", default=os.path.join(os.path.dirname(__file__), "..", "weights", "tinyconvnet_best.pt"))
+    ap.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    ap.add_argument("--split", default="test", help="data_root subfolder (test/val)")
+    ap.add_argument("--cache_dir", default=os.path.join(os.path.dirname(__file__), "..", "eval_cache"))
+    ap.add_argument("--refresh", action="store_true", help="re-run inference even if cached")
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.5, PROD_THRESH])
+    ap.add_argument("--min_precision", type=float, default=0.9,
+                    help="report the threshold with the best recall at this precision")
+    ap.add_argument("--curves", metavar="PREFIX", help="write PREFIX_pr.csv and PREFIX_roc.csv")
+    args = ap.parse_args()
+
+    logits, y, paths, classes, cached = load_or_infer(args)
+    start = time.perf_counter()
+    probs = 1 / (1 + np.exp(-logits.astype(np.float64)))   # sigmoid
+    report(probs, y, args)
+    print(f"[INFO] {len(y)} images{' (cached logits)' if cached else ''}, "
+          f"metrics took {(time.perf_counter() - start) * 1000:.1f} ms")
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,14 @@
 
 import subprocess
+import sys
 import time
-import RPi.GPIO as GPIO
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "weight"))
+from gpio_backend import get_backend  # RPi.GPIO, gpiod or simulator (HX711_GPIO)
+
+GPIO = get_backend()
+
 LED_PIN = 27
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(LED_PIN, GPIO.OUT)
@@ -17,6 +17,11 @@ PY_CNN_SCRIPT="$BASE_DIR/duck-cnn-c/scripts/infer_folder.py"
 CROPPING_SCRIPT="$BASE_DIR/duck-cnn-c/scripts/cropping_live.py"
 ROI_ROOT="$BASE_DIR/duck-cnn-c/roi"
 THRESH=0.3
+# shared-memory name the thermal tracker publishes its regions under;
+# cropping searches those areas first (empty = disabled). Opt-in: the
+# thermal -> JPEG mapping only fits HINTS_CAMERA, other cameras ignore them
+THERMAL_HINTS=""
+HINTS_CAMERA="cam1"
 
 # Activate virtual environment (venv must be inside this same folder)
 if [ -f "$BASE_DIR/venv/bin/activate" ]; then
@@ -44,8 +49,10 @@ echo "[INFO] main run dir: $MAIN_DIR"
 # start thermal_tracking.py in parallel and log to main folder
 cd "$THERMAL_DIR"
 THERM_LOG="$MAIN_DIR/thermal_log.txt"
+THERM_SUMMARY="$MAIN_DIR/thermal_summary.json"
 echo "[INFO] starting thermal_tracking.py -> $THERM_LOG"
-python3 "$THERMAL_SCRIPT" "$THERM_LOG" &
+python3 "$THERMAL_SCRIPT" "$THERM_LOG" --summary "$THERM_SUMMARY" \
+    ${THERMAL_HINTS:+--hints "$THERMAL_HINTS" --hints_camera "$HINTS_CAMERA"} &
 THERM_PID=$!
 echo "[INFO] thermal_tracking.py PID: $THERM_PID"
 cd "$BASE_DIR"
@@ -79,7 +86,8 @@ for cam in "${CAM_DEVS[@]}"; do
 				--src_root "$LIVE_DIR" \
 				--dst_root "$CROPPED_DIR" \
 				--resize_to 128 \
-				--roi_root "$ROI_ROOT"
+				--roi_root "$ROI_ROOT" \
+				${THERMAL_HINTS:+--thermal_hints "$THERMAL_HINTS"}
         else
             echo "[WARN] Cropping script not found at $CROPPING_SCRIPT; skipping cropping for $cam"
         fi
@@ -207,15 +215,19 @@ if ps -p "$THERM_PID" >/dev/null 2>&1; then
 fi
 
 # compute OR of results:
-#   - any Status:1 in thermal_log.txt
+#   - thermal alarm in thermal_summary.json (any Status:1 in thermal_log.txt as fallback)
 #   - any 'UNHEALTHY' in camera result.txt files
 overall="HEALTHY"
 
 NO_DUCK_COUNT=0
 TOTAL_CAMERAS=0
 
-# 1) thermal OR piece stays the same
-if [ -f "$THERM_LOG" ] && grep -q "Status:1" "$THERM_LOG"; then
+# 1) thermal OR piece: the tracker keeps a small summary, no need to scan the log
+if [ -f "$THERM_SUMMARY" ]; then
+    if grep -q '"alarm": true' "$THERM_SUMMARY"; then
+        overall="UNHEALTHY"
+    fi
+elif [ -f "$THERM_LOG" ] && grep -q "Status:1" "$THERM_LOG"; then
     overall="UNHEALTHY"
 fi
 
@@ -263,6 +275,9 @@ FINAL_FILE="$MAIN_DIR/final_results.txt"
 echo "FINAL_RESULT=$overall" > "$FINAL_FILE"
 echo "[INFO] wrote $FINAL_FILE (FINAL_RESULT=$overall)"
 
+# keep thermal summary and verdicts of this run in the telemetry tables
+python3 "$BASE_DIR/telemetry.py" import-run "$MAIN_DIR" || echo "[WARN] telemetry import failed"
+
 echo "[INFO] Cleaning up empty camera folders..."
 
 for cam_dir in "$MAIN_DIR"/cam*; do
@@ -0,0 +1,312 @@
+"""
+Sensor telemetry store: HX711 samples, weights, thermal run summaries and
+pipeline verdicts in date-partitioned Parquet files (polars).
+
+    telemetry/<table>/date=YYYY-MM-DD/part-<time>-<pid>-<n>.parquet   (UTC dates)
+
+Rows are buffered in memory and written in bulk (every `flush_rows` rows,
+`flush_interval` seconds or on close), so the SD card sees a few larger
+writes instead of one per sample. Queries scan only the partitions they need.
+
+    store = TelemetryStore()
+    store.append("weight", ts=time.time(), cell=0, weight=812.5)
+    store.close()
+    store.window("verdict", start=time.time() - 7 * 86400)
+
+Command line:
+
+    python3 telemetry.py import-run <run dir>   # after run_pipeline.sh
+    python3 telemetry.py summary [--days 30]
+    python3 telemetry.py compact                # merge small part files
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+import polars as pl
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry")
+
+SCHEMAS = {
+    # raw HX711 readings
+    "hx711": {"ts": pl.Float64, "cell": pl.Int32, "raw": pl.Int64},
+    # filtered weights, stderr/readings from HX711.get_weight_estimate()
+    "weight": {"ts": pl.Float64, "cell": pl.Int32, "weight": pl.Float64,
+               "stderr": pl.Float64, "readings": pl.Int32},
+    # one row per thermal sensor and run (thermal_summary.RunSummary.as_dict())
+    "thermal": {"ts": pl.Float64, "run_id": pl.Utf8, "sensor": pl.Utf8,
+                "alarm": pl.Boolean, "frames": pl.Int64, "alarm_frames": pl.Int64,
+                "time_in_alarm_s": pl.Float64, "max_region_temp": pl.Float64,
+                "max_thermistor": pl.Float64},
+    # one row per camera and run, plus camera "overall" for FINAL_RESULT
+    "verdict": {"ts": pl.Float64, "run_id": pl.Utf8, "camera": pl.Utf8,
+                "result": pl.Utf8, "unhealthy": pl.Int32, "healthy": pl.Int32},
+}
+
+
+def _date(ts):
+    """UTC date of ts, as used for the partitions."""
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+class TelemetryStore:
+    """
+    Buffered writer and reader of the telemetry tables.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, flush_rows=1000, flush_interval=30.0):
+        """
+        Args:
+            root(str): Optional, directory of the tables
+            flush_rows(int): Optional, buffered rows (all tables) that trigger a write
+            flush_interval(float): Optional, seconds after which buffered rows are written
+        """
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._buffers = {table: [] for table in SCHEMAS}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._parts = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check_table(self, table):
+        if table not in SCHEMAS:
+            raise ValueError("unknown table {!r}, expected one of {}".format(
+                table, ", ".join(SCHEMAS)))
+
+    def append(self, table, **row):
+        """Buffer one row; columns missing from row are null."""
+        self.append_rows(table, [row])
+
+    def append_rows(self, table, rows):
+        """
+        Buffer rows (dicts with the table's columns, "ts" required).
+
+        Raises:
+            ValueError: if table is unknown
+        """
+        self._check_table(table)
+        self._buffers[table].extend(rows)
+        self._buffered += len(rows)
+        if (self._buffered >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows, one file per table and date."""
+        for table, rows in self._buffers.items():
+            if rows:
+                self._write(table, pl.DataFrame(rows, schema=SCHEMAS[table]))
+                self._buffers[table] = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def _write(self, table, frame):
+        frame = frame.with_columns(
+            pl.from_epoch(pl.col("ts"), time_unit="s").dt.date().alias("_date"))
+        for (day,), part in frame.partition_by("_date", as_dict=True).items():
+            part_dir = os.path.join(self.root, table, "date={}".format(day))
+            os.makedirs(part_dir, exist_ok=True)
+            self._parts += 1
+            name = "part-{}-{}-{}.parquet".format(
+                time.strftime("%Y%m%d%H%M%S"), os.getpid(), self._parts)
+            path = os.path.join(part_dir, name)
+            # write aside and rename: readers never see half a file
+            part.drop("_date").write_parquet(path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+    def _files(self, table, start=None, end=None):
+        """Part files of table whose date partition overlaps [start, end]."""
+        files = []
+        first = _date(start) if start is not None else None
+        last = _date(end) if end is not None else None
+        for part_dir in sorted(glob.glob(os.path.join(self.root, table, "date=*"))):
+            day = part_dir.rsplit("=", 1)[1]
+            if (first and day < first) or (last and day > last):
+                continue
+            files.extend(sorted(glob.glob(os.path.join(part_dir, "*.parquet"))))
+        return files
+
+    def scan(self, table, start=None, end=None):
+        """
+        Lazy frame over a table, limited to the partitions of [start, end].
+        Buffered rows that were not flushed yet are not included.
+
+        Returns: pl.LazyFrame
+        """
+        self._check_table(table)
+        files = self._files(table, start, end)
+        if not files:
+            return pl.LazyFrame(schema=SCHEMAS[table])
+        frame = pl.scan_parquet(files)
+        if start is not None:
+            frame = frame.filter(pl.col("ts") >= start)
+        if end is not None:
+            frame = frame.filter(pl.col("ts") < end)
+        return frame
+
+    def window(self, table, start=None, end=None, **equals):
+        """
+        Rows of table with start <= ts < end and column == value for every
+        keyword, sorted by ts.
+
+        Returns: pl.DataFrame
+        """
+        frame = self.scan(table, start, end)
+        for column, value in equals.items():
+            frame = frame.filter(pl.col(column) == value)
+        return frame.sort("ts").collect()
+
+    def verdicts_with_thermal(self, start=None, end=None):
+        """
+        Per-camera verdicts joined with the thermal summary of the same run
+        (thermal columns aggregated over sensors).
+
+        Returns: pl.DataFrame
+        """
+        thermal = (self.scan("thermal", start, end)
+                   .group_by("run_id")
+                   .agg(pl.col("alarm").any().alias("thermal_alarm"),
+                        pl.col("time_in_alarm_s").max(),
+                        pl.col("max_region_temp").max(),
+                        pl.col("max_thermistor").max()))
+        return (self.scan("verdict", start, end)
+                .filter(pl.col("camera") != "overall")
+                .join(thermal, on="run_id", how="left")
+                .sort("ts", "camera")
+                .collect())
+
+    def compact(self, table):
+        """
+        Merge the part files of each date into one file. Run it while
+        nothing writes to the table.
+
+        Returns: int number of files removed
+        """
+        self._check_table(table)
+        removed = 0
+        for part_dir in glob.glob(os.path.join(self.root, table, "date=*")):
+            files = sorted(glob.glob(os.path.join(part_dir, "*.parquet")))
+            if len(files) < 2:
+                continue
+            merged = os.path.join(part_dir, "part-compacted-{}.parquet".format(int(time.time())))
+            pl.read_parquet(files).sort("ts").write_parquet(merged + ".tmp")
+            os.replace(merged + ".tmp", merged)
+            for path in files:
+                if path != merged:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+
+RESULT_RE = re.compile(r"predicted:\s*UNHEALTHY=(\d+),\s*HEALTHY=(\d+)")
+
+
+def run_rows(run_dir):
+    """
+    Telemetry rows of one run_pipeline.sh run folder (thermal_summary.json,
+    cam*/result.txt and final_results.txt).
+
+    Returns: {table: [rows]}
+    """
+    run_id = os.path.basename(os.path.normpath(run_dir))
+    try:
+        ts = datetime.strptime(run_id, "run-%Y%m%d-%H%M%S").timestamp()
+    except ValueError:
+        ts = os.path.getmtime(run_dir)
+    rows = {"thermal": [], "verdict": []}
+
+    summary_path = os.path.join(run_dir, "thermal_summary.json")
+    if os.path.exists(summary_path):
+        with open(summary_path) as f:
+            summary = json.load(f)
+        # thermal_service.py writes {"sensors": {name: summary}}, the tracker one summary
+        sensors = summary.get("sensors") or {"amg0": summary}
+        for name, sensor in sensors.items():
+            rows["thermal"].append({
+                "ts": ts, "run_id": run_id, "sensor": name,
+                "alarm": bool(sensor.get("alarm")),
+                "frames": sensor.get("frames"),
+                "alarm_frames": sensor.get("alarm_frames"),
+                "time_in_alarm_s": sensor.get("time_in_alarm_s"),
+                "max_region_temp": sensor.get("max_region_temp"),
+                "max_thermistor": sensor.get("max_thermistor"),
+            })
+
+    for result_path in sorted(glob.glob(os.path.join(run_dir, "cam*", "result.txt"))):
+        camera = os.path.basename(os.path.dirname(result_path))
+        with open(result_path, errors="replace") as f:
+            text = f.read()
+        counts = RESULT_RE.findall(text)
+        unhealthy = healthy = None
+        if "NO_DUCK_FOUND" in text:
+            result = "NO_DUCK_FOUND"
+        elif counts:
+            unhealthy, healthy = (int(n) for n in counts[-1])
+            result = "UNHEALTHY" if unhealthy >= healthy else "HEALTHY"
+        else:
+            result = "NO_RESULT"
+        rows["verdict"].append({"ts": ts, "run_id": run_id, "camera": camera,
+                                "result": result, "unhealthy": unhealthy,
+                                "healthy": healthy})
+
+    final_path = os.path.join(run_dir, "final_results.txt")
+    if os.path.exists(final_path):
+        with open(final_path) as f:
+            final = f.read().strip().split("=", 1)[-1]
+        rows["verdict"].append({"ts": ts, "run_id": run_id, "camera": "overall",
+                                "result": final, "unhealthy": None, "healthy": None})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensor telemetry store.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="telemetry directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import-run", help="store thermal summary and verdicts of a run folder")
+    imp.add_argument("run_dir")
+    summ = sub.add_parser("summary", help="daily verdicts and thermal alarms")
+    summ.add_argument("--days", type=float, default=30)
+    sub.add_parser("compact", help="merge part files per date")
+    args = parser.parse_args()
+
+    store = TelemetryStore(args.root)
+    if args.command == "import-run":
+        with store:
+            for table, rows in run_rows(args.run_dir).items():
+                store.append_rows(table, rows)
+        print(f"[INFO] telemetry: imported {args.run_dir}")
+    elif args.command == "summary":
+        start = (datetime.now() - timedelta(days=args.days)).timestamp()
+        day = pl.from_epoch(pl.col("ts"), time_unit="s").dt.date().alias("date")
+        verdicts = (store.scan("verdict", start)
+                    .filter(pl.col("camera") == "overall")
+                    .group_by(day, "result").len()
+                    .sort("date", "result").collect())
+        thermal = (store.scan("thermal", start)
+                   .group_by(day)
+                   .agg(pl.len().alias("runs"), pl.col("alarm").sum().alias("alarms"),
+                        pl.col("max_region_temp").max())
+                   .sort("date").collect())
+        print(verdicts)
+        print(thermal)
+    elif args.command == "compact":
+        for table in SCHEMAS:
+            print(f"{table}: removed {store.compact(table)} files")
+
+
+if __name__ == "__main__":
+    main()
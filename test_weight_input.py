@@ -1,5 +1,11 @@
-import RPi.GPIO as GPIO
+import sys
 import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "weight"))
+from gpio_backend import get_backend  # RPi.GPIO, gpiod or simulator (HX711_GPIO)
+
+GPIO = get_backend()
 
 # Use BCM pin numbering
 GPIO.setmode(GPIO.BCM)
@@ -0,0 +1,12 @@
+"""
+The scripts import their siblings by module name (weight/ and thermal/ are
+not packages), so put those folders on the path the same way the root
+scripts do.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for folder in (ROOT, ROOT / "weight", ROOT / "thermal", ROOT / "duck-cnn-c" / "scripts"):
+    if str(folder) not in sys.path:
+        sys.path.insert(0, str(folder))
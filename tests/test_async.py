@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from gpio_backend import SimulatedGPIO, SimulatedHX711
+from hx711 import HX711
+from hx711_async import AsyncHX711
+from thermal_async import thermal_frames
+from thermal_processing import ThermalProcessor
+from thermal_reader import SensorReader
+from thermal_replay import ReplaySensor, synthetic_frames
+
+
+def collect(reader, **kwargs):
+    async def run():
+        frames = []
+        with pytest.raises(EOFError):
+            async for frame in thermal_frames(reader, **kwargs):
+                frames.append(frame)
+        return frames
+    return asyncio.run(run())
+
+
+def test_thermal_frames_until_the_replay_ends():
+    frames = synthetic_frames(10)
+    reader = SensorReader(ReplaySensor(frames), rate_hz=200, maxsize=16)
+    reader.start()
+    got = collect(reader, timeout=2.0)
+    reader.join(1)
+    assert 1 <= len(got) <= 10
+    assert len(got) + reader.dropped == 10
+    assert all(thermistor == pytest.approx(22.0) for _, _, thermistor in got)
+    np.testing.assert_allclose(got[-1][1], frames['pixels'][-1])
+    assert reader._listeners == []
+
+
+def test_thermal_frames_through_a_processor():
+    reader = SensorReader(ReplaySensor(synthetic_frames(10)), rate_hz=200, maxsize=16)
+    reader.start()
+    got = collect(reader, processor=ThermalProcessor(18.0, 30.0, avg_frames=1), timeout=2.0)
+    reader.join(1)
+    assert got and all(result.pixels.shape == (8, 8) for _, result in got)
+    assert all(result.status == 1 for _, result in got)  # 34 C blob, hot above 30
+
+
+def test_thermal_frames_timeout():
+    class Stuck:
+        temperature = 22.0
+
+        @property
+        def pixels(self):
+            time.sleep(0.5)
+            return np.zeros((8, 8))
+
+    reader = SensorReader(Stuck())
+    reader.start()
+
+    async def first():
+        async for frame in thermal_frames(reader, timeout=0.05):
+            return frame
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(first())
+    reader.stop()
+    assert reader._listeners == []
+
+
+def make_hx(realtime=False):
+    chip = SimulatedHX711(load=2.0, noise=0.0, realtime=realtime)
+    hx = HX711(5, 6, gpio=SimulatedGPIO({5: (6, chip)}))
+    hx.set_offset(8000)
+    hx.set_scale_ratio(400.0)
+    return hx
+
+
+def test_async_weight_reads_the_chip():
+    async def run():
+        async with AsyncHX711(make_hx()) as scale:
+            return await scale.raw(5), await scale.data(5), await scale.weight(5)
+    assert asyncio.run(run()) == (8800, 800, 2.0)
+
+
+def test_async_weight_from_the_sampler():
+    hx = make_hx()
+    hx.start_sampling()
+    try:
+        hx.get_samples(timeout=1.0)
+
+        async def run():
+            async with AsyncHX711(hx) as scale:
+                return await scale.weight(5), await scale.weight_estimate(0.5)
+        weight, (estimate, _, count) = asyncio.run(run())
+    finally:
+        hx.stop_sampling()
+    assert weight == 2.0
+    assert estimate == 2.0 and count == 3
+
+
+def test_async_timeout_stops_between_samples():
+    hx = make_hx(realtime=True)  # 10 conversions per second
+
+    async def run():
+        async with AsyncHX711(hx) as scale:
+            with pytest.raises(asyncio.TimeoutError):
+                await scale.raw(30, timeout=0.15)
+            start = time.perf_counter()
+            await scale.raw(1)  # the executor was not stuck on 30 readings
+            return time.perf_counter() - start
+    assert asyncio.run(run()) < 0.5
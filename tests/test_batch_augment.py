@@ -0,0 +1,38 @@
+import pytest
+import torch
+
+pytest.importorskip("torchvision")
+from torchvision.transforms import functional as TF
+
+from batch_augment import BatchAugment
+
+
+def test_color_jitter_order_is_drawn_per_image():
+    n = 32
+    x = torch.rand(n, 3, 8, 8)
+    aug = BatchAugment(flip_p=0.0, brightness=0.4, contrast=0.4, saturation=0.4, hue=0.1,
+                       generator=torch.Generator().manual_seed(0))
+    out = aug.color_jitter(x)
+
+    # the same draws, in the order color_jitter makes them
+    g = torch.Generator().manual_seed(0)
+    factors = [torch.rand(n, generator=g) * 0.8 + 0.6 for _ in range(3)]
+    hue = torch.rand(n, generator=g) * 0.2 - 0.1
+    order = torch.rand(n, 4, generator=g).argsort(1)
+    assert len({tuple(row) for row in order.tolist()}) > 1
+
+    adjust = [lambda img, i: TF.adjust_brightness(img, factors[0][i].item()),
+              lambda img, i: TF.adjust_contrast(img, factors[1][i].item()),
+              lambda img, i: TF.adjust_saturation(img, factors[2][i].item()),
+              lambda img, i: TF.adjust_hue(img, hue[i].item())]
+    for i in range(n):
+        img = x[i]
+        for j in order[i].tolist():
+            img = adjust[j](img, i)
+        torch.testing.assert_close(out[i], img, atol=1e-5, rtol=0)
+
+
+def test_color_jitter_without_ops_is_identity():
+    x = torch.rand(4, 1, 8, 8)
+    aug = BatchAugment(saturation=0.5, hue=0.1)  # colour only, grayscale input
+    assert aug.color_jitter(x) is x
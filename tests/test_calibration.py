@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+import calibration
+
+
+def test_save_keeps_timestamps_of_unchanged_values(tmp_path, monkeypatch):
+    path = str(tmp_path / "cal.json")
+    assert calibration.load(path) is None
+    monkeypatch.setattr(calibration.time, "time", lambda: 100.0)
+    calibration.save(path, {"A128": {"offset": 8000, "scale_ratio": 400.0}}, temperature=20.0)
+    monkeypatch.setattr(calibration.time, "time", lambda: 200.0)
+    calibration.save(path, {"A128": {"offset": 8050, "scale_ratio": 400.0}}, temperature=25.0)
+    entry = calibration.load(path)["A128"]
+    assert entry == {"offset": 8050, "offset_ts": 200.0, "scale_ratio": 400.0,
+                     "scale_ratio_ts": 100.0, "temperature": 25.0}
+
+
+def test_unknown_channels_are_rejected(tmp_path):
+    path = str(tmp_path / "cal.json")
+    with pytest.raises(ValueError):
+        calibration.save(path, {"A32": {"offset": 1}})
+    (tmp_path / "cal.json").write_text(json.dumps(
+        {"version": calibration.VERSION, "channels": {"a128": {"offset": 1}}}))
+    with pytest.raises(ValueError):
+        calibration.load(path)
+
+
+def test_needs_tare():
+    entry = {"offset": 8000, "scale_ratio": 400.0, "temperature": 20.0}
+    assert calibration.needs_tare(entry, 8200, max_drift=1.0) == (False, 0.5)
+    assert calibration.needs_tare(entry, 8800, max_drift=1.0) == (True, 2.0)
+    assert calibration.needs_tare(entry, 8000, 1.0, temperature=30.0, max_temp_delta=5.0)[0]
+    assert calibration.needs_tare({}, 8000, 1.0)[0]
@@ -0,0 +1,65 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torchvision")
+from PIL import Image
+
+from dataset_cache import CachedImageFolder, build_cache
+
+
+def write_image(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(np.full((20, 20, 3), value, dtype=np.uint8)).save(path)
+
+
+@pytest.fixture
+def split(tmp_path):
+    root = tmp_path / "train"
+    write_image(root / "duck" / "a.png", 10)
+    write_image(root / "duck" / "b.png", 20)
+    write_image(root / "empty" / "c.png", 30)
+    return root
+
+
+def test_unchanged_split_is_not_rewritten(split, tmp_path):
+    out = build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    stamp = os.stat(out / "index.json").st_mtime_ns
+    assert build_cache(split, tmp_path / "cache", img_size=8, workers=1) == out
+    assert os.stat(out / "index.json").st_mtime_ns == stamp
+
+
+def test_moved_file_updates_paths_and_labels(split, tmp_path, capsys):
+    out = build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    # same content, other class: the hashes alone do not change
+    os.replace(split / "duck" / "b.png", split / "empty" / "b.png")
+    capsys.readouterr()
+    build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    assert "0 decoded, 3 reused" in capsys.readouterr().out
+
+    rows = json.loads((out / "index.json").read_text())["samples"]
+    assert [(p.replace(os.sep, "/"), lbl) for p, lbl, _ in rows] == \
+        [("duck/a.png", 0), ("empty/b.png", 1), ("empty/c.png", 1)]
+    data = CachedImageFolder(out)
+    assert data.targets == [0, 1, 1]
+    assert [int(data[i][0][0, 0, 0]) for i in range(3)] == [10, 20, 30]
+    assert all(os.path.exists(p) for p, _ in data.samples)
+
+
+def test_changed_image_is_decoded_again(split, tmp_path, capsys):
+    out = build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    write_image(split / "duck" / "a.png", 99)
+    capsys.readouterr()
+    build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    assert "1 decoded, 2 reused" in capsys.readouterr().out
+    assert int(CachedImageFolder(out)[0][0][0, 0, 0]) == 99
+
+
+def test_renamed_file_updates_the_index(split, tmp_path):
+    out = build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    # same labels and hashes in the same order, only the path differs
+    os.replace(split / "duck" / "b.png", split / "duck" / "b2.png")
+    build_cache(split, tmp_path / "cache", img_size=8, workers=1)
+    assert all(os.path.exists(p) for p, _ in CachedImageFolder(out).samples)
@@ -0,0 +1,57 @@
+import argparse
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("sklearn")
+from PIL import Image
+
+from model import TinyConvNet
+
+evaluation = importlib.import_module("eval")  # duck-cnn-c/scripts/eval.py
+
+
+def write_image(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(np.full((16, 16, 3), value, dtype=np.uint8)).save(path)
+
+
+@pytest.fixture
+def args(tmp_path):
+    for cls, value in (("healthy", 40), ("sick", 200)):
+        write_image(tmp_path / "data" / "test" / cls / "a.png", value)
+    torch.manual_seed(0)
+    ckpt = tmp_path / "model.pt"
+    torch.save({"state_dict": TinyConvNet().state_dict(), "classes": ["healthy", "sick"]}, ckpt)
+    return argparse.Namespace(data_root=str(tmp_path / "data"), split="test", ckpt=str(ckpt),
+                              cache_dir=str(tmp_path / "cache"), refresh=False, device="cpu")
+
+
+def test_second_run_answers_from_the_cache(args):
+    logits, labels, paths, classes, cached = evaluation.load_or_infer(args)
+    assert not cached and list(labels) == [0, 1]
+    again = evaluation.load_or_infer(args)
+    assert again[4]
+    np.testing.assert_array_equal(again[0], logits)
+
+
+def test_image_overwritten_in_place_runs_inference_again(args, tmp_path):
+    evaluation.load_or_infer(args)
+    image = tmp_path / "data" / "test" / "sick" / "a.png"
+    write_image(image, 90)  # same path, new content
+    st = os.stat(image)
+    os.utime(image, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not evaluation.load_or_infer(args)[4]
+    assert evaluation.load_or_infer(args)[4]
+
+
+def test_new_checkpoint_gets_its_own_cache(args):
+    evaluation.load_or_infer(args)
+    torch.manual_seed(1)
+    torch.save({"state_dict": TinyConvNet().state_dict(), "classes": ["healthy", "sick"]},
+               args.ckpt)
+    assert not evaluation.load_or_infer(args)[4]
+    assert len(os.listdir(args.cache_dir)) == 2
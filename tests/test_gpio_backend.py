@@ -0,0 +1,102 @@
+import enum
+import sys
+import time
+import types
+
+import pytest
+
+import gpio_backend
+from gpio_backend import GpiodGPIO, SimulatedGPIO, SimulatedHX711
+
+
+@pytest.fixture
+def fake_gpiod(monkeypatch):
+    """Just enough of the libgpiod 2 module to record the line settings."""
+    line = types.ModuleType("gpiod.line")
+    line.Bias = enum.Enum("Bias", "AS_IS DISABLED PULL_DOWN PULL_UP")
+    line.Direction = enum.Enum("Direction", "INPUT OUTPUT")
+    line.Edge = enum.Enum("Edge", "NONE RISING FALLING BOTH")
+    line.Value = enum.Enum("Value", "INACTIVE ACTIVE")
+    gpiod = types.ModuleType("gpiod")
+    gpiod.line = line
+    gpiod.LineSettings = lambda **settings: settings
+    gpiod.requested = []
+
+    class Request:
+        def __init__(self, chip, consumer, config):
+            gpiod.requested.append(config)
+
+        def release(self):
+            pass
+
+    gpiod.request_lines = Request
+    monkeypatch.setitem(sys.modules, "gpiod", gpiod)
+    monkeypatch.setitem(sys.modules, "gpiod.line", line)
+    return gpiod
+
+
+def test_gpiod_maps_pull_up_down_to_bias(fake_gpiod):
+    gpio = GpiodGPIO(chip="/dev/null")
+    gpio.setup(5, gpio.IN, pull_up_down=gpio.PUD_UP)
+    gpio.setup(6, gpio.OUT, pull_up_down=gpio.PUD_OFF)
+    gpio.setup(7, gpio.IN, pull_up_down=gpio.PUD_DOWN)
+    gpio.setup(8, gpio.IN)
+    bias = fake_gpiod.line.Bias
+    assert fake_gpiod.requested[0][5]["bias"] is bias.PULL_UP
+    assert fake_gpiod.requested[1][6]["bias"] is bias.DISABLED
+    assert fake_gpiod.requested[2][7]["bias"] is bias.PULL_DOWN
+    assert "bias" not in fake_gpiod.requested[3][8]  # left as it is
+
+
+def test_gpiod_rejects_unsupported_options(fake_gpiod):
+    gpio = GpiodGPIO(chip="/dev/null")
+    with pytest.raises(ValueError):
+        gpio.setup(5, gpio.IN, pull_up_down=99)
+    with pytest.raises(NotImplementedError):
+        gpio.setup(5, gpio.IN, bouncetime=10)
+    assert fake_gpiod.requested == []
+
+
+def test_simulator_clocks_out_every_chip():
+    chips = {5: (6, SimulatedHX711(load=1.0, noise=0.0, realtime=False)),
+             7: (6, SimulatedHX711(load=-1.0, noise=0.0, realtime=False))}
+    gpio = SimulatedGPIO(chips)
+    gpio.setup(6, gpio.OUT)
+    assert gpio.input(5) == 0 and gpio.input(7) == 0
+    values = gpio.clock_in(6, [5, 7, 9])  # nothing wired to 9
+    assert values == [8400, 7600, 0]
+
+
+def test_simulator_powers_down_when_the_clock_stays_high():
+    chip = SimulatedHX711(realtime=False)
+    gpio = SimulatedGPIO({5: (6, chip)})
+    gpio.setup(6, gpio.OUT)
+    gpio.output(6, True)
+    time.sleep(2 * gpio_backend.POWER_DOWN_S)
+    assert gpio.input(5) == 1
+    gpio.output(6, False)
+    assert chip.power_downs == 1
+
+
+def test_simulator_waits_for_the_conversion():
+    chip = SimulatedHX711(rate_hz=80, realtime=True)
+    gpio = SimulatedGPIO({5: (6, chip)})
+    gpio.setup(6, gpio.OUT)
+    gpio.clock_in(6, [5], bits=25)  # data plus one gain pulse: conversion starts
+    assert gpio.input(5) == 1
+    assert gpio.wait_for_edge(5, gpio.FALLING, timeout=1) is None
+    assert gpio.wait_for_edge(5, gpio.FALLING, timeout=100) == 5
+    assert gpio.input(5) == 0
+
+
+def test_simulated_backend_from_the_environment(monkeypatch):
+    monkeypatch.setattr(gpio_backend, "_backend", None)
+    monkeypatch.setenv("HX711_GPIO", "sim")
+    monkeypatch.setenv("HX711_SIM_PINS", "5:6,7:6")
+    backend = gpio_backend.get_backend()
+    assert isinstance(backend, SimulatedGPIO)
+    assert gpio_backend.get_backend("rpi") is backend  # process wide
+    assert backend.chip(7) is not backend.chip(5)
+    monkeypatch.setattr(gpio_backend, "_backend", None)
+    with pytest.raises(ValueError):
+        gpio_backend.get_backend("spi")
@@ -0,0 +1,107 @@
+import time
+from statistics import median
+
+import pytest
+
+from gpio_backend import SimulatedGPIO, SimulatedHX711
+from hx711 import HX711, _t_quantile
+
+
+def make_hx(load=2.0, noise=40.0):
+    gpio = SimulatedGPIO({5: (6, SimulatedHX711(load=load, noise=noise, realtime=False))})
+    return HX711(5, 6, gpio=gpio), gpio
+
+
+def test_sampling_fills_the_ring_buffer():
+    hx, _ = make_hx()
+    hx.start_sampling(buffer_size=16)
+    try:
+        assert hx.is_sampling()
+        deadline = time.time() + 2
+        while len(hx.get_samples()) < 16 and time.time() < deadline:
+            time.sleep(0.01)
+        samples = hx.get_samples()
+        assert len(samples) == 16  # oldest dropped
+        stamps = [ts for ts, _ in samples]
+        assert stamps == sorted(stamps)
+        assert len(hx.get_samples(count=4)) == 4
+        assert hx.get_samples(count=4)[-1][0] >= samples[-1][0]
+    finally:
+        hx.stop_sampling()
+    assert not hx.is_sampling()
+    with pytest.raises(RuntimeError):
+        hx.get_samples()
+
+
+def test_means_come_from_the_buffer_while_sampling():
+    hx, _ = make_hx(load=2.0)
+    raw = hx.get_raw_data_mean(30)
+    hx.start_sampling()
+    try:
+        hx.get_samples(timeout=1.0)
+        # 8000 + 2 * 400 counts, noise 40
+        assert abs(hx.get_raw_data_mean(30) - 8800) < 60
+        assert abs(raw - 8800) < 60
+    finally:
+        hx.stop_sampling()
+
+
+def test_max_age_drops_old_samples():
+    class FirstFive:
+        # keeps the first five samples, then the buffer stops growing
+        seen = 0
+
+        def update(self, sample):
+            self.seen += 1
+            return sample if self.seen <= 5 else None
+
+    hx, _ = make_hx()
+    hx.start_sampling(sample_filter=FirstFive())
+    try:
+        hx.get_samples(timeout=1.0)
+        time.sleep(0.05)
+        assert hx.get_samples(max_age=0.02) == []
+        assert len(hx.get_samples(max_age=10)) == 5
+    finally:
+        hx.stop_sampling()
+
+
+def test_channel_change_clears_the_buffer():
+    hx, gpio = make_hx(load=2.0, noise=0.0)
+    hx.start_sampling()
+    try:
+        hx.get_samples(timeout=1.0)
+        time.sleep(0.05)
+        assert median(data for _, data in hx.get_samples()) == 8800
+        hx.select_channel('B')
+        time.sleep(0.05)
+        # B is read at gain 32, a quarter of the A128 counts. The first
+        # sample may be an A reading the thread finished before the switch,
+        # and a thread switch while PD_SCK is high can power the chip down
+        # for a reading, hence the median.
+        values = [data for _, data in hx.get_samples()]
+        assert len(values) > 1 and median(values[1:]) == 2200
+    finally:
+        hx.stop_sampling()
+
+
+def test_start_sampling_rejects_empty_buffer():
+    hx, _ = make_hx()
+    with pytest.raises(ValueError):
+        hx.start_sampling(buffer_size=0)
+
+
+@pytest.mark.parametrize("df", [1, 2, 3, 4])
+def test_t_quantile_exact_for_small_df(df):
+    stats = pytest.importorskip("scipy.stats")
+    for z in (-3.0, -1.0, 0.5, 1.0, 2.0, 3.0, 3.5):
+        expected = stats.t.ppf(stats.norm.cdf(z), df)
+        assert _t_quantile(z, df) == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("df", [5, 6, 8, 12, 29, 100])
+def test_t_quantile_expansion_error(df):
+    stats = pytest.importorskip("scipy.stats")
+    for z, rel in ((1.0, 2e-4), (2.0, 2e-4), (3.0, 3e-3)):
+        expected = stats.t.ppf(stats.norm.cdf(z), df)
+        assert _t_quantile(z, df) == pytest.approx(expected, rel=rel)
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from gpio_backend import SimulatedGPIO, SimulatedHX711
+from hx711_multi import HX711Multi
+
+
+class SlowClockGPIO(SimulatedGPIO):
+    """Holds PD_SCK high for 100 us once armed, as a preempted reader would."""
+
+    slow = False
+
+    def output(self, pin, value):
+        super().output(pin, value)
+        if self.slow and value:
+            time.sleep(0.0001)
+
+
+class CountingGPIO(SimulatedGPIO):
+    edge_waits = 0
+    edge_error = None
+
+    def wait_for_edge(self, pin, edge, timeout=None):
+        self.edge_waits += 1
+        if self.edge_error:
+            raise self.edge_error
+        return super().wait_for_edge(pin, edge, timeout)
+
+
+def chips(loads, realtime=False, noise=40.0):
+    return {dout: (6, SimulatedHX711(load=load, noise=noise, realtime=realtime, seed=i))
+            for i, (dout, load) in enumerate(zip((5, 7, 8), loads))}
+
+
+def test_means_follow_each_cell():
+    multi = HX711Multi([5, 7], 6, gpio=SimulatedGPIO(chips([1.0, 3.0])))
+    assert len(multi) == 2
+    means = multi.get_raw_data_mean(30)
+    # offset 8000 + load * 400 counts, noise 40
+    assert means[0] == pytest.approx(8400, abs=40)
+    assert means[1] == pytest.approx(9200, abs=40)
+
+    assert multi.zero(30) is False
+    multi.set_scale_ratio(400.0)
+    multi._gpio.chip(5).set_load(2.0)
+    multi._gpio.chip(7).set_load(5.0)
+    weights = multi.get_weight_mean(30)
+    assert weights[0] == pytest.approx(1.0, abs=0.1)
+    assert weights[1] == pytest.approx(2.0, abs=0.1)
+
+
+def test_channel_b_reads_at_gain_32():
+    multi = HX711Multi([5, 7], 6, select_channel='B',
+                       gpio=SimulatedGPIO(chips([1.0, 3.0], noise=0.0)))
+    assert multi.get_raw_data_mean(5) == [2100, 2300]
+
+
+def test_slow_gain_pulse_invalidates_the_reading():
+    gpio = SlowClockGPIO(chips([1.0, 3.0], noise=0.0))
+    multi = HX711Multi([5, 7], 6, gpio=gpio)
+    gpio.slow = True
+    assert multi.read() == [False, False]
+    gpio.slow = False
+    assert multi.reset() is False  # power cycle, readings are valid again
+    assert gpio.chip(5).power_downs == 2
+    assert multi.read() == [8400, 9200]
+
+
+def test_waits_for_the_falling_edge():
+    gpio = CountingGPIO(chips([1.0, 3.0], realtime=True))
+    for dout in (5, 7):
+        gpio.chip(dout).rate_hz = 80
+    multi = HX711Multi([5, 7], 6, gpio=gpio)
+    multi.read()  # starts the next conversion, 12.5 ms away
+    gpio.edge_waits = 0
+    start = time.perf_counter()
+    data = multi.read()
+    assert all(d is not False for d in data)
+    assert gpio.edge_waits >= 1
+    assert time.perf_counter() - start < 0.1
+
+
+def test_falls_back_to_polling_without_edge_detection():
+    gpio = CountingGPIO(chips([1.0, 3.0], realtime=True))
+    multi = HX711Multi([5, 7], 6, gpio=gpio)
+    multi.read()
+    gpio.edge_error = RuntimeError('edge detection not supported')
+    data = multi.read()
+    assert all(d is not False for d in data)
+    assert multi._wait_for_edge is False
+
+
+def test_invalid_arguments():
+    gpio = SimulatedGPIO(chips([1.0]))
+    with pytest.raises(ValueError):
+        HX711Multi([], 6, gpio=gpio)
+    with pytest.raises(TypeError):
+        HX711Multi([5], '6', gpio=gpio)
+    multi = HX711Multi([5], 6, gpio=gpio)
+    with pytest.raises(ValueError):
+        multi.set_offset(0, cell=1)
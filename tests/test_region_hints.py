@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pytest
+
+import region_hints
+from region_hints import HintPublisher, HintSubscriber
+
+
+@pytest.fixture
+def name():
+    return "test_hints_{}".format(os.getpid())
+
+
+def dead_pid():
+    proc = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(0,))
+    proc.start()
+    proc.join()
+    return proc.pid
+
+
+def test_read_checks_camera_and_capture_time(name):
+    pub = HintPublisher(name, camera="cam2")
+    try:
+        sub = HintSubscriber(name)
+        assert sub.read() is None  # nothing published yet
+        now = time.time()
+        pub.publish(now, [(1, 10, 20, 50, 60, 33.5)])
+        ts, hints = sub.read(camera="cam2", max_age=2.0, at=now + 1.0)
+        assert ts == now
+        assert hints[0]['x1'] == 50 and hints[0]['temp'] == pytest.approx(33.5)
+        assert sub.read(camera="cam1") is None
+        assert sub.read(max_age=2.0, at=now + 5.0) is None
+        assert sub.read(max_age=2.0, at=now - 5.0) is None  # image from before the frame
+        sub.close()
+    finally:
+        pub.close()
+
+
+def test_live_segment_is_not_taken_over(name):
+    pub = HintPublisher(name)
+    try:
+        pub.publish(time.time(), [])
+        with pytest.raises(FileExistsError):
+            HintPublisher(name)
+    finally:
+        pub.close()
+
+
+@pytest.mark.parametrize("reason", ["dead writer", "no publish"])
+def test_stale_segment_is_taken_over(name, reason):
+    old = HintPublisher(name)
+    old.publish(time.time(), [(1, 0, 0, 1, 1, 30.0)])
+    if reason == "dead writer":
+        old._header['pid'] = dead_pid()
+    else:
+        old._header['ts'] = time.time() - region_hints.STALE_S - 1
+    old._shm.close()  # killed: the segment stays behind
+    new = HintPublisher(name, camera="cam3")
+    try:
+        sub = HintSubscriber(name)
+        assert sub.camera == "cam3"
+        assert sub.read() is None
+        sub.close()
+    finally:
+        new.close()
@@ -0,0 +1,87 @@
+import statistics
+
+import pytest
+
+from robust_filter import MAD_SCALE, HampelFilter, _synthetic_recording, hampel_filter
+
+
+def is_outlier(sample, others, n_sigmas=3.0, min_scale=1.0):
+    median = statistics.median(others)
+    mad = statistics.median(abs(x - median) for x in others)
+    return abs(sample - median) > n_sigmas * max(MAD_SCALE * mad, min_scale)
+
+
+def reference_list(data, window):
+    # every sample against its `window` nearest neighbours, itself left out
+    width = min(window, len(data) - 1)
+    kept = []
+    for i, sample in enumerate(data):
+        start = min(max(i - width // 2, 0), len(data) - width - 1)
+        others = [data[j] for j in range(start, start + width + 1) if j != i]
+        if not is_outlier(sample, others):
+            kept.append(sample)
+    return kept
+
+
+def reference_stream(data, window):
+    kept = []
+    for i, sample in enumerate(data):
+        past = data[max(0, i - window):i]
+        if len(past) < 3 or not is_outlier(sample, past):
+            kept.append(sample)
+    return kept
+
+
+@pytest.fixture(scope="module")
+def chunks():
+    data, _ = _synthetic_recording(count=600, seed=3)
+    return [data[i:i + 30] for i in range(0, len(data), 30)]
+
+
+@pytest.mark.parametrize("window", [3, 8, 15, 16, 40])
+def test_list_filter_matches_reference(chunks, window):
+    hampel = HampelFilter(window=window)
+    for chunk in chunks:
+        assert hampel(chunk) == reference_list(chunk, window)
+
+
+@pytest.mark.parametrize("window", [3, 8, 15, 16])
+def test_streaming_matches_reference(chunks, window):
+    data = [x for chunk in chunks for x in chunk]
+    hampel = HampelFilter(window=window)
+    kept = [x for x in map(hampel.update, data) if x is not None]
+    assert kept == reference_stream(data, window)
+
+
+def test_streaming_replace_returns_the_window_median():
+    hampel = HampelFilter(window=5, replace=True)
+    for sample in [10, 12, 11, 13, 12]:
+        hampel.update(sample)
+    assert hampel.update(5000) == 12
+    hampel.reset()
+    assert hampel.update(5000) == 5000  # fewer than 3 samples: nothing to judge by
+
+
+def test_hampel_filter_matches_reference(chunks):
+    for chunk in chunks:
+        expected = [x for x in chunk if not is_outlier(x, chunk)]
+        assert hampel_filter(chunk) == expected
+
+
+def test_failed_readings_are_dropped():
+    data = [100, False, 101, -1, 99, True, 100, 102]
+    assert hampel_filter(data) == [100, 101, 99, 100, 102]
+    assert HampelFilter()(data) == [100, 101, 99, 100, 102]
+
+
+def test_filters_pull_the_mean_towards_the_true_weight():
+    data, truth = _synthetic_recording(seed=1)
+    errors = {"raw": [], "hampel_filter": [], "HampelFilter": []}
+    for start in range(0, len(data), 30):
+        chunk, weight = data[start:start + 30], truth[start]
+        errors["raw"].append(abs(statistics.mean(chunk) - weight))
+        errors["hampel_filter"].append(abs(statistics.mean(hampel_filter(chunk)) - weight))
+        errors["HampelFilter"].append(abs(statistics.mean(HampelFilter()(chunk)) - weight))
+    assert max(errors["raw"]) > 1000  # spikes in the chunk
+    assert max(errors["hampel_filter"]) < 40  # noise is 40 counts per reading
+    assert max(errors["HampelFilter"]) < 40
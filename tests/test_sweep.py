@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("sklearn")
+from sweep import should_prune
+
+
+HISTORY = {0: [0.5, 0.6, 0.7], 1: [0.4, 0.5, 0.6], 2: [0.3, 0.4], 3: [0.2]}
+
+
+def test_prunes_below_the_median_of_the_others():
+    # epoch 2: the others are 0.6, 0.5 and 0.4, median 0.5
+    assert should_prune(0.45, 2, HISTORY, trial_id=9, grace=1)
+    assert not should_prune(0.5, 2, HISTORY, trial_id=9, grace=1)  # at the median: kept
+    assert not should_prune(0.55, 2, HISTORY, trial_id=9, grace=1)
+
+
+def test_only_trials_that_got_this_far_count():
+    # epoch 3: only trials 0 and 1 have three scores, median 0.65
+    assert should_prune(0.6, 3, HISTORY, trial_id=9, grace=1)
+    assert not should_prune(0.7, 3, HISTORY, trial_id=9, grace=1)
+
+
+def test_own_history_is_left_out():
+    # trial 1 against trials 0 and 2 only at epoch 2: median of 0.6 and 0.4
+    assert not should_prune(0.5, 2, HISTORY, trial_id=1, grace=1)
+    assert should_prune(0.49, 2, HISTORY, trial_id=1, grace=1)
+
+
+def test_needs_grace_and_two_other_trials():
+    assert not should_prune(0.0, 2, HISTORY, trial_id=9, grace=3)
+    assert not should_prune(0.0, 3, HISTORY, trial_id=0, grace=1)  # only trial 1 left
+    assert not should_prune(0.0, 1, {}, trial_id=0, grace=1)
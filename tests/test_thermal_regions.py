@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+import pytest
+
+from thermal_regions import COLD, HOT, NORMAL, background_median, find_regions, find_regions_batch
+
+
+def per_class_regions(frame, cold_thres, hot_thres, min_area=20):
+    """The per-frame code find_regions replaced: one labeling per class."""
+    median = background_median(frame)
+    masks = [
+        (HOT, frame > hot_thres),
+        (COLD, frame < cold_thres),
+        (NORMAL, (frame > cold_thres) & (frame < hot_thres) & (np.abs(frame - median) > 2.0)),
+    ]
+    regions = {}
+    for kind, mask in masks:
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+        regions[kind] = []
+        for x, y, w, h, area in stats[1:]:
+            if area < min_area:
+                continue
+            # cold regions used y + w // 2 here (see test_cold_temp_uses_box_center)
+            regions[kind].append((kind, x, y, w, h, float(frame[y + h // 2, x + w // 2])))
+
+    def overlaps(a, b):
+        return (min(a[1] + a[3], b[1] + b[3]) > max(a[1], b[1])
+                and min(a[2] + a[4], b[2] + b[4]) > max(a[2], b[2]))
+    alarm = regions[HOT] + regions[COLD]
+    normal = [n for n in regions[NORMAL] if not any(overlaps(n, a) for a in alarm)]
+    return alarm + normal
+
+
+def blob_frame(rng, size=48, blobs=6):
+    rows, cols = np.mgrid[0:size, 0:size]
+    frame = 24.0 + rng.normal(0, 0.2, (size, size))
+    for _ in range(blobs):
+        r, c = rng.uniform(0, size, 2)
+        peak = rng.choice([-12.0, 5.0, 12.0])
+        frame += peak * np.exp(-((rows - r) ** 2 + (cols - c) ** 2) / rng.uniform(4, 30))
+    return frame
+
+
+def as_tuples(regions):
+    return [(int(r['kind']), int(r['x']), int(r['y']), int(r['w']), int(r['h']), float(r['temp']))
+            for r in regions]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_per_class_labeling_including_order(seed):
+    frame = blob_frame(np.random.default_rng(seed))
+    assert as_tuples(find_regions(frame, 18.0, 30.0)) == per_class_regions(frame, 18.0, 30.0)
+
+
+def test_batch_equals_single_frames():
+    rng = np.random.default_rng(1)
+    frames = np.stack([blob_frame(rng) for _ in range(4)])
+    batch = find_regions_batch(frames, 18.0, 30.0)
+    for frame, regions in zip(frames, batch):
+        assert as_tuples(regions) == as_tuples(find_regions(frame, 18.0, 30.0))
+
+
+def test_cold_temp_uses_box_center():
+    # wide, flat cold region at the bottom: y + w // 2 is past the last row
+    frame = np.full((48, 48), 24.0)
+    frame[40:46, 2:42] = 10.0
+    frame[43, 22] = 9.0
+    (region,) = find_regions(frame, 18.0, 30.0)
+    assert region['kind'] == COLD
+    assert (region['x'], region['y'], region['w'], region['h']) == (2, 40, 40, 6)
+    assert region['temp'] == 9.0  # frame[y + h // 2, x + w // 2]
+    assert region['y'] + region['w'] // 2 >= frame.shape[0]
+
+
+def test_order_follows_first_pixel_not_box_corner():
+    # both hot regions start on row 10; the second one reaches further left
+    # below its first row, so its bounding box starts left of the first one
+    frame = np.full((48, 48), 24.0)
+    frame[10:16, 12:17] = 35.0  # first pixel (10, 12)
+    frame[10:18, 25:30] = 35.0  # U shape: first pixel (10, 25) ...
+    frame[18:20, 3:30] = 35.0
+    frame[12:20, 3:9] = 35.0    # ... but its box starts at x = 3
+    regions = find_regions(frame, 18.0, 30.0)
+    assert as_tuples(regions) == per_class_regions(frame, 18.0, 30.0)
+    assert regions['x'][0] > regions['x'][1]
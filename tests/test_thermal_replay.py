@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from thermal_replay import (FRAME_DTYPE, HEADER_SIZE, FrameRecorder, ReplaySensor,
+                            load_recording, synthetic_frames)
+
+
+def record(path, frames, **kwargs):
+    with FrameRecorder(str(path), **kwargs) as recorder:
+        for rec in frames:
+            recorder.write(rec['ts'], rec['thermistor'], rec['pixels'])
+
+
+def test_round_trip(tmp_path):
+    frames = synthetic_frames(25)
+    record(tmp_path / "rec.bin", frames, flush_every=7)
+    loaded = load_recording(str(tmp_path / "rec.bin"))
+    np.testing.assert_array_equal(loaded, frames)
+
+
+def test_replay_sensor_plays_recording(tmp_path):
+    frames = synthetic_frames(5)
+    record(tmp_path / "rec.bin", frames)
+    sensor = ReplaySensor.from_file(str(tmp_path / "rec.bin"))
+    for rec in frames:
+        np.testing.assert_array_equal(sensor.pixels, rec['pixels'])
+        assert sensor.timestamp == rec['ts']
+        assert sensor.temperature == pytest.approx(rec['thermistor'])
+    with pytest.raises(EOFError):
+        sensor.pixels
+
+
+def test_append_after_partial_record(tmp_path):
+    path = tmp_path / "rec.bin"
+    frames = synthetic_frames(6)
+    record(path, frames[:3])
+    with open(path, "ab") as f:
+        f.write(frames[3:4].tobytes()[:FRAME_DTYPE.itemsize // 2])  # killed mid-write
+    record(path, frames[3:])
+    assert path.stat().st_size == HEADER_SIZE + 6 * FRAME_DTYPE.itemsize
+    np.testing.assert_array_equal(load_recording(str(path)), frames)
+
+
+def test_refuses_foreign_file(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a thermal recording at all")
+    with pytest.raises(ValueError):
+        FrameRecorder(str(path))
+    assert path.read_bytes() == b"not a thermal recording at all"
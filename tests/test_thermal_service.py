@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import thermal_service
+from thermal_processing import ThermalProcessor
+from thermal_replay import ReplaySensor, synthetic_frames
+from thermal_service import MultiSensor
+
+CONFIG = Path(thermal_service.__file__).with_name("thermal_config.json")
+
+
+def sensors(count=3, frames=40):
+    return [ReplaySensor(synthetic_frames(frames, seed=i, hot_spots=((2, 3, 28.0 + 4 * i),)))
+            for i in range(count)]
+
+
+def test_batch_matches_one_processor_per_sensor():
+    multi = MultiSensor(sensors(), ["a", "b", "c"])
+    singles = [ThermalProcessor(18.0, 30.0) for _ in range(3)]
+    batch = ThermalProcessor(18.0, 30.0, sensors=3)
+    replays = sensors()
+    for _ in range(40):
+        _, frames, regions, status = batch.process(multi.pixels, multi.temperature)
+        for i, (proc, replay) in enumerate(zip(singles, replays)):
+            one = proc.process_one(replay.pixels, replay.temperature)
+            np.testing.assert_allclose(frames[i], one.frame)
+            np.testing.assert_array_equal(regions[i], one.regions)
+            assert status[i] == one.status
+
+
+def test_service_writes_a_section_per_sensor(tmp_path, monkeypatch):
+    summary = tmp_path / "summary.json"
+    log = tmp_path / "log.txt"
+    monkeypatch.setattr(sys, "argv", ["thermal_service.py", str(log), "--config", str(CONFIG),
+                                      "--summary", str(summary), "--synthetic", "30",
+                                      "--sensors", "2"])
+    thermal_service.main()  # synthetic frames run out: EOFError ends the loop
+    data = json.loads(summary.read_text())
+    assert set(data["sensors"]) == {"sim0", "sim1"}
+    assert all(s["frames"] == 30 for s in data["sensors"].values())
+    assert data["alarm"] == any(s["alarm"] for s in data["sensors"].values())
+    assert log.read_text().splitlines()[0].endswith(",sim0")
+
+
+def test_service_flushes_summary_on_sensor_error(tmp_path, monkeypatch):
+    class Failing:
+        def __init__(self):
+            self.reads = 0
+            self.temperature = 22.0
+
+        @property
+        def pixels(self):
+            self.reads += 1
+            if self.reads > 5:
+                raise OSError("I2C bus error")
+            return synthetic_frames(1)['pixels'][0]
+
+    monkeypatch.setattr(thermal_service, "open_amg88xx", lambda specs: [Failing()])
+    summary = tmp_path / "summary.json"
+    monkeypatch.setattr(sys, "argv", ["thermal_service.py", "--config", str(CONFIG),
+                                      "--summary", str(summary)])
+    with pytest.raises(OSError):
+        thermal_service.main()
+    data = json.loads(summary.read_text())
+    assert data["sensors"]["amg0"]["frames"] == 5
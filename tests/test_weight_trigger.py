@@ -0,0 +1,65 @@
+from weight_trigger import StepTrigger
+
+
+def feed(trigger, readings, proc_until=None, interval=0.2):
+    """
+    Feed (start, end, weight) spans to trigger like main() does, with a
+    pipeline run alive until proc_until. Returns the trigger times.
+    """
+    fired = []
+    for start, end, weight in readings:
+        for i in range(round((end - start) / interval)):
+            ts = round(start + i * interval, 6)
+            if proc_until is not None and ts <= proc_until:
+                trigger.busy_until(ts)
+            if trigger.update(ts, weight):
+                fired.append(ts)
+    return fired
+
+
+def test_bump_shorter_than_settle_is_ignored():
+    trigger = StepTrigger(100, settle_s=1.0)
+    assert feed(trigger, [(0, 2, 0), (2, 2.6, 500), (2.6, 5, 0)]) == []
+    assert trigger.state == "idle"
+
+
+def test_triggers_once_per_bird():
+    trigger = StepTrigger(100, settle_s=1.0, release_s=2.0, cooldown_s=0)
+    fired = feed(trigger, [(0, 1, 0), (1, 10, 500)])
+    assert fired == [2.0]
+    assert trigger.state == "occupied"
+    # leaves briefly and comes back: still the same bird
+    assert feed(trigger, [(10, 11, 0), (11, 13, 500)]) == []
+    assert feed(trigger, [(13, 16, 0)]) == []
+    assert trigger.state == "idle"
+    assert feed(trigger, [(16, 20, 500)]) == [17.0]
+
+
+def test_baseline_follows_drift_while_idle():
+    trigger = StepTrigger(100, baseline_alpha=0.1)
+    drift = [(t, t + 1, 10.0 * t) for t in range(12)]  # 110 after 11 s, slowly
+    assert feed(trigger, drift) == []
+    assert trigger.baseline > 90
+
+
+def test_bird_landing_during_a_run_fires_after_it():
+    trigger = StepTrigger(100, settle_s=1.0, release_s=1.0, cooldown_s=5.0)
+    assert feed(trigger, [(0, 3, 500)]) == [1.0]  # first bird starts the run
+    # the first bird leaves, a second lands at 10; the run lasts until 20
+    fired = feed(trigger, [(3, 10, 0), (10, 40, 500)], proc_until=20)
+    assert trigger.state == "occupied"
+    assert fired == [25.0]  # cooldown after the end of the run, not skipped
+
+
+def test_bird_settling_in_the_cooldown_fires_when_it_ends():
+    trigger = StepTrigger(100, settle_s=1.0, release_s=1.0, cooldown_s=10.0)
+    feed(trigger, [(0, 3, 500), (3, 6, 0)])  # run at 1, cooldown until 11
+    assert trigger.cooldown_until == 11.0
+    assert feed(trigger, [(6, 20, 500)]) == [11.0]
+
+
+def test_bird_leaving_in_the_cooldown_does_not_fire():
+    trigger = StepTrigger(100, settle_s=1.0, release_s=1.0, cooldown_s=10.0)
+    feed(trigger, [(0, 3, 500), (3, 6, 0)])
+    assert feed(trigger, [(6, 9, 500), (9, 20, 0)]) == []
+    assert trigger.state == "idle"
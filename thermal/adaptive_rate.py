@@ -0,0 +1,80 @@
+"""
+Adaptive sampling rate for the thermal loop.
+
+While the scene is quiet (small frame-to-frame change, nothing close to a
+threshold, no alarm) the sensor is polled at a low rate. Any activity
+switches to the full rate at once; going back down needs `calm_s` seconds
+of quiet, so the rate does not flap around a borderline reading.
+"""
+import numpy as np
+
+from thermal_reader import AMG88XX_RATE_HZ
+
+
+class AdaptiveRate:
+    """
+    Chooses the polling rate from the processed frames.
+    """
+
+    def __init__(self, cold_thres, hot_thres, low_hz=2.0, high_hz=AMG88XX_RATE_HZ,
+                 margin=2.0, change=2.0, calm_s=3.0):
+        """
+        Args:
+            cold_thres(float): cold threshold
+            hot_thres(float): hot threshold
+            low_hz(float): Optional, rate while quiet
+            high_hz(float): Optional, rate while active
+            margin(float): Optional, degrees from a threshold that count as near
+            change(float): Optional, largest per-pixel change between raw
+                frames still considered quiet
+            calm_s(float): Optional, quiet time before dropping to low_hz
+        """
+        self.cold_thres = cold_thres
+        self.hot_thres = hot_thres
+        self.low_hz = low_hz
+        self.high_hz = high_hz
+        self.margin = margin
+        self.change = change
+        self.calm_s = calm_s
+        self.rate = high_hz  # start fast until the scene is known to be quiet
+        self.reason = "start"
+        self._prev_raw = None
+        self._active_ts = None
+
+    def _activity(self, raw, pixels, status):
+        """Reason the frame counts as active, or None if it is quiet."""
+        if status:
+            return "alarm"
+        if (np.max(pixels) > self.hot_thres - self.margin
+                or np.min(pixels) < self.cold_thres + self.margin):
+            return "near threshold"
+        if self._prev_raw is not None and np.max(np.abs(raw - self._prev_raw)) > self.change:
+            return "change"
+        return None
+
+    def update(self, ts, raw, pixels, status):
+        """
+        Account for one frame.
+
+        Args:
+            ts(float): frame timestamp
+            raw(np.ndarray): raw 8x8 frame
+            pixels(np.ndarray): averaged, corrected 8x8 frame
+            status(int): frame status
+
+        Returns: float new rate in Hz if it changed, else None
+        """
+        reason = self._activity(raw, pixels, status)
+        self._prev_raw = np.array(raw, dtype=float)
+        if self._active_ts is None:
+            self._active_ts = ts
+
+        if reason:
+            self._active_ts = ts
+            if self.rate != self.high_hz:
+                self.rate, self.reason = self.high_hz, reason
+                return self.rate
+        elif self.rate != self.low_hz and ts - self._active_ts >= self.calm_s:
+            self.rate, self.reason = self.low_hz, "calm"
+            return self.rate
+        return None
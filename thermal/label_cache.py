@@ -0,0 +1,66 @@
+"""
+Cached text surfaces for the thermal display overlay.
+
+pygame.font.SysFont scans the system fonts on every call and font.render
+allocates a new surface, so both are done once per distinct label and the
+surfaces are reused from an LRU cache.
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+class LabelCache:
+    """
+    LRU cache of rendered text surfaces for one font.
+    """
+
+    def __init__(self, name="Arial", size=18, maxsize=256, antialias=True):
+        """
+        Args:
+            name(str): Optional, system font name
+            size(int): Optional, font size
+            maxsize(int): Optional, surfaces kept before the least recently
+                used one is evicted
+            antialias(bool): Optional, passed to font.render
+        """
+        self.font = pygame.font.SysFont(name, size)
+        self.maxsize = maxsize
+        self.antialias = antialias
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def text(self, label, color):
+        """
+        Return the surface for label rendered in color.
+
+        Args:
+            label(str): text to render
+            color(tuple): RGB color
+
+        Returns: pygame.Surface (shared, do not draw on it)
+        """
+        key = (label, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.font.render(label, self.antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.maxsize:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def temperature(self, temp, color, decimals=1):
+        """
+        Surface for a temperature label like "31.4°C". Temperatures are
+        quantized to the displayed precision, so equal labels share a surface.
+        """
+        return self.text(f"{temp:.{decimals}f}°C", color)
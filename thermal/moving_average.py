@@ -0,0 +1,123 @@
+"""
+Constant-time moving average for sensor samples.
+
+Works for whole frames (shape=(8, 8)) as well as scalar readings
+(shape=(), e.g. HX711 samples). Storage is allocated once up front.
+"""
+import numpy as np
+
+
+class MovingAverage:
+    """
+    Moving average over a fixed number of samples.
+
+    mode='window': mean of the last `size` samples, kept in a preallocated
+        ring buffer with a running sum (O(1) per sample).
+    mode='ema': exponential moving average, weight `alpha` for the newest
+        sample (defaults to 2 / (size + 1), the usual span equivalent).
+    """
+
+    def __init__(self, size=20, shape=(), mode='window', alpha=None):
+        """
+        Args:
+            size(int): window length in samples
+            shape(tuple): shape of one sample
+            mode(str): Optional, by default 'window'. Options ('window' || 'ema')
+            alpha(float): Optional EMA weight in (0, 1]
+
+        Raises:
+            ValueError: if size, mode or alpha are out of range
+        """
+        if size < 1:
+            raise ValueError('size must be >= 1. Received: {}'.format(size))
+        if mode not in ('window', 'ema'):
+            raise ValueError('mode has to be "window" or "ema". '
+                             'Received: {}'.format(mode))
+        self._span_alpha = alpha is None  # alpha follows size (see resize)
+        if alpha is None:
+            alpha = 2.0 / (size + 1)
+        if not 0 < alpha <= 1:
+            raise ValueError('alpha has to be in (0, 1]. '
+                             'Received: {}'.format(alpha))
+
+        self.size = int(size)
+        self.mode = mode
+        self.alpha = float(alpha)
+        self._shape = tuple(shape)
+        self._buf = np.zeros((self.size,) + self._shape) if mode == 'window' else None
+        self._sum = np.zeros(self._shape)
+        self._mean = np.zeros(self._shape)
+        self._idx = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def value(self):
+        """Current average (array reused between updates; copy to keep it)."""
+        return self._mean
+
+    def reset(self):
+        """Forget all samples."""
+        self._sum.fill(0)
+        self._mean.fill(0)
+        self._idx = 0
+        self._count = 0
+
+    def resize(self, size):
+        """
+        Change the window length, keeping the newest samples that still fit.
+        In 'ema' mode alpha follows the new size unless it was given.
+
+        Raises:
+            ValueError: if size is < 1
+        """
+        if size < 1:
+            raise ValueError('size must be >= 1. Received: {}'.format(size))
+        size = int(size)
+        keep = min(self._count, size)
+        if self.mode == 'ema':
+            if self._span_alpha:
+                self.alpha = 2.0 / (size + 1)
+        else:
+            # oldest to newest of the samples kept
+            newest = self._buf[(self._idx - keep + np.arange(keep)) % self.size]
+            self._buf = np.zeros((size,) + self._shape)
+            self._buf[:keep] = newest
+            self._idx = keep % size
+            np.sum(self._buf, axis=0, out=self._sum)
+            if keep:
+                np.divide(self._sum, keep, out=self._mean)
+        self.size = size
+        self._count = keep
+
+    def update(self, sample):
+        """
+        Add one sample and return the updated average.
+
+        Args:
+            sample(array-like): one reading of the configured shape
+
+        Returns: np.ndarray the current average (see `value`)
+        """
+        if self.mode == 'ema':
+            if self._count == 0:
+                self._mean[...] = sample
+            else:
+                self._mean += self.alpha * (np.asarray(sample) - self._mean)
+            self._count = min(self._count + 1, self.size)
+            return self._mean
+
+        slot = self._buf[self._idx, ...]
+        if self._count == self.size:
+            self._sum -= slot  # oldest sample leaves the window
+        slot[...] = sample
+        self._sum += slot
+        self._idx = (self._idx + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+        if self._idx == 0:
+            # resync once per lap so add/subtract rounding cannot drift
+            np.sum(self._buf, axis=0, out=self._sum)
+        np.divide(self._sum, self._count, out=self._mean)
+        return self._mean
@@ -0,0 +1,239 @@
+"""
+Latest thermal regions, in JPEG coordinates, shared with other processes.
+
+thermal_tracking.py publishes the mapped hot/cold/normal rectangles of every
+frame into a shared-memory segment; cropping_live.py reads the latest ones
+to narrow down where it looks for ducks. One writer, any number of readers,
+no locks: a sequence counter is odd while the writer is updating, and
+readers retry if it was odd or changed while they copied.
+
+The thermal -> JPEG mapping (map_regions_to_jpeg) is fitted to one camera's
+view, so the segment is tagged with that camera's name and the capture time
+of the thermal frame; readers pass their own camera and image capture time
+and get nothing back for another camera or a frame too far apart.
+
+A segment left behind by a killed tracker is taken over by the next one;
+one whose writer is still running and publishing is not.
+
+Segment layout: header (seq u8, ts f8, count u4, capacity u4, camera S16,
+pid u4) followed by `capacity` HINT_DTYPE records.
+"""
+import os
+import time
+
+import numpy as np
+from multiprocessing import shared_memory
+
+DEFAULT_NAME = "thermal_hints"
+DEFAULT_CAPACITY = 32
+DEFAULT_CAMERA = "cam1"  # run_pipeline.sh folder name of the camera the mapping fits
+STALE_S = 30.0  # a writer that published nothing for this long is hung or gone
+
+HEADER_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('ts', '<f8'),
+    ('count', '<u4'),
+    ('capacity', '<u4'),
+    ('camera', 'S16'),  # camera the regions are mapped to
+    ('pid', '<u4'),     # writer process
+])
+
+HINT_DTYPE = np.dtype([
+    ('kind', 'u1'),   # thermal_regions.HOT / COLD / NORMAL
+    ('x0', '<i4'),    # left
+    ('y0', '<i4'),    # top
+    ('x1', '<i4'),    # right
+    ('y1', '<i4'),    # bottom
+    ('temp', '<f4'),
+])
+
+
+def _attach(name):
+    """Attach to an existing segment without letting this process unlink it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: the resource tracker would unlink the writer's
+        # segment when this reader exits
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return pid > 0
+
+
+def _stale_owner(name):
+    """
+    Returns: None if the segment name can be taken over (its writer is
+        gone, or published nothing for STALE_S), else the writer's pid
+    """
+    shm = _attach(name)
+    try:
+        if shm.size < HEADER_DTYPE.itemsize:
+            return None  # older layout, from before this version
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        pid, ts = int(header['pid']), float(header['ts'])
+        del header
+    finally:
+        shm.close()
+    if _running(pid) and time.time() - ts <= STALE_S:
+        return pid
+    return None
+
+
+def _views(shm, capacity):
+    header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+    hints = np.ndarray((capacity,), dtype=HINT_DTYPE, buffer=shm.buf,
+                       offset=HEADER_DTYPE.itemsize)
+    return header, hints
+
+
+class HintPublisher:
+    """
+    Writer side, owned by the thermal process.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, capacity=DEFAULT_CAPACITY, camera=DEFAULT_CAMERA):
+        """
+        Args:
+            name(str): Optional, shared-memory segment name
+            capacity(int): Optional, maximum regions per frame
+            camera(str): Optional, camera whose JPEG coordinates the regions
+                are mapped to
+
+        Raises:
+            FileExistsError: if another running process publishes under name
+        """
+        size = HEADER_DTYPE.itemsize + capacity * HINT_DTYPE.itemsize
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            owner = _stale_owner(name)
+            if owner is not None:
+                raise FileExistsError('Thermal hints "{}" are published by running '
+                                      'process {}'.format(name, owner))
+            # left behind by a tracker that was killed; take it over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = name
+        self.capacity = capacity
+        self.camera = camera
+        self._header, self._hints = _views(self._shm, capacity)
+        self._header['capacity'] = capacity
+        self._header['camera'] = camera.encode()
+        self._header['pid'] = os.getpid()
+        self._header['ts'] = time.time()  # creation time until the first publish
+
+    def publish(self, ts, hints):
+        """
+        Replace the published regions.
+
+        Args:
+            ts(float): time.time() when the thermal frame was captured
+            hints(list): (kind, x0, y0, x1, y1, temp) tuples; extra entries
+                beyond capacity are dropped
+        """
+        hints = hints[:self.capacity]
+        self._header['seq'] += 1  # odd: update in progress
+        for i, hint in enumerate(hints):
+            self._hints[i] = hint
+        self._header['count'] = len(hints)
+        self._header['ts'] = ts
+        self._header['seq'] += 1
+
+    def close(self):
+        """Detach and remove the segment."""
+        if self._shm is None:
+            return
+        del self._header, self._hints
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+class HintSubscriber:
+    """
+    Reader side, e.g. cropping_live.py.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        """
+        Raises:
+            FileNotFoundError: if no thermal process is publishing under name
+        """
+        self._shm = _attach(name)
+        capacity = int(np.ndarray((), dtype=HEADER_DTYPE, buffer=self._shm.buf)['capacity'])
+        self._header, self._hints = _views(self._shm, capacity)
+
+    @property
+    def camera(self):
+        """Camera the published regions are mapped to."""
+        return self._header['camera'].item().decode()
+
+    def read(self, max_age=None, retries=100, camera=None, at=None):
+        """
+        Latest published regions.
+
+        Args:
+            max_age(float): Optional, return None if the regions were
+                captured more than this many seconds away from `at`
+            retries(int): Optional, attempts before giving up on a
+                consistent copy
+            camera(str): Optional, return None unless the regions are
+                mapped to this camera
+            at(float): Optional, time.time() to compare against, e.g. when
+                the image was captured, by default now
+
+        Returns: (ts, np.ndarray of HINT_DTYPE) or None if nothing usable
+        """
+        if camera is not None and camera != self.camera:
+            return None
+        for _ in range(retries):
+            seq = int(self._header['seq'])
+            if seq == 0:
+                return None  # nothing published yet
+            if seq % 2:
+                continue
+            ts = float(self._header['ts'])
+            count = int(self._header['count'])
+            hints = self._hints[:count].copy()
+            if int(self._header['seq']) == seq:
+                break
+        else:
+            return None
+
+        if at is None:
+            at = time.time()
+        if max_age is not None and abs(at - ts) > max_age:
+            return None
+        return ts, hints
+
+    def close(self):
+        del self._header, self._hints
+        self._shm.close()
+
+
+def read_hints(name=DEFAULT_NAME, max_age=None, camera=None, at=None):
+    """
+    One-shot read. Returns the same as HintSubscriber.read, or None when no
+    thermal process is publishing.
+    """
+    try:
+        sub = HintSubscriber(name)
+    except FileNotFoundError:
+        return None
+    try:
+        return sub.read(max_age=max_age, camera=camera, at=at)
+    finally:
+        sub.close()
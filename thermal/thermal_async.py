@@ -0,0 +1,62 @@
+"""
+asyncio adapter for SensorReader: frames as an async iterator, so the
+thermal stream can be awaited next to the scale (weight/hx711_async.py)
+and camera subprocesses in one event loop.
+
+    async for ts, raw, thermistor in thermal_frames(reader, timeout=2.0):
+        ...
+
+The reader thread wakes the loop through a listener; nothing blocks the
+loop and no thread per consumer is needed. Cancelling the consuming task
+or breaking out of the loop removes the listener once the generator is
+closed (contextlib.aclosing makes that immediate); the reader keeps running.
+"""
+import asyncio
+import queue
+
+
+async def thermal_frames(reader, processor=None, timeout=None):
+    """
+    Yield the newest frame of a started SensorReader whenever one arrives.
+    Frames that arrive while the consumer is busy are skipped and counted
+    in reader.dropped, like latest() does.
+
+    Args:
+        reader(SensorReader): started reader
+        processor(ThermalProcessor): Optional, yield processor.process_one()
+            results (ts, ThermalResult) instead of (ts, raw, thermistor)
+        timeout(float): Optional, seconds to wait for each frame
+
+    Raises:
+        asyncio.TimeoutError: if no frame arrived within timeout
+        Exception: whatever the sensor raised in the reader thread
+
+    Yields: (ts, raw, thermistor) or (ts, ThermalResult)
+    """
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:  # loop already closed
+            pass
+
+    reader.add_listener(wake)
+    try:
+        while True:
+            # clear before looking, so a frame queued meanwhile sets it again
+            event.clear()
+            try:
+                ts, raw, thermistor = reader.latest(timeout=0)
+            except queue.Empty:
+                if not reader.is_alive():
+                    return
+                await asyncio.wait_for(event.wait(), timeout)
+                continue
+            if processor is None:
+                yield ts, raw, thermistor
+            else:
+                yield ts, processor.process_one(raw, thermistor)
+    finally:
+        reader.remove_listener(wake)
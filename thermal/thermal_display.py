@@ -0,0 +1,101 @@
+"""
+pygame display for thermal_tracking.py: heat map, region boxes with
+temperatures and the ambient reading. pygame is only imported when a
+display is created, so headless runs do not need it.
+"""
+import numpy as np
+
+from thermal_processing import INTERP_RES
+from thermal_regions import HOT, COLD, NORMAL
+
+REGION_COLORS = {HOT: (255, 0, 0), COLD: (0, 0, 255), NORMAL: (255, 255, 255)}
+COLORDEPTH = 1024
+
+
+class ThermalDisplay:
+    """
+    Window showing the processed thermal frame.
+    """
+
+    def __init__(self, width=480, height=480, interp_res=INTERP_RES):
+        import pygame
+        from label_cache import LabelCache
+
+        self.pygame = pygame
+        self.interp_res = interp_res
+
+        #Create pygame display
+        pygame.init()
+        self.lcd = pygame.display.set_mode((width, height))
+        pygame.display.set_caption("AMG8833 Thermal Camera")
+        self.lcd.fill((0, 0, 0))
+
+        #Fonts are looked up once; rendered labels are reused between frames
+        self.region_labels = LabelCache("Arial", 18)
+        self.ambient_labels = LabelCache("Arial", 24, maxsize=64)
+
+        #Setup color coding
+        self.colors = []
+        for i in range(COLORDEPTH):
+            c = pygame.color.Color(0)
+            c.hsla = (int(240 - (240 * (i / COLORDEPTH))), 100, 50, 100)
+            self.colors.append(c)
+
+        self.pixel_w = width / interp_res[0]
+        self.pixel_h = height / interp_res[1]
+
+    def quit_requested(self):
+        """True if the window was closed."""
+        return any(event.type == self.pygame.QUIT
+                   for event in self.pygame.event.get())
+
+    def draw(self, frame, pixels, regions, thermistor):
+        """
+        Args:
+            frame(np.ndarray): upsampled frame (ThermalResult.frame)
+            pixels(np.ndarray): corrected 8x8 frame, sets the color range
+            regions(np.ndarray): thermal_regions.REGION_DTYPE records
+            thermistor(float): ambient reading
+        """
+        pygame = self.pygame
+        lcd = self.lcd
+        display_frame = np.flipud(np.rot90(frame, k=-1))
+
+        #Normaize temperatures
+        min_temp, max_temp = np.min(pixels), np.max(pixels)
+        norm_pixels = ((display_frame - min_temp) / (max_temp - min_temp)) * (COLORDEPTH - 1)
+        norm_pixels = np.clip(norm_pixels, 0, COLORDEPTH - 1).astype(int)
+
+        lcd.fill((0, 0, 0))
+
+        #Draw thermal image
+        for ix, row in enumerate(norm_pixels):
+            for jx, val in enumerate(row):
+                pygame.draw.rect(
+                    lcd, self.colors[val],
+                    (self.pixel_w * ix, self.pixel_h * jx,
+                     self.pixel_w, self.pixel_h)
+                )
+
+        #Draw hot, cold and normal squares
+        for kind, x, y, w, h, area, temp in regions.tolist():
+            color = REGION_COLORS[kind]
+
+            flipped_x = (self.interp_res[0] - (x + w)) * self.pixel_w
+            flipped_y = (self.interp_res[1] - (y + h)) * self.pixel_h
+
+            pygame.draw.rect(
+                lcd, color,
+                (flipped_x, flipped_y,
+                 w * self.pixel_w, h * self.pixel_h), 2)
+
+            text_surface = self.region_labels.temperature(temp, color)
+            lcd.blit(text_surface, (flipped_x, flipped_y - 20))
+
+        text = self.ambient_labels.text(f"Ambient: {thermistor:.2f}°C", (255, 255, 255))
+        lcd.blit(text, (10, 10))
+
+        pygame.display.update()
+
+    def close(self):
+        self.pygame.quit()
@@ -0,0 +1,90 @@
+"""
+Precomputed upsampling operator for AMG8833 frames.
+
+RectBivariateSpline(yy, xx, z, kx=2, ky=2) with s=0 is a tensor-product
+interpolating spline, so for a fixed grid it is linear in z and separable:
+
+    interp(z) == Ay @ z @ Ax.T
+
+Ay and Ax only depend on the grid and the spline degree, so they are built
+once here (numpy only, same knots FITPACK picks) and every frame costs two
+small matrix multiplies instead of a spline fit.
+"""
+import numpy as np
+
+
+def _interp_knots(x, k):
+    """
+    Knot vector FITPACK uses for an interpolating spline (s=0) of degree k
+    through the points x: boundary knots repeated k+1 times, interior knots
+    on the data points (odd k) or halfway between them (even k).
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if k % 2:
+        interior = x[k // 2 + 1:n - k // 2 - 1]
+    else:
+        interior = (x[k // 2:n - k // 2 - 1] + x[k // 2 + 1:n - k // 2]) / 2
+    return np.concatenate([np.repeat(x[0], k + 1), interior,
+                           np.repeat(x[-1], k + 1)])
+
+
+def _bspline_matrix(t, k, x):
+    """
+    Evaluate every B-spline basis function of degree k on knots t at the
+    points x (Cox-de Boor). Returns a (len(x), len(t)-k-1) matrix.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(t) - k - 1
+    rows = np.arange(len(x))
+
+    # degree 0: indicator of the knot span; the right end belongs to the last span
+    span = np.clip(np.searchsorted(t, x, side='right') - 1, k, n - 1)
+    basis = np.zeros((len(x), len(t) - 1))
+    basis[rows, span] = 1.0
+
+    for d in range(1, k + 1):
+        nxt = np.zeros((len(x), len(t) - 1 - d))
+        for i in range(len(t) - 1 - d):
+            left = t[i + d] - t[i]
+            right = t[i + d + 1] - t[i + 1]
+            if left > 0:
+                nxt[:, i] += (x - t[i]) / left * basis[:, i]
+            if right > 0:
+                nxt[:, i] += (t[i + d + 1] - x) / right * basis[:, i + 1]
+        basis = nxt
+    return basis
+
+
+def spline_matrix(x, x_new, k=2):
+    """
+    Dense operator A such that A @ y evaluates, at x_new, the degree-k
+    interpolating spline through the samples y taken at x.
+
+    Args:
+        x(array): increasing sample coordinates
+        x_new(array): coordinates to evaluate at (inside [x[0], x[-1]])
+        k(int): spline degree
+
+    Returns: np.ndarray of shape (len(x_new), len(x))
+    """
+    t = _interp_knots(x, k)
+    collocation = _bspline_matrix(t, k, x)
+    return _bspline_matrix(t, k, x_new) @ np.linalg.inv(collocation)
+
+
+class ThermalUpsampler:
+    """
+    Upsamples raw sensor frames onto the display grid.
+
+    Drop-in replacement for building a RectBivariateSpline every frame.
+    Accepts a single (rows, cols) frame or a batch shaped (..., rows, cols),
+    e.g. one frame per sensor or a recorded backlog.
+    """
+
+    def __init__(self, yy, xx, grid_y, grid_x, ky=2, kx=2):
+        self.Ay = spline_matrix(yy, grid_y, ky)
+        self.AxT = np.ascontiguousarray(spline_matrix(xx, grid_x, kx).T)
+
+    def __call__(self, frames):
+        return self.Ay @ np.asarray(frames, dtype=float) @ self.AxT
@@ -0,0 +1,229 @@
+"""
+Thermal frame processing, importable without a sensor or a display.
+
+    from thermal_processing import process_frame
+    result = process_frame(raw, thermistor, cold_thres=18.0, hot_thres=30.0)
+    result.regions, result.status
+
+Used by thermal_tracking.py (one sensor, with display) and
+thermal_service.py (several sensors, headless). Frames of all sensors are
+processed as one (n, 8, 8) batch: one moving average, one pair of
+upsampling matrix multiplies and one labeling pass.
+
+Needs numpy and OpenCV only; `python3 thermal_processing.py` runs a
+microbenchmark on synthetic frames.
+"""
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+from thermal_interp import ThermalUpsampler
+from moving_average import MovingAverage
+from thermal_regions import find_regions_batch, NORMAL
+from thermal_reader import AMG88XX_RATE_HZ
+
+PIX_RES = (8, 8)
+PIX_MULT = 6
+INTERP_RES = (PIX_RES[0] * PIX_MULT, PIX_RES[1] * PIX_MULT)
+
+AVG_FRAMES = 20  # at AMG88XX_RATE_HZ, i.e. a 2 s window (see ThermalProcessor.set_rate)
+SENSOR_GAIN = 1.12  # empirical correction of the AMG8833 against the thermistor
+SENSOR_OFFSET = 5.0
+AMBIENT_ALARM = 30.0  # thermistor reading that raises Status:1 by itself
+
+# result of processing one frame
+ThermalResult = namedtuple('ThermalResult', ['pixels', 'frame', 'regions', 'status'])
+
+
+def make_upsampler(pix_res=PIX_RES, pix_mult=PIX_MULT):
+    """Spline upsampler from the sensor grid to the display grid."""
+    xx = np.linspace(0, pix_res[0] - 1, pix_res[0])
+    yy = np.linspace(0, pix_res[1] - 1, pix_res[1])
+    grid_x = np.linspace(0, pix_res[0] - 1, pix_res[0] * pix_mult)
+    grid_y = np.linspace(0, pix_res[1] - 1, pix_res[1] * pix_mult)
+    return ThermalUpsampler(yy, xx, grid_y, grid_x, ky=2, kx=2)
+
+
+@functools.lru_cache(maxsize=None)
+def default_upsampler():
+    """Upsampler for the AMG8833 grid, built once per process."""
+    return make_upsampler()
+
+
+def correct_offset(pixels, thermistor):
+    """
+    Apply the sensor correction around the thermistor reading.
+    Works on one frame or a (n, 8, 8) batch with n thermistor readings.
+    """
+    t = np.asarray(thermistor, dtype=float)[..., np.newaxis, np.newaxis]
+    return (pixels - t) * SENSOR_GAIN + t + SENSOR_OFFSET
+
+
+def process_batch(pixels, thermistor, cold_thres, hot_thres, upsampler=None):
+    """
+    Process one frame of each of n sensors. Pure: no averaging or other
+    state is kept between calls.
+
+    Args:
+        pixels(array): (n, 8, 8) frames (raw or already averaged)
+        thermistor(array): (n,) thermistor readings
+        cold_thres(float): cold threshold
+        hot_thres(float): hot threshold
+        upsampler(ThermalUpsampler): Optional, by default default_upsampler()
+
+    Returns: (pixels, frames, regions, status)
+        pixels: (n, 8, 8) corrected frames
+        frames: (n, 48, 48) upsampled frames (rotated like the display)
+        regions: list of n thermal_regions.REGION_DTYPE arrays
+        status: (n,) int array, 1 for a dangerous reading
+    """
+    upsampler = upsampler or default_upsampler()
+    thermistor = np.asarray(thermistor, dtype=float).reshape(len(pixels))
+    pixels = correct_offset(pixels, thermistor)
+
+    frames = np.nan_to_num(upsampler(pixels), nan=0)
+    frames = np.rot90(frames, k=1, axes=(1, 2))
+
+    regions = find_regions_batch(frames, cold_thres, hot_thres)
+    status = np.array([int(np.any(r['kind'] != NORMAL)) for r in regions])
+    status[thermistor > AMBIENT_ALARM] = 1
+    return pixels, frames, regions, status
+
+
+def process_frame(raw, thermistor, cold_thres, hot_thres, upsampler=None):
+    """
+    Process a single frame. Pure function, see process_batch.
+
+    Args:
+        raw(array): 8x8 frame in degrees C (raw or already averaged)
+        thermistor(float): thermistor reading
+
+    Returns: ThermalResult(pixels, frame, regions, status)
+    """
+    pixels, frames, regions, status = process_batch(
+        np.asarray(raw, dtype=float)[np.newaxis], [thermistor],
+        cold_thres, hot_thres, upsampler)
+    return ThermalResult(pixels[0], frames[0], regions[0], int(status[0]))
+
+
+def map_thermal_to_jpeg(x, y, interp_res=(48,38),
+                        target_bl=(0,880), target_tr=(1080,0)):
+    """
+    Map a point of the (flipped) thermal grid to camera JPEG coordinates.
+    The top 10 thermal rows are outside the camera view.
+    """
+    y = y - 10
+    x_norm = x / (interp_res[0]-1)
+    y_norm = y / (interp_res[1]-1)
+
+    X_bl, Y_bl = target_bl
+    X_tr, Y_tr = target_tr
+
+    X_mapped = X_bl + x_norm * (X_tr - X_bl)
+    Y_mapped = Y_tr + y_norm * (Y_bl - Y_tr)
+
+    return int(round(X_mapped)), int(round(Y_mapped))
+
+
+def map_regions_to_jpeg(regions, interp_res=INTERP_RES):
+    """
+    Map regions into camera JPEG coordinates, skipping regions outside
+    the camera's vertical range.
+
+    Returns: list of (kind, x0, y0, x1, y1, temp), x0/y0 top-left
+    """
+    mapped = []
+    for kind, x, y, w, h, area, temp in regions.tolist():
+        x = interp_res[0] - (x + w)
+        y = interp_res[1] - (y + h)
+
+        if y < 10:
+            continue #Out of vertical range
+
+        bl = map_thermal_to_jpeg(x, y + h)
+        tr = map_thermal_to_jpeg(x + w, y)
+        mapped.append((kind, bl[0], tr[1], tr[0], bl[1], temp))
+    return mapped
+
+
+class ThermalProcessor:
+    """
+    Stateful (frame averaging) processing of n sensors in lockstep.
+    """
+
+    def __init__(self, cold_thres, hot_thres, sensors=1,
+                 avg_frames=AVG_FRAMES, avg_mode='window', rate_hz=AMG88XX_RATE_HZ):
+        """
+        Args:
+            cold_thres(float): cold threshold
+            hot_thres(float): hot threshold
+            sensors(int): Optional, number of sensors per batch
+            avg_frames(int): Optional, frames in the moving average
+            avg_mode(str): Optional, ('window' || 'ema'), see MovingAverage
+            rate_hz(float): Optional, frame rate avg_frames is meant for
+        """
+        self.cold_thres = cold_thres
+        self.hot_thres = hot_thres
+        self.sensors = sensors
+        self.upsampler = default_upsampler()
+        self.average = MovingAverage(avg_frames, shape=(sensors,) + PIX_RES[::-1],
+                                     mode=avg_mode)
+        self.avg_seconds = avg_frames / rate_hz
+
+    def set_rate(self, rate_hz):
+        """
+        Keep the average over the same time span when the frame rate changes,
+        e.g. 4 frames at 2 Hz instead of 20, so the first hot frames after a
+        quiet period are not averaged away.
+        """
+        self.average.resize(max(1, round(self.avg_seconds * rate_hz)))
+
+    def process(self, raw, thermistor):
+        """
+        Average in one reading of every sensor and process the result.
+
+        Args:
+            raw(array): (n, 8, 8) raw frames
+            thermistor(array): (n,) thermistor readings
+
+        Returns: same as process_batch
+        """
+        averaged = self.average.update(np.reshape(raw, self.average.value.shape))
+        return process_batch(averaged, thermistor, self.cold_thres,
+                             self.hot_thres, self.upsampler)
+
+    def process_one(self, raw, thermistor):
+        """
+        Single-sensor shortcut (sensors=1).
+
+        Returns: ThermalResult(pixels, frame, regions, status)
+        """
+        pixels, frames, regions, status = self.process(raw, [thermistor])
+        return ThermalResult(pixels[0], frames[0], regions[0], int(status[0]))
+
+
+def _benchmark(frames=500, sensors=(1, 4)):
+    import time
+    from thermal_replay import synthetic_frames
+
+    recs = synthetic_frames(frames)
+    start = time.perf_counter()
+    for rec in recs:
+        process_frame(rec['pixels'], rec['thermistor'], 18.0, 30.0)
+    took = time.perf_counter() - start
+    print(f"process_frame: {took / frames * 1e3:.3f} ms/frame")
+
+    for n in sensors:
+        proc = ThermalProcessor(18.0, 30.0, sensors=n)
+        raw = np.repeat(recs['pixels'][:, np.newaxis], n, axis=1)
+        therm = np.repeat(recs['thermistor'][:, np.newaxis], n, axis=1)
+        start = time.perf_counter()
+        for i in range(frames):
+            proc.process(raw[i], therm[i])
+        took = time.perf_counter() - start
+        print(f"ThermalProcessor x{n}: {took / frames * 1e3:.3f} ms/batch")
+
+
+if __name__ == "__main__":
+    _benchmark()
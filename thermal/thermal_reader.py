@@ -0,0 +1,141 @@
+"""
+Background sensor reader for the thermal loop.
+
+The reader thread polls the sensor on a fixed monotonic schedule, so the
+sampling rate does not depend on how long processing takes. Frames go into
+a small bounded queue; the consumer always takes the newest one and the
+stale frames it skips are counted in `dropped`. Listeners (add_listener)
+are called from the reader thread after every frame, e.g. to wake an
+asyncio loop (thermal_async.py) instead of blocking in latest().
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+
+AMG88XX_RATE_HZ = 10.0  # native frame rate of the AMG88xx
+
+
+class SensorReader(threading.Thread):
+    """
+    Thread that reads (ts, raw, thermistor) frames from an AMG88xx-like
+    sensor (anything with `pixels` and `temperature`).
+    """
+
+    def __init__(self, sensor, rate_hz=AMG88XX_RATE_HZ, maxsize=2):
+        """
+        Args:
+            sensor: object with `pixels` and `temperature` attributes
+            rate_hz(float): Optional, polling rate
+            maxsize(int): Optional, frames kept before the oldest is dropped
+        """
+        super().__init__(name='SensorReader', daemon=True)
+        self.sensor = sensor
+        self.period = 1.0 / rate_hz
+        self.dropped = 0  # frames never processed because a newer one existed
+        self._dropped_lock = threading.Lock()  # counted by both threads
+        self.overruns = 0  # schedule slots missed because a read was too slow
+        self.error = None
+        self._frames = queue.Queue(maxsize=maxsize)
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()  # cuts the wait short: set_rate() or stop()
+        self._listeners = []
+
+    def set_rate(self, rate_hz):
+        """
+        Change the polling rate. A pending wait is cut short: the next frame
+        is read one new period after the last one (at once if that passed).
+        """
+        self.period = 1.0 / rate_hz
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def add_listener(self, fn):
+        """
+        Call fn() from the reader thread whenever a frame (or the sensor
+        error) was queued, and once when the thread ends. fn must return
+        quickly and must not block.
+        """
+        self._listeners = self._listeners + [fn]
+
+    def remove_listener(self, fn):
+        self._listeners = [f for f in self._listeners if f is not fn]
+
+    def run(self):
+        next_t = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                raw = np.array(self.sensor.pixels)
+                thermistor = self.sensor.temperature
+            except Exception as e:  # surfaced to the consumer by latest()
+                self.error = e
+                self._put(None)
+                return
+            self._put((time.time(), raw, thermistor))
+
+            slot, next_t = next_t, next_t + self.period
+            delay = next_t - time.monotonic()
+            while delay > 0 and self._wake.wait(delay):
+                self._wake.clear()
+                if self._stop_event.is_set():
+                    break
+                # rate changed while waiting: reschedule from the last slot
+                next_t = max(slot + self.period, time.monotonic())
+                delay = next_t - time.monotonic()
+            if delay <= 0:
+                # fell behind: skip the missed slots instead of bursting
+                missed = int(-delay // self.period)
+                self.overruns += missed
+                next_t += missed * self.period
+        self._notify()  # stopped: wake listeners waiting for a frame
+
+    def _put(self, item):
+        while True:
+            try:
+                self._frames.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                    self._count_dropped()
+                except queue.Empty:
+                    pass
+        self._notify()
+
+    def _count_dropped(self):
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def _notify(self):
+        for fn in self._listeners:
+            fn()
+
+    def latest(self, timeout=None):
+        """
+        Wait for a frame and return the newest one, discarding older ones.
+
+        Args:
+            timeout(float): Optional, seconds to wait for a frame
+
+        Returns: (ts, raw, thermistor)
+
+        Raises:
+            queue.Empty: if no frame arrived within timeout
+            Exception: whatever the sensor raised in the reader thread
+        """
+        item = self._frames.get(timeout=timeout)
+        while True:
+            try:
+                newer = self._frames.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._count_dropped()
+            item = newer
+        if item is None:
+            raise self.error
+        return item
@@ -0,0 +1,169 @@
+"""
+Hot / cold / normal region detection on the upsampled thermal frame.
+
+All three classes are labeled with a single connectedComponentsWithStats
+call and returned as one structured array (REGION_DTYPE), ordered hot,
+cold, normal and within each kind in the order a per-class labeling finds
+them (first pixel in raster order), as the per-frame code did.
+Frames from several sensors can be labeled together (find_regions_batch).
+"""
+import numpy as np
+import cv2
+
+# region kinds (also the values of the class-label image)
+HOT = 1
+COLD = 2
+NORMAL = 3
+
+REGION_DTYPE = np.dtype([
+    ('kind', 'u1'),
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('w', 'i4'),
+    ('h', 'i4'),
+    ('area', 'i4'),
+    ('temp', 'f8'),
+])
+
+MIN_AREA = 20  # smaller blobs are noise
+NORMAL_DEVIATION = 2.0  # degrees from the background median to count as a body
+
+
+def background_median(frame):
+    """
+    Median of the corners, edge midpoints and center of the frame,
+    used as the background temperature.
+    """
+    h, w = frame.shape
+    ys = np.array([0, h // 2, h - 1])
+    xs = np.array([0, w // 2, w - 1])
+    return np.median(frame[np.ix_(ys, xs)])
+
+
+def classify(frame, cold_thres, hot_thres, median=None):
+    """
+    Build the class-label image: HOT above hot_thres, COLD below cold_thres,
+    NORMAL in between but more than NORMAL_DEVIATION from the background,
+    0 everywhere else.
+    """
+    if median is None:
+        median = background_median(frame)
+    classes = np.zeros(frame.shape, dtype=np.uint8)
+    classes[(frame > cold_thres) & (frame < hot_thres)
+            & (np.abs(frame - median) > NORMAL_DEVIATION)] = NORMAL
+    classes[frame > hot_thres] = HOT
+    classes[frame < cold_thres] = COLD
+    return classes
+
+
+def _covered(rects, shape):
+    """
+    Summed-area table of the pixels covered by any of the rectangles
+    (x, y, w, h columns), built without a per-rectangle loop.
+    """
+    h, w = shape
+    diff = np.zeros((h + 1, w + 1), dtype=np.int32)
+    x0, y0 = rects[:, 0], rects[:, 1]
+    x1, y1 = x0 + rects[:, 2], y0 + rects[:, 3]
+    np.add.at(diff, (y0, x0), 1)
+    np.add.at(diff, (y0, x1), -1)
+    np.add.at(diff, (y1, x0), -1)
+    np.add.at(diff, (y1, x1), 1)
+    mask = (diff.cumsum(0).cumsum(1)[:h, :w] > 0).astype(np.int32)
+
+    sat = np.zeros((h + 1, w + 1), dtype=np.int32)
+    sat[1:, 1:] = mask.cumsum(0).cumsum(1)
+    return sat
+
+
+def find_regions(frame, cold_thres, hot_thres, min_area=MIN_AREA):
+    """
+    Find hot, cold and normal regions in one labeling pass.
+
+    Normal regions whose bounding box overlaps any hot or cold bounding box
+    are dropped.
+
+    Args:
+        frame(np.ndarray): upsampled frame in degrees C
+        cold_thres(float): cold threshold
+        hot_thres(float): hot threshold
+        min_area(int): Optional, smallest region kept in pixels
+
+    Returns: np.ndarray of REGION_DTYPE ordered hot, cold, normal, then in
+        label (raster) order
+    """
+    return find_regions_batch(frame[np.newaxis], cold_thres, hot_thres, min_area)[0]
+
+
+def find_regions_batch(frames, cold_thres, hot_thres, min_area=MIN_AREA):
+    """
+    find_regions for several frames (e.g. one per sensor) with a single
+    labeling pass over all of them.
+
+    Args:
+        frames(np.ndarray): (n, h, w) upsampled frames in degrees C
+
+    Returns: list of n REGION_DTYPE arrays, one per frame
+    """
+    n, h, w = frames.shape
+
+    # one tile per (frame, class), one empty row/column apart, so components
+    # of different tiles can never touch and a single pass labels them all
+    pitch_y, pitch_x = h + 1, w + 1
+    canvas = np.zeros((n * pitch_y, 3 * pitch_x), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        classes = classify(frame, cold_thres, hot_thres)
+        row = i * pitch_y
+        for kind in (HOT, COLD, NORMAL):
+            col = (kind - 1) * pitch_x
+            canvas[row:row + h, col:col + w] = classes == kind
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(canvas, connectivity=8)
+    stats = stats[1:]
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= min_area]
+
+    owner = stats[:, cv2.CC_STAT_TOP] // pitch_y
+    kinds = stats[:, cv2.CC_STAT_LEFT] // pitch_x + 1
+    # labels are numbered in raster order over the whole canvas, which is
+    # raster order within each tile; a stable sort by (frame, kind) keeps it,
+    # giving the order of labeling every class mask on its own
+    order = np.lexsort((np.arange(len(stats)), kinds, owner))
+    stats, owner, kinds = stats[order], owner[order], kinds[order]
+
+    regions = np.empty(len(stats), dtype=REGION_DTYPE)
+    regions['kind'] = kinds
+    regions['x'] = stats[:, cv2.CC_STAT_LEFT] - (kinds - 1) * pitch_x
+    regions['y'] = stats[:, cv2.CC_STAT_TOP] - owner * pitch_y
+    regions['w'] = stats[:, cv2.CC_STAT_WIDTH]
+    regions['h'] = stats[:, cv2.CC_STAT_HEIGHT]
+    regions['area'] = stats[:, cv2.CC_STAT_AREA]
+
+    # temperature at the center of the bounding box; the per-frame code
+    # used y + w // 2 for cold regions, which could index past the frame
+    cx = regions['x'] + regions['w'] // 2
+    cy = regions['y'] + regions['h'] // 2
+    regions['temp'] = frames[owner, cy, cx]
+
+    per_frame = np.split(regions, np.searchsorted(owner, np.arange(1, n)))
+    return [_drop_covered_normals(r, (h, w)) for r in per_frame]
+
+
+def _drop_covered_normals(regions, shape):
+    """
+    Remove normal regions whose bounding box overlaps a hot or cold one,
+    using a summed-area table instead of testing every rectangle pair.
+    """
+    normal = regions['kind'] == NORMAL
+    alarm = ~normal
+    if not (alarm.any() and normal.any()):
+        return regions
+
+    rects = np.stack([regions['x'], regions['y'],
+                      regions['w'], regions['h']], axis=1)
+    sat = _covered(rects[alarm], shape)
+    x0, y0 = rects[normal, 0], rects[normal, 1]
+    x1, y1 = x0 + rects[normal, 2], y0 + rects[normal, 3]
+    hits = sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+    keep = np.ones(len(regions), dtype=bool)
+    keep[np.flatnonzero(normal)[hits > 0]] = False
+    return regions[keep]
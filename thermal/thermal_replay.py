@@ -0,0 +1,197 @@
+"""
+Recording and offline replay of AMG8833 frames.
+
+A recording is a 16 byte header followed by fixed-size FRAME_DTYPE records,
+so it can be appended to while running and opened with np.memmap without
+loading it into memory.
+
+ReplaySensor mimics the adafruit_amg88xx.AMG88XX attributes used by
+thermal_tracking.py (pixels, temperature), so recorded or synthetic frames go
+through the same processing with no board/busio import.
+"""
+import time
+
+import numpy as np
+
+MAGIC = b'AMG8REC1'
+HEADER_SIZE = 16
+
+FRAME_DTYPE = np.dtype([
+    ('ts', '<f8'),           # time.time() when the frame was read
+    ('thermistor', '<f4'),   # sensor.temperature
+    ('pixels', '<f4', (8, 8)),  # sensor.pixels, raw
+])
+
+
+class FrameRecorder:
+    """
+    Appends raw frames to a recording file.
+    """
+
+    def __init__(self, path, flush_every=50):
+        """
+        Args:
+            path(str): recording file, created or appended to
+            flush_every(int): Optional, frames buffered between flushes
+
+        Raises:
+            ValueError: if path exists and is not a frame recording
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = 0
+        self._file = open(path, 'a+b')
+        size = self._file.seek(0, 2)
+        if size < HEADER_SIZE:
+            # new file, or killed while writing the header
+            self._file.truncate(0)
+            self._file.write(MAGIC.ljust(HEADER_SIZE, b'\0'))
+            return
+        self._file.seek(0)
+        if not self._file.read(HEADER_SIZE).startswith(MAGIC):
+            self._file.close()
+            raise ValueError('Not a thermal frame recording: {}'.format(path))
+        # drop a partially written last record (killed mid-write), otherwise
+        # every frame appended after it would be read off-alignment
+        count = (size - HEADER_SIZE) // FRAME_DTYPE.itemsize
+        self._file.truncate(HEADER_SIZE + count * FRAME_DTYPE.itemsize)
+        self._file.seek(0, 2)
+
+    def write(self, ts, thermistor, pixels):
+        """Append one frame."""
+        rec = np.zeros((), dtype=FRAME_DTYPE)
+        rec['ts'] = ts
+        rec['thermistor'] = thermistor
+        rec['pixels'] = pixels
+        self._file.write(rec.tobytes())
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_recording(path):
+    """
+    Memory-map a recording.
+
+    Returns: np.memmap of FRAME_DTYPE records (read only)
+
+    Raises:
+        ValueError: if the file is not a frame recording
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if not header.startswith(MAGIC):
+        raise ValueError('Not a thermal frame recording: {}'.format(path))
+    # ignore a partially written last record (killed mid-write)
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        count = (f.tell() - HEADER_SIZE) // FRAME_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=FRAME_DTYPE)
+    return np.memmap(path, dtype=FRAME_DTYPE, mode='r',
+                     offset=HEADER_SIZE, shape=(count,))
+
+
+def synthetic_frames(count, ambient=22.0, noise=0.3, hot_spots=((2, 3, 34.0),),
+                     seed=0):
+    """
+    Generate FRAME_DTYPE records with a flat background, sensor noise and
+    a few warm blobs that drift slowly across the frame.
+
+    Args:
+        count(int): number of frames
+        ambient(float): background and thermistor temperature
+        noise(float): standard deviation of the per-pixel noise
+        hot_spots(tuple): (row, col, peak temperature) of each blob at t=0
+        seed(int): random seed
+
+    Returns: np.ndarray of FRAME_DTYPE
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[0:8, 0:8]
+    frames = np.zeros(count, dtype=FRAME_DTYPE)
+    frames['ts'] = np.arange(count) * 0.1
+    frames['thermistor'] = ambient
+    for i in range(count):
+        frame = ambient + rng.normal(0, noise, (8, 8))
+        for r, c, peak in hot_spots:
+            c = (c + i * 0.02) % 8
+            frame += (peak - ambient) * np.exp(-((rows - r) ** 2 + (cols - c) ** 2) / 2.0)
+        frames['pixels'][i] = frame
+    return frames
+
+
+class ReplaySensor:
+    """
+    Stand-in for adafruit_amg88xx.AMG88XX that plays back frames.
+
+    Reading `pixels` advances to the next frame; `temperature` and
+    `timestamp` describe the frame last returned.
+    """
+
+    def __init__(self, frames, loop=False, realtime=False):
+        """
+        Args:
+            frames(np.ndarray): FRAME_DTYPE records (e.g. load_recording())
+            loop(bool): Optional, start over at the end instead of stopping
+            realtime(bool): Optional, pace playback by the recorded timestamps
+                instead of running at full speed
+        """
+        self.frames = frames
+        self.loop = loop
+        self.realtime = realtime
+        self._idx = -1
+        self._start = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(load_recording(path), **kwargs)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def pixels(self):
+        """
+        Raises:
+            EOFError: when all frames were played and loop is off
+        """
+        self._idx += 1
+        if self._idx >= len(self.frames):
+            if not self.loop or len(self.frames) == 0:
+                raise EOFError('Replay finished after {} frames'.format(len(self.frames)))
+            self._idx = 0
+            self._start = None
+        if self.realtime:
+            self._wait_for(self.frames['ts'][self._idx])
+        return self.frames['pixels'][self._idx]
+
+    @property
+    def temperature(self):
+        return float(self.frames['thermistor'][max(self._idx, 0)])
+
+    @property
+    def timestamp(self):
+        return float(self.frames['ts'][max(self._idx, 0)])
+
+    def _wait_for(self, ts):
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now - (ts - self.frames['ts'][0])
+        delay = self._start + (ts - self.frames['ts'][0]) - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,173 @@
+"""
+Headless thermal service for several AMG88xx sensors in one process.
+
+Sensors are listed in thermal_config.json:
+
+    "sensors": [
+        {"name": "pen1", "address": "0x69"},
+        {"name": "pen2", "address": "0x68"},
+        {"name": "pen3", "address": "0x69", "bus": 3}
+    ]
+
+All sensors are read together on the reader thread and processed as one
+batch (shared averaging, interpolation and labeling), so adding a sensor
+adds an I2C read and a tile in the batch, not another process.
+
+Output: status changes per sensor in the log ("ts,Status:x,name") and a
+JSON summary with one section per sensor.
+
+    python3 thermal_service.py [log] --summary thermal_summary.json
+    python3 thermal_service.py --synthetic 500 --sensors 4   # no hardware
+"""
+import argparse
+import json
+import signal
+import time
+
+import numpy as np
+
+from thermal_processing import ThermalProcessor
+from thermal_reader import SensorReader
+from thermal_replay import ReplaySensor, synthetic_frames
+from thermal_summary import RunSummary, write_json_atomic
+
+DEFAULT_SENSORS = [{"name": "amg0"}]
+
+
+class MultiSensor:
+    """
+    Several AMG88xx-like sensors behind one `pixels` / `temperature`
+    interface, returning (n, 8, 8) and (n,) arrays. Works with
+    SensorReader unchanged.
+    """
+
+    def __init__(self, sensors, names):
+        self.sensors = sensors
+        self.names = names
+
+    def __len__(self):
+        return len(self.sensors)
+
+    @property
+    def pixels(self):
+        return np.array([s.pixels for s in self.sensors], dtype=float)
+
+    @property
+    def temperature(self):
+        return np.array([s.temperature for s in self.sensors], dtype=float)
+
+    @property
+    def timestamp(self):
+        # replay sensors only
+        return self.sensors[0].timestamp
+
+
+def open_amg88xx(specs):
+    """
+    Open the configured sensors. I2C buses are shared between sensors on
+    the same bus; bus numbers other than the default need the
+    adafruit-extended-bus package.
+    """
+    import board
+    import busio
+    import adafruit_amg88xx
+
+    buses = {}
+    sensors = []
+    for spec in specs:
+        bus = spec.get("bus")
+        if bus not in buses:
+            if bus is None:
+                buses[bus] = busio.I2C(board.SCL, board.SDA)
+            else:
+                from adafruit_extended_bus import ExtendedI2C
+                buses[bus] = ExtendedI2C(bus)
+        address = int(str(spec.get("address", "0x69")), 0)
+        sensors.append(adafruit_amg88xx.AMG88XX(buses[bus], addr=address))
+    return sensors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thermal tracking for several AMG88xx sensors.")
+    parser.add_argument("out_file", nargs="?", help="optional status log file")
+    parser.add_argument("--config", default="thermal_config.json", help="threshold/sensor config file")
+    parser.add_argument("--summary", help="per-sensor run summary (JSON) file")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="replay N generated frames per sensor")
+    parser.add_argument("--sensors", type=int, default=2, help="number of synthetic sensors")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as config_file:
+        config = json.load(config_file)
+
+    if args.synthetic:
+        names = [f"sim{i}" for i in range(args.sensors)]
+        sensor = MultiSensor([ReplaySensor(synthetic_frames(args.synthetic, seed=i))
+                              for i in range(args.sensors)], names)
+    else:
+        specs = config.get("sensors", DEFAULT_SENSORS)
+        names = [spec.get("name", f"amg{i}") for i, spec in enumerate(specs)]
+        sensor = MultiSensor(open_amg88xx(specs), names)
+
+    processor = ThermalProcessor(config['cold_threshold'], config['hot_threshold'],
+                                 sensors=len(sensor),
+                                 avg_mode=config.get('avg_mode', 'window'))
+    summaries = [RunSummary() for _ in names]
+    log_file = open(args.out_file, "a", buffering=1) if args.out_file else None
+
+    def flush_summary():
+        flush_requested["now"] = False
+        if args.summary:
+            write_json_atomic(args.summary, {
+                "alarm": any(s.alarm_frames for s in summaries),
+                "sensors": {name: s.as_dict() for name, s in zip(names, summaries)},
+            })
+
+    # SIGUSR1 only sets a flag, the main loop writes: a write from inside the
+    # handler could interrupt a periodic one and share its temporary file
+    flush_requested = {"now": False}
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: flush_requested.update(now=True))
+
+    if args.synthetic:
+        reader = None
+
+        def read_frame():
+            raw = sensor.pixels
+            return sensor.timestamp, raw, sensor.temperature
+    else:
+        reader = SensorReader(sensor)
+        reader.start()
+        read_frame = reader.latest
+
+    last_flush = time.monotonic()
+    try:
+        while True:
+            ts, raw, thermistor = read_frame()
+            _, _, regions, status = processor.process(raw, thermistor)
+
+            for name, summ, st, reg, therm in zip(names, summaries, status, regions, thermistor):
+                changed = summ.update(ts, int(st), reg, therm)
+                if st:
+                    print(f"Status:1 {name}")
+                if log_file and (changed or summ.frames == 1):
+                    log_file.write(f"{ts},Status:{st},{name}\n")
+
+            if flush_requested["now"] or time.monotonic() - last_flush >= 1.0:
+                flush_summary()
+                last_flush = time.monotonic()
+
+    except (KeyboardInterrupt, EOFError):
+        # EOFError: synthetic frames ran out
+        pass
+    finally:
+        # also on a sensor error: the pipeline must not read a stale summary
+        if reader:
+            reader.stop()
+        flush_summary()
+        if log_file:
+            log_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Incremental summary of a thermal tracking run.
+
+Updated in O(1) per frame (plus the frame's regions) and written as a small
+JSON file, so the verdict does not depend on scanning a per-frame log.
+The file is replaced atomically; readers never see a partial write.
+"""
+import json
+import os
+import time
+
+
+def write_json_atomic(path, data):
+    """Write data as JSON so readers see either the old or the new file."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+class RunSummary:
+    """
+    Running counters for one thermal tracking run.
+    """
+
+    def __init__(self, path=None, flush_interval=1.0):
+        """
+        Args:
+            path(str): Optional, JSON file to write; None keeps it in memory
+            flush_interval(float): Optional, minimum seconds between writes
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.started = time.time()
+        self.frames = 0
+        self.alarm_frames = 0
+        self.status = None
+        self.rising = 0  # Status 0 -> 1
+        self.falling = 0  # Status 1 -> 0
+        self.time_in_alarm = 0.0
+        self.first_alarm_ts = None
+        self.last_alarm_ts = None
+        self.last_frame_ts = None
+        self.max_region_temp = None
+        self.min_region_temp = None
+        self.max_thermistor = None
+        self.events = []
+        self._last_flush = 0.0
+        self._flush_requested = False
+
+    def update(self, ts, status, regions=(), thermistor=None):
+        """
+        Account for one processed frame.
+
+        Args:
+            ts(float): frame timestamp
+            status(int): 1 if the frame raised an alarm else 0
+            regions(np.ndarray): Optional, thermal_regions.REGION_DTYPE records
+            thermistor(float): Optional, ambient reading
+
+        Returns: bool True if the status changed with this frame
+        """
+        changed = self.status is not None and status != self.status
+        if self.status == 1 and self.last_frame_ts is not None:
+            self.time_in_alarm += max(0.0, ts - self.last_frame_ts)
+        if changed:
+            if status:
+                self.rising += 1
+            else:
+                self.falling += 1
+
+        self.frames += 1
+        if status:
+            self.alarm_frames += 1
+            if self.first_alarm_ts is None:
+                self.first_alarm_ts = ts
+            self.last_alarm_ts = ts
+        self.status = status
+        self.last_frame_ts = ts
+
+        if len(regions):
+            hi = float(regions['temp'].max())
+            lo = float(regions['temp'].min())
+            if self.max_region_temp is None or hi > self.max_region_temp:
+                self.max_region_temp = hi
+            if self.min_region_temp is None or lo < self.min_region_temp:
+                self.min_region_temp = lo
+        if thermistor is not None:
+            if self.max_thermistor is None or thermistor > self.max_thermistor:
+                self.max_thermistor = float(thermistor)
+        return changed
+
+    def add_event(self, ts, name, **fields):
+        """Record a notable event (kept in order, e.g. rate changes)."""
+        self.events.append(dict(ts=ts, event=name, **fields))
+
+    def as_dict(self):
+        return {
+            "alarm": self.alarm_frames > 0,
+            "status": self.status,
+            "frames": self.frames,
+            "alarm_frames": self.alarm_frames,
+            "transitions": {"0->1": self.rising, "1->0": self.falling},
+            "time_in_alarm_s": round(self.time_in_alarm, 3),
+            "first_alarm_ts": self.first_alarm_ts,
+            "last_alarm_ts": self.last_alarm_ts,
+            "max_region_temp": self.max_region_temp,
+            "min_region_temp": self.min_region_temp,
+            "max_thermistor": self.max_thermistor,
+            "started": self.started,
+            "last_frame_ts": self.last_frame_ts,
+            "events": self.events,
+        }
+
+    def request_flush(self, *_):
+        """
+        Ask for a write at the next maybe_flush(). Safe to use as a
+        signal handler, e.g. signal.signal(signal.SIGUSR1, s.request_flush).
+        """
+        self._flush_requested = True
+
+    def maybe_flush(self, now=None):
+        """Write if requested or if flush_interval has passed."""
+        now = time.monotonic() if now is None else now
+        if self._flush_requested or now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+    def flush(self):
+        """Write the summary now."""
+        self._flush_requested = False
+        if self.path:
+            write_json_atomic(self.path, self.as_dict())
@@ -0,0 +1,122 @@
+"""
+Persisted HX711 calibration: offsets (tare) and scale ratios per
+channel/gain with the time they were measured and, optionally, the
+temperature at that time. Kept in a small versioned JSON file:
+
+    {"version": 1,
+     "channels": {"A128": {"offset": 8012, "offset_ts": 1760000000.0,
+                           "scale_ratio": 401.7, "scale_ratio_ts": 1759000000.0,
+                           "temperature": 21.5}}}
+
+At start up a few readings are compared with the saved offset
+(needs_tare); only if the scale drifted is the full tare repeated.
+"""
+
+import json
+import os
+import time
+
+VERSION = 1
+CHANNELS = ('A128', 'A64', 'B')
+
+
+def channel_key(channel, gain_A):
+    """
+    Returns: str key of a channel and gain ('A128' || 'A64' || 'B')
+    """
+    if channel == 'B':
+        return 'B'
+    return 'A{}'.format(gain_A)
+
+
+def _check_keys(channels, path):
+    unknown = sorted(set(channels) - set(CHANNELS))
+    if unknown:
+        raise ValueError('Unknown calibration channel {} for {}. '
+                         'Expected one of {}'.format(', '.join(unknown), path,
+                                                     ', '.join(CHANNELS)))
+
+
+def load(path):
+    """
+    load reads a calibration file.
+
+    Args:
+        path(str): calibration file
+
+    Raises:
+        ValueError: if the file has an unknown version or channel key
+
+    Returns: (None || dict) channel key -> entry, None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != VERSION:
+        raise ValueError('Unknown calibration file version in {}. '
+                         'Expected {}, received: {}'.format(path, VERSION,
+                                                            data.get('version')))
+    channels = data.get('channels', {})
+    _check_keys(channels, path)
+    return channels
+
+
+def save(path, values, temperature=None):
+    """
+    save writes offsets and scale ratios. A value keeps its old timestamp
+    (and temperature) if it did not change, so the file tells when each
+    one was really measured.
+
+    Args:
+        path(str): calibration file
+        values(dict): channel key -> {'offset': ..., 'scale_ratio': ...},
+            either value may be left out
+        temperature(float): Optional, temperature during the measurement
+
+    Raises:
+        ValueError: if a key of values is not one of CHANNELS
+    """
+    _check_keys(values, path)
+    channels = load(path) or {}
+    now = time.time()
+    for key, new in values.items():
+        entry = channels.setdefault(key, {})
+        offset_changed = 'offset' in new and new['offset'] != entry.get('offset')
+        for name in ('offset', 'scale_ratio'):
+            if name in new and new[name] != entry.get(name):
+                entry[name] = new[name]
+                entry[name + '_ts'] = now
+        # the temperature belongs to the offset measurement
+        if temperature is not None and (offset_changed or 'temperature' not in entry):
+            entry['temperature'] = temperature
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': VERSION, 'channels': channels}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def needs_tare(entry, zero_reading, max_drift, temperature=None, max_temp_delta=None):
+    """
+    needs_tare decides if the saved offset can still be used.
+
+    Args:
+        entry(dict): saved channel entry (see load)
+        zero_reading(float): mean raw reading of the empty scale now
+        max_drift(float): largest acceptable drift in weight units
+        temperature(float): Optional, temperature now
+        max_temp_delta(float): Optional, re-tare if the temperature changed
+            more than this since the offset was measured
+
+    Returns: (bool, float) True if a full tare is needed, drift in weight units
+    """
+    if not entry or 'offset' not in entry:
+        return True, float('inf')
+    drift = abs(zero_reading - entry['offset']) / abs(entry.get('scale_ratio') or 1)
+    if drift > max_drift:
+        return True, drift
+    if (max_temp_delta is not None and temperature is not None
+            and entry.get('temperature') is not None
+            and abs(temperature - entry['temperature']) > max_temp_delta):
+        return True, drift
+    return False, drift
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+GPIO backends for the HX711 code.
+
+All backends look like the RPi.GPIO module (setmode, setup, output,
+input, wait_for_edge, cleanup and the BCM/IN/OUT/... constants), so
+scripts only swap their import:
+
+    from gpio_backend import get_backend
+    GPIO = get_backend()
+
+and add clock_in(), which clocks bits out of one or more HX711 chips
+sharing a clock line. The backend is chosen with the HX711_GPIO
+environment variable:
+
+    auto   RPi.GPIO if installed, else gpiod (default)
+    rpi    RPi.GPIO
+    gpiod  Linux GPIO character device (libgpiod >= 2), chip from GPIOD_CHIP
+    sim    simulated HX711 chips, see SimulatedGPIO
+
+`python3 gpio_backend.py` benchmarks the HX711 driver on the simulator.
+"""
+
+import os
+import random
+import time
+
+POWER_DOWN_S = 0.00006  # PD_SCK high for 60 us puts the HX711 into power down
+
+
+class GPIOBackend:
+    """
+    Base class with the RPi.GPIO constants and a bit-banged clock_in().
+    """
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        if mode != self.BCM:
+            raise ValueError('Only BCM pin numbering is supported. '
+                             'Received: {}'.format(mode))
+
+    def clock_in(self, sck, douts, bits=24, max_high=POWER_DOWN_S):
+        """
+        clock_in sends `bits` clock pulses and samples every DOUT pin after
+        each one, most significant bit first.
+
+        Args:
+            sck(int): clock pin
+            douts([int]): data pins of the chips on this clock
+            bits(int): Optional, number of pulses. By default 24
+            max_high(float): Optional, longest allowed high phase in seconds
+
+        Returns: (list || None) one int per DOUT pin, or None if a pulse
+            was too long and the chips went into power down
+        """
+        output = self.output
+        read = self.input
+        values = [0] * len(douts)
+        for _ in range(bits):
+            start_counter = time.perf_counter()
+            output(sck, True)
+            output(sck, False)
+            if time.perf_counter() - start_counter >= max_high:
+                return None
+            for i, pin in enumerate(douts):
+                values[i] = (values[i] << 1) | read(pin)
+        return values
+
+
+class RPiGPIO(GPIOBackend):
+    """
+    RPi.GPIO, with clock_in() from GPIOBackend.
+    """
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        self._gpio = GPIO
+        for name in ('BCM', 'BOARD', 'OUT', 'IN', 'LOW', 'HIGH', 'RISING',
+                     'FALLING', 'BOTH', 'PUD_OFF', 'PUD_DOWN', 'PUD_UP'):
+            setattr(self, name, getattr(GPIO, name))
+        # bound once, these are on the hot path of every reading
+        self.input = GPIO.input
+        self.output = GPIO.output
+
+    def setwarnings(self, flag):
+        self._gpio.setwarnings(flag)
+
+    def setmode(self, mode):
+        self._gpio.setmode(mode)
+
+    def setup(self, pin, mode, **kwargs):
+        self._gpio.setup(pin, mode, **kwargs)
+
+    def wait_for_edge(self, pin, edge, timeout=None):
+        if timeout is None:
+            return self._gpio.wait_for_edge(pin, edge)
+        return self._gpio.wait_for_edge(pin, edge, timeout=timeout)
+
+    def cleanup(self, *pins):
+        self._gpio.cleanup(*pins)
+
+
+class GpiodGPIO(GPIOBackend):
+    """
+    Linux GPIO character device through libgpiod 2.x. Pin numbers are
+    line offsets of the chip, which are the BCM numbers on a Raspberry Pi.
+    """
+
+    def __init__(self, chip=None):
+        import gpiod
+        from gpiod.line import Bias, Direction, Edge, Value
+        self._gpiod = gpiod
+        self._direction = Direction
+        self._edge = Edge
+        self._value = Value
+        self._bias = {self.PUD_OFF: Bias.DISABLED,
+                      self.PUD_DOWN: Bias.PULL_DOWN,
+                      self.PUD_UP: Bias.PULL_UP}
+        self._chip = chip or os.environ.get('GPIOD_CHIP', '/dev/gpiochip0')
+        self._requests = {}
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None, **kwargs):
+        """
+        Like RPi.GPIO.setup. pull_up_down takes PUD_OFF, PUD_DOWN or PUD_UP
+        and sets the line bias; by default the bias is left as it is.
+
+        Raises:
+            ValueError: if pull_up_down is not one of the PUD_ constants
+            NotImplementedError: for other RPi.GPIO options
+        """
+        if kwargs:
+            raise NotImplementedError('GpiodGPIO.setup() does not support: {}'.format(
+                ', '.join(sorted(kwargs))))
+        Direction, Value = self._direction, self._value
+        options = {}
+        if pull_up_down is not None:
+            if pull_up_down not in self._bias:
+                raise ValueError('Parameter "pull_up_down" has to be PUD_OFF, PUD_DOWN '
+                                 'or PUD_UP. Received: {}'.format(pull_up_down))
+            options['bias'] = self._bias[pull_up_down]
+        if mode == self.OUT:
+            settings = self._gpiod.LineSettings(
+                direction=Direction.OUTPUT,
+                output_value=Value.ACTIVE if initial else Value.INACTIVE,
+                **options)
+        else:
+            # edges are always detected so wait_for_edge() needs no reconfiguration
+            settings = self._gpiod.LineSettings(direction=Direction.INPUT,
+                                                edge_detection=self._edge.FALLING,
+                                                **options)
+        if pin in self._requests:
+            self._requests.pop(pin).release()
+        self._requests[pin] = self._gpiod.request_lines(
+            self._chip, consumer='hx711', config={pin: settings})
+
+    def output(self, pin, value):
+        self._requests[pin].set_value(
+            pin, self._value.ACTIVE if value else self._value.INACTIVE)
+
+    def input(self, pin):
+        return int(self._requests[pin].get_value(pin) == self._value.ACTIVE)
+
+    def wait_for_edge(self, pin, edge, timeout=None):
+        """
+        Wait for a falling edge on an input pin (edge is ignored, only
+        falling edges are detected).
+
+        Returns: pin if an edge came, None after timeout milliseconds
+        """
+        request = self._requests[pin]
+        # DOUT toggles while data is clocked out; drop those old edges
+        while request.wait_edge_events(0):
+            request.read_edge_events()
+        if request.wait_edge_events(None if timeout is None else timeout / 1000):
+            request.read_edge_events()
+            return pin
+        return None
+
+    def cleanup(self, *pins):
+        for pin in pins or list(self._requests):
+            request = self._requests.pop(pin, None)
+            if request:
+                request.release()
+
+
+class SimulatedHX711:
+    """
+    One HX711 with a load cell, driven by the clock edges of SimulatedGPIO.
+
+    Models the conversion rate, gain/channel selection by the number of
+    pulses (25/26/27), Gaussian noise from a seeded generator, and power
+    down when PD_SCK stays high for 60 us or more (with settling after
+    power up). With realtime=False a new conversion is ready as soon as
+    DOUT is checked, so benchmarks do not wait for the chip.
+    """
+
+    GAIN_FACTOR = {1: 1.0, 2: 0.25, 3: 0.5}  # A128, B32, A64 relative to A128
+
+    def __init__(self, load=0.0, offset=8000, ratio=400.0, noise=40.0,
+                 rate_hz=10, realtime=True, seed=0):
+        """
+        Args:
+            load(float): Optional, weight on the cell in user units
+            offset(int): Optional, counts with no load at A128
+            ratio(float): Optional, counts per weight unit at A128
+            noise(float): Optional, standard deviation of the noise in counts
+            rate_hz(int): Optional, conversions per second (10 || 80)
+            realtime(bool): Optional, by default True
+            seed(int): Optional, seed of the noise
+        """
+        self.load = load
+        self.offset = offset
+        self.ratio = ratio
+        self.noise = noise
+        self.rate_hz = rate_hz
+        self.realtime = realtime
+        self.power_downs = 0
+        self._random = random.Random(seed)
+        self._gain_pulses = 1
+        self._pulses = 0  # pulses of the current transaction, 1..24 while shifting
+        self._word = 0
+        self._powered = True
+        self._high_since = None
+        self._ready_at = 0.0
+        self._checked = True
+
+    def set_load(self, load):
+        self.load = load
+
+    def _sample(self):
+        counts = ((self.offset + self.load * self.ratio) * self.GAIN_FACTOR[self._gain_pulses]
+                  + self._random.gauss(0, self.noise))
+        counts = max(-0x800000, min(0x7fffff, int(round(counts))))
+        return counts & 0xffffff
+
+    def _ready(self, now):
+        if self.realtime:
+            return now >= self._ready_at
+        return self._checked
+
+    def ready_in(self, now):
+        """Seconds until the next conversion is ready (0 if it is)."""
+        if not self._powered or (self._pulses and self._pulses <= 24):
+            return 0.0
+        if self.realtime:
+            return max(0.0, self._ready_at - now)
+        return 0.0
+
+    def dout(self, now):
+        if self._high_since is not None and now - self._high_since >= POWER_DOWN_S:
+            self._powered = False
+        if not self._powered:
+            return 1
+        if 1 <= self._pulses <= 24:
+            return (self._word >> (24 - self._pulses)) & 1
+        self._checked = True
+        return 0 if self._ready(now) else 1
+
+    def rising(self, now):
+        self._high_since = now
+        if not self._powered:
+            return
+        if (self._pulses == 0 or self._pulses > 24) and self._ready(now):
+            # start of a transaction: the data shifted out is the last conversion
+            self._word = self._sample()
+            self._pulses = 1
+        elif self._pulses >= 24:
+            # 25th..27th pulse: select gain and channel of the next conversion
+            self._pulses += 1
+            self._gain_pulses = min(self._pulses - 24, 3)
+            if self._pulses == 25:
+                self._ready_at = now + 1.0 / self.rate_hz
+                self._checked = False
+        elif self._pulses:
+            self._pulses += 1
+
+    def falling(self, now):
+        if self._high_since is not None and now - self._high_since >= POWER_DOWN_S:
+            self._powered = False
+        self._high_since = None
+        if not self._powered:
+            # power up: back to channel A gain 128, output settles in 4 conversions
+            self.power_downs += 1
+            self._powered = True
+            self._gain_pulses = 1
+            self._pulses = 0
+            self._ready_at = now + 4.0 / self.rate_hz
+            self._checked = False
+
+
+class SimulatedGPIO(GPIOBackend):
+    """
+    GPIO without hardware: outputs are remembered, inputs wired to a
+    SimulatedHX711 follow the chip. Chips come from HX711_SIM_PINS
+    ("dout:sck,..." default "5:6", the wiring used in this repo) and
+    HX711_SIM_REALTIME (default 1), or attach().
+    """
+
+    def __init__(self, chips=None, realtime=None):
+        if realtime is None:
+            realtime = os.environ.get('HX711_SIM_REALTIME', '1') != '0'
+        self._levels = {}
+        self._chips = {}  # dout pin -> (sck pin, chip)
+        self._clocked = {}  # sck pin -> [chip]
+        if chips is None:
+            chips = {}
+            pins = os.environ.get('HX711_SIM_PINS', '5:6')
+            for i, pair in enumerate(filter(None, pins.split(','))):
+                dout, sck = (int(pin) for pin in pair.split(':'))
+                chips[dout] = (sck, SimulatedHX711(realtime=realtime, seed=i))
+        for dout, (sck, chip) in chips.items():
+            self.attach(dout, sck, chip)
+
+    def attach(self, dout, sck, chip):
+        """Wire chip's DOUT to pin dout and its PD_SCK to pin sck."""
+        self._chips[dout] = (sck, chip)
+        self._clocked.setdefault(sck, []).append(chip)
+
+    def chip(self, dout):
+        """The SimulatedHX711 on pin dout, e.g. to change its load."""
+        return self._chips[dout][1]
+
+    def setup(self, pin, mode, initial=None, **kwargs):
+        if mode == self.OUT:
+            self._levels[pin] = int(bool(initial))
+
+    def output(self, pin, value):
+        value = int(bool(value))
+        if value != self._levels.get(pin, 0):
+            now = time.perf_counter()
+            for chip in self._clocked.get(pin, ()):
+                if value:
+                    chip.rising(now)
+                else:
+                    chip.falling(now)
+        self._levels[pin] = value
+
+    def input(self, pin):
+        if pin in self._chips:
+            return self._chips[pin][1].dout(time.perf_counter())
+        return self._levels.get(pin, 0)
+
+    def wait_for_edge(self, pin, edge, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout / 1000
+        if pin not in self._chips:
+            if deadline:
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+            return None
+        chip = self._chips[pin][1]
+        wait = chip.ready_in(time.perf_counter())
+        if deadline is not None and time.perf_counter() + wait > deadline:
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            return None
+        time.sleep(wait)
+        return pin
+
+    def clock_in(self, sck, douts, bits=24, max_high=POWER_DOWN_S):
+        """
+        Native clock_in: edges go straight to the chips, so the pulse
+        timing is modelled instead of measured.
+        """
+        chips = [self._chips[pin][1] if pin in self._chips else None for pin in douts]
+        clocked = self._clocked.get(sck, ())
+        values = [0] * len(douts)
+        for _ in range(bits):
+            now = time.perf_counter()
+            for chip in clocked:
+                chip.rising(now)
+            for chip in clocked:
+                chip.falling(now)
+            for i, chip in enumerate(chips):
+                values[i] = (values[i] << 1) | (chip.dout(now) if chip else 0)
+        self._levels[sck] = 0
+        return values
+
+    def cleanup(self, *pins):
+        for pin in pins or list(self._levels):
+            self._levels.pop(pin, None)
+
+
+BACKENDS = {'rpi': RPiGPIO, 'gpiod': GpiodGPIO, 'sim': SimulatedGPIO}
+_backend = None
+
+
+def get_backend(name=None):
+    """
+    get_backend returns the process wide GPIO backend, created on first use.
+
+    Args:
+        name(str): Optional, ('auto' || 'rpi' || 'gpiod' || 'sim').
+            By default HX711_GPIO or 'auto'. Ignored once a backend exists.
+
+    Raises:
+        ValueError: if name is unknown
+        ImportError: if no hardware backend is available for 'auto'
+
+    Returns: GPIOBackend
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    name = (name or os.environ.get('HX711_GPIO', 'auto')).lower()
+    if name == 'auto':
+        try:
+            _backend = RPiGPIO()
+        except (ImportError, RuntimeError):
+            try:
+                _backend = GpiodGPIO()
+            except ImportError:
+                raise ImportError('Neither RPi.GPIO nor gpiod is installed. '
+                                  'Set HX711_GPIO=sim to run without hardware.')
+    elif name in BACKENDS:
+        _backend = BACKENDS[name]()
+    else:
+        raise ValueError('HX711_GPIO has to be one of auto, {}. '
+                         'Received: {}'.format(', '.join(BACKENDS), name))
+    return _backend
+
+
+def set_backend(backend):
+    """
+    set_backend replaces the process wide backend, e.g. with a
+    SimulatedGPIO wired differently.
+    """
+    global _backend
+    _backend = backend
+
+
+def _benchmark(readings=30, means=20):
+    from hx711 import HX711
+    from robust_filter import hampel_filter
+
+    gpio = SimulatedGPIO({5: (6, SimulatedHX711(load=250.0, realtime=False))})
+    hx = HX711(dout_pin=5, pd_sck_pin=6, gpio=gpio)
+
+    start = time.perf_counter()
+    for _ in range(readings * means):
+        hx._read()
+    took = time.perf_counter() - start
+    print('HX711._read: {:.1f} us/reading'.format(took / (readings * means) * 1e6))
+
+    for name, data_filter in (('outliers_filter', hx.outliers_filter),
+                              ('hampel_filter', hampel_filter)):
+        hx.set_data_filter(data_filter)
+        start = time.perf_counter()
+        for _ in range(means):
+            hx.get_raw_data_mean(readings)
+        took = time.perf_counter() - start
+        print('get_raw_data_mean({}) with {}: {:.2f} ms'.format(
+            readings, name, took / means * 1e3))
+    print('power downs: {}'.format(gpio.chip(5).power_downs))
+
+
+if __name__ == '__main__':
+    _benchmark()
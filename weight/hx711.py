@@ -1,12 +1,54 @@
 """
 This file holds HX711 class
 """
-#!/usr/bin/env python3
 
+import contextlib
+import math
 import statistics as stat
+import threading
 import time
+from collections import deque
 
-import RPi.GPIO as GPIO
+import calibration
+from gpio_backend import get_backend
+
+
+def _t_quantile(z, df):
+    """
+    _t_quantile returns the Student t quantile with the same coverage as
+    the normal quantile z, for df degrees of freedom. Exact for df 1, 2
+    and 4 (closed forms) and df 3 (Newton on the closed form CDF), the
+    Cornish-Fisher expansion above. From df 5 the expansion is within
+    0.02 % for z <= 2 and 0.3 % for z <= 3 (largest at df 5).
+
+    Args:
+        z(float): normal quantile, e.g. 2.0
+        df(int): degrees of freedom, >= 1
+
+    Returns: float quantile
+    """
+    p = 0.5 * (1 + math.erf(z / math.sqrt(2)))
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    if df == 4:
+        alpha = math.sqrt(4 * p * (1 - p))
+        q = math.cos(math.acos(alpha) / 3) / alpha
+        return math.copysign(2 * math.sqrt(q - 1), z)
+    t = (z + (z**3 + z) / (4 * df)
+         + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+         + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+         + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z)
+         / (92160 * df**4))
+    if df == 3:
+        # the expansion is 2 % off at z = 3 here, but the CDF has a closed form
+        for _ in range(6):
+            x = t / math.sqrt(3)
+            cdf = 0.5 + (x / (1 + x * x) + math.atan(x)) / math.pi
+            pdf = 6 * math.sqrt(3) / (math.pi * (3 + t * t) ** 2)
+            t -= (cdf - p) / pdf
+    return t
 
 
 class HX711:
@@ -18,7 +60,10 @@ class HX711:
                  dout_pin,
                  pd_sck_pin,
                  gain_channel_A=128,
-                 select_channel='A'):
+                 select_channel='A',
+                 wait_for_edge=True,
+                 gpio=None,
+                 calibration_file=None):
         """
         Init a new instance of HX711
 
@@ -27,6 +72,12 @@ class HX711:
             pd_sck_pin(int): Raspberry Pi pin number where the Clock pin of HX711 is connected.
             gain_channel_A(int): Optional, by default value 128. Options (128 || 64)
             select_channel(str): Optional, by default 'A'. Options ('A' || 'B')
+            wait_for_edge(bool): Optional, by default True. Wait for the falling
+                edge of DOUT (data ready) instead of polling it every 10 ms.
+                Falls back to polling if edge detection is not available.
+            gpio(GPIOBackend): Optional, by default gpio_backend.get_backend()
+            calibration_file(str): Optional, calibration file (see calibration.py)
+                to load offsets and scale ratios from and save them to
 
         Raises:
             TypeError: if pd_sck_pin or dout_pin are not int type
@@ -56,11 +107,24 @@ class HX711:
         self._scale_ratio_B = 1  # scale ratio for channel B
         self._debug_mode = False
         self._data_filter = self.outliers_filter  # default it is used outliers_filter
-
-        GPIO.setup(self._pd_sck, GPIO.OUT)  # pin _pd_sck is output only
-        GPIO.setup(self._dout, GPIO.IN)  # pin _dout is input only
+        self._lock = threading.RLock()  # one reader of the chip at a time
+        self._samples = None  # (timestamp, raw data) ring buffer of the sampling thread
+        self._samples_ready = threading.Condition()
+        self._sampling_thread = None
+        self._sampling = False
+        self._max_age = None
+        self._sample_filter = None
+        self._wait_for_edge = wait_for_edge
+        self._ready_timeout = 0.5  # seconds to wait for DOUT low before giving up
+        self._calibration_file = calibration_file
+
+        self._gpio = gpio or get_backend()
+        self._gpio.setup(self._pd_sck, self._gpio.OUT)  # pin _pd_sck is output only
+        self._gpio.setup(self._dout, self._gpio.IN)  # pin _dout is input only
         self.select_channel(select_channel)
         self.set_gain_A(gain_channel_A)
+        if calibration_file:
+            self.load_calibration(calibration_file)
 
     def select_channel(self, channel):
         """
@@ -82,8 +146,10 @@ class HX711:
                              'Received: {}'.format(channel))
         # after changing channel or gain it has to wait 50 ms to allow adjustment.
         # the data before is garbage and cannot be used.
-        self._read()
-        time.sleep(0.5)
+        with self._lock:
+            self._read()
+            time.sleep(0.5)
+            self._clear_samples()
 
     def set_gain_A(self, gain):
         """
@@ -104,8 +170,10 @@ class HX711:
                              'Received: {}'.format(gain))
         # after changing channel or gain it has to wait 50 ms to allow adjustment.
         # the data before is garbage and cannot be used.
-        self._read()
-        time.sleep(0.5)
+        with self._lock:
+            self._read()
+            time.sleep(0.5)
+            self._clear_samples()
 
     def zero(self, readings=30):
         """
@@ -306,11 +374,46 @@ class HX711:
         Returns: bool True if ready else False when not ready        
         """
         # if DOUT pin is low data is ready for reading
-        if GPIO.input(self._dout) == 0:
+        if self._gpio.input(self._dout) == 0:
             return True
         else:
             return False
 
+    def _wait_ready(self):
+        """
+        _wait_ready waits until data is ready for reading. It blocks on
+        the falling edge of DOUT if edge detection works, otherwise it
+        polls DOUT every 10 ms.
+
+        Returns: bool True if ready else False after self._ready_timeout
+        """
+        if self._ready():
+            return True
+        deadline = time.perf_counter() + self._ready_timeout
+        if self._wait_for_edge:
+            try:
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return self._ready()
+                    # wait in short slices: an edge which came just before
+                    # wait_for_edge was armed is then caught by _ready()
+                    timeout_ms = max(1, int(min(remaining, 0.05) * 1000))
+                    self._gpio.wait_for_edge(self._dout, self._gpio.FALLING,
+                                             timeout=timeout_ms)
+                    if self._ready():
+                        return True
+            except RuntimeError as error:
+                # e.g. edge detection already added on the pin or not supported
+                if self._debug_mode:
+                    print('wait_for_edge failed, polling DOUT instead: {}'.format(error))
+                self._wait_for_edge = False
+        while time.perf_counter() < deadline:
+            time.sleep(0.01)  # sleep for 10 ms because data is not ready
+            if self._ready():
+                return True
+        return False
+
     def _set_channel_gain(self, num):
         """
         _set_channel_gain is called only from _read method.
@@ -326,8 +429,8 @@ class HX711:
         """
         for _ in range(num):
             start_counter = time.perf_counter()
-            GPIO.output(self._pd_sck, True)
-            GPIO.output(self._pd_sck, False)
+            self._gpio.output(self._pd_sck, True)
+            self._gpio.output(self._pd_sck, False)
             end_counter = time.perf_counter()
             # check if hx 711 did not turn off...
             if end_counter - start_counter >= 0.00006:
@@ -351,34 +454,21 @@ class HX711:
         Returns: (bool || int) if it returns False then it is false reading.
             if it returns int then the reading was correct
         """
-        GPIO.output(self._pd_sck, False)  # start by setting the pd_sck to 0
-        ready_counter = 0
-        while (not self._ready() and ready_counter <= 40):
-            time.sleep(0.01)  # sleep for 10 ms because data is not ready
-            ready_counter += 1
-            if ready_counter == 50:  # if counter reached max value then return False
-                if self._debug_mode:
-                    print('self._read() not ready after 40 trials\n')
-                return False
+        self._gpio.output(self._pd_sck, False)  # start by setting the pd_sck to 0
+        if not self._wait_ready():
+            if self._debug_mode:
+                print('self._read() not ready after {} s\n'.format(self._ready_timeout))
+            return False
 
-        # read first 24 bits of data
-        data_in = 0  # 2's complement data from hx 711
-        for _ in range(24):
-            start_counter = time.perf_counter()
-            # request next bit from hx 711
-            GPIO.output(self._pd_sck, True)
-            GPIO.output(self._pd_sck, False)
-            end_counter = time.perf_counter()
-            if end_counter - start_counter >= 0.00006:  # check if the hx 711 did not turn off...
-                # if pd_sck pin is HIGH for 60 us and more than the HX 711 enters power down mode.
-                if self._debug_mode:
-                    print('Not enough fast while reading data')
-                    print(
-                        'Time elapsed: {}'.format(end_counter - start_counter))
-                return False
-            # Shift the bits as they come to data_in variable.
-            # Left shift by one bit then bitwise OR with the new bit.
-            data_in = (data_in << 1) | GPIO.input(self._dout)
+        # read first 24 bits of data, 2's complement data from hx 711.
+        # clock_in returns None if a pulse took 60 us or more because
+        # then the HX 711 entered power down mode.
+        data_in = self._gpio.clock_in(self._pd_sck, [self._dout], 24)
+        if data_in is None:
+            if self._debug_mode:
+                print('Not enough fast while reading data')
+            return False
+        data_in = data_in[0]
 
         if self._wanted_channel == 'A' and self._gain_channel_A == 128:
             if not self._set_channel_gain(1):  # send only one bit which is 1
@@ -424,9 +514,114 @@ class HX711:
 
         return signed_data
 
+    def start_sampling(self, buffer_size=256, max_age=None, sample_filter=None):
+        """
+        start_sampling starts a background thread which reads the HX711
+        continuously into a timestamped ring buffer. While it runs,
+        get_raw_data_mean, get_data_mean, get_weight_mean and zero answer
+        from the latest samples in the buffer instead of reading the chip.
+
+        Args:
+            buffer_size(int): Optional, number of samples kept. By default 256
+            max_age(float): Optional, samples older than max_age seconds
+                are not used for means. By default all buffered samples are used.
+            sample_filter(object): Optional, per sample filter with an
+                update(sample) method returning the sample to keep or None,
+                e.g. robust_filter.HampelFilter()
+
+        Raises:
+            ValueError: if buffer_size is not > 0
+        """
+        if buffer_size <= 0:
+            raise ValueError('Parameter "buffer_size" has to be > 0. '
+                             'Received: {}'.format(buffer_size))
+        if self._sampling:
+            return
+        self._max_age = max_age
+        self._sample_filter = sample_filter
+        self._samples = deque(maxlen=buffer_size)
+        self._sampling = True
+        self._sampling_thread = threading.Thread(target=self._sample_loop,
+                                                 name='hx711-sampler',
+                                                 daemon=True)
+        self._sampling_thread.start()
+
+    def stop_sampling(self):
+        """
+        stop_sampling stops the background thread. Means are read
+        from the chip again afterwards.
+        """
+        self._sampling = False
+        if self._sampling_thread:
+            self._sampling_thread.join()
+        self._sampling_thread = None
+        self._samples = None
+
+    def is_sampling(self):
+        """
+        Returns: bool True if the background thread is running
+        """
+        return self._sampling
+
+    def _sample_loop(self):
+        """
+        _sample_loop runs in the background thread. The lock is released
+        between readings so channel and gain can be changed meanwhile.
+        """
+        while self._sampling:
+            with self._lock:
+                data = self._read()
+            if data is False:
+                continue
+            if self._sample_filter:
+                data = self._sample_filter.update(data)
+                if data is None:
+                    continue
+            with self._samples_ready:
+                self._samples.append((time.time(), data))
+                self._samples_ready.notify_all()
+
+    def _clear_samples(self):
+        """
+        _clear_samples drops buffered samples. Called when channel or gain
+        changes because the old samples belong to the previous setting.
+        """
+        if self._samples is not None:
+            with self._samples_ready:
+                self._samples.clear()
+
+    def get_samples(self, count=None, max_age=None, timeout=1.0):
+        """
+        get_samples returns the latest samples of the background thread.
+
+        Args:
+            count(int): Optional, number of samples. By default all of them.
+            max_age(float): Optional, drop samples older than max_age seconds
+            timeout(float): Optional, seconds to wait if the buffer is empty
+
+        Raises:
+            RuntimeError: if sampling is not running
+
+        Returns: list of (timestamp, raw data) tuples, oldest first
+        """
+        if not self._sampling:
+            raise RuntimeError('get_samples() needs start_sampling() first.')
+        with self._samples_ready:
+            if not self._samples:
+                self._samples_ready.wait(timeout)
+            samples = list(self._samples)
+        if max_age is not None:
+            oldest = time.time() - max_age
+            samples = [sample for sample in samples if sample[0] >= oldest]
+        if count is not None:
+            samples = samples[-count:]
+        return samples
+
     def get_raw_data_mean(self, readings=30):
         """
         get_raw_data_mean returns mean value of readings.
+        When sampling in the background it uses the latest readings from
+        the buffer and returns without waiting for the chip.
 
         Args:
             readings(int): Number of readings for mean.
@@ -438,11 +633,35 @@ class HX711:
         backup_channel = self._current_channel
         backup_gain = self._gain_channel_A
         data_list = []
-        # do required number of readings
-        for _ in range(readings):
-            data_list.append(self._read())
-             
-            
+        if (self._sampling and
+                threading.current_thread() is not self._sampling_thread):
+            data_list = [data for _, data in
+                         self.get_samples(readings, self._max_age)]
+            if not data_list:
+                if self._debug_mode:
+                    print('get_raw_data_mean(): no samples in the buffer\n')
+                return False
+        else:
+            # do required number of readings
+            with self._lock:
+                for _ in range(readings):
+                    data_list.append(self._read())
+        return self._raw_mean(data_list, backup_channel, backup_gain)
+
+    def _read_locked(self):
+        """
+        _read_locked is _read for callers outside the reading loops,
+        e.g. hx711_async, one reading per executor call.
+        """
+        with self._lock:
+            return self._read()
+
+    def _raw_mean(self, data_list, backup_channel, backup_gain):
+        """
+        _raw_mean filters data_list and saves and returns its mean,
+        see get_raw_data_mean.
+        """
+        readings = len(data_list)
         data_mean = False
         if readings > 2 and self._data_filter:
             filtered_data = self._data_filter(data_list)
@@ -505,6 +724,168 @@ class HX711:
         else:
             return False
 
+    def get_weight_estimate(self, tolerance, max_readings=30, min_readings=3,
+                            z=2.0, sample_filter=None):
+        """
+        get_weight_estimate reads until the weight is known within
+        tolerance and returns early when the load is steady.
+
+        It keeps a running mean and variance (Welford) of the readings and
+        stops once the confidence interval of the mean is within tolerance,
+        or after max_readings. The standard deviation is estimated from the
+        readings themselves, so the interval uses the Student t quantile for
+        count - 1 degrees of freedom instead of z (4.5 instead of 2.0 after
+        3 readings): a noisy estimate from few readings does not stop early.
+        While sampling in the background it uses the newest buffered
+        samples, newest first, and does not wait.
+
+        Args:
+            tolerance(float): wanted half width of the confidence interval,
+                in weight units (same units as get_weight_mean)
+            max_readings(int): Optional, hard upper bound. By default 30
+            min_readings(int): Optional, readings before the first test. By default 3
+            z(float): Optional, normal quantile of the confidence level, turned
+                into the t quantile per reading count. By default 2.0 (~95 %)
+            sample_filter(object): Optional, per sample filter with an
+                update(sample) method, e.g. robust_filter.HampelFilter()
+
+        Raises:
+            ValueError: if min_readings is not in range 2..max_readings
+
+        Returns: (bool || (float, float, int)) False if no reading was ok,
+            else (weight, standard error of weight, number of readings used)
+        """
+        if not 2 <= min_readings <= max_readings:
+            raise ValueError('Parameter "min_readings" has to be in range 2..{}. '
+                             'Received: {}'.format(max_readings, min_readings))
+        if sample_filter:
+            sample_filter.reset()
+
+        if (self._sampling and
+                threading.current_thread() is not self._sampling_thread):
+            buffered = self.get_samples(max_readings, self._max_age)
+            readings = (data for _, data in reversed(buffered))
+            lock = contextlib.nullcontext()
+        else:
+            readings = (self._read() for _ in range(max_readings))
+            lock = self._lock
+
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+        with lock:
+            for data in readings:
+                if data is False:
+                    continue
+                if sample_filter:
+                    data = sample_filter.update(data)
+                    if data is None:
+                        continue
+                count += 1
+                delta = data - mean
+                mean += delta / count
+                m2 += delta * (data - mean)
+                if count >= min_readings:
+                    ratio = abs(self.get_current_scale_ratio())
+                    stderr = (m2 / (count - 1) / count) ** 0.5 / ratio
+                    if _t_quantile(z, count - 1) * stderr <= tolerance:
+                        break
+        if not count:
+            return False
+        self._save_last_raw_data(self._current_channel, self._gain_channel_A, mean)
+        ratio = self.get_current_scale_ratio()
+        weight = float((mean - self.get_current_offset()) / ratio)
+        stderr = (m2 / (count - 1) / count) ** 0.5 / abs(ratio) if count > 1 else float('inf')
+        return weight, stderr, count
+
+    def load_calibration(self, path):
+        """
+        load_calibration sets offsets and scale ratios of all channels
+        from a calibration file and uses it for later saves.
+
+        Args:
+            path(str): calibration file
+
+        Raises:
+            ValueError: if the file has an unknown version
+
+        Returns: bool True if the file existed and was loaded
+        """
+        self._calibration_file = path
+        channels = calibration.load(path)
+        if channels is None:
+            return False
+        for key, entry in channels.items():
+            channel, gain_A = ('B', 0) if key == 'B' else ('A', int(key[1:]))
+            if 'offset' in entry:
+                self.set_offset(int(entry['offset']), channel, gain_A)
+            if 'scale_ratio' in entry:
+                self.set_scale_ratio(entry['scale_ratio'], channel, gain_A)
+        return True
+
+    def save_calibration(self, path=None, temperature=None):
+        """
+        save_calibration writes the offsets and scale ratios of the
+        channels that were calibrated (offset or ratio not the default).
+
+        Args:
+            path(str): Optional, by default the calibration_file
+            temperature(float): Optional, temperature during the tare
+
+        Raises:
+            ValueError: if there is no calibration file
+        """
+        path = path or self._calibration_file
+        if not path:
+            raise ValueError('No calibration file. '
+                             'Pass calibration_file or path. Received: {}'.format(path))
+        values = {}
+        for channel, gain_A in (('A', 128), ('A', 64), ('B', 0)):
+            offset = self.get_current_offset(channel, gain_A)
+            ratio = self.get_current_scale_ratio(channel, gain_A)
+            if offset != 0 or ratio != 1:
+                values[calibration.channel_key(channel, gain_A)] = {
+                    'offset': offset, 'scale_ratio': ratio}
+        calibration.save(path, values, temperature)
+
+    def tare_if_drifted(self, max_drift, readings=5, temperature=None,
+                        max_temp_delta=None, tare_readings=30):
+        """
+        tare_if_drifted checks the saved offset of the current channel
+        with a few readings of the empty scale and only does the full tare
+        (and saves it) if the offset drifted more than max_drift.
+
+        Args:
+            max_drift(float): largest acceptable drift in weight units
+            readings(int): Optional, readings for the check. By default 5
+            temperature(float): Optional, temperature now
+            max_temp_delta(float): Optional, also tare if the temperature
+                changed more than this since the saved tare
+            tare_readings(int): Optional, readings for the full tare. By default 30
+
+        Returns: (bool || None) True if a full tare was done, False if the
+            saved offset is kept, None if reading or taring failed
+        """
+        channels = (calibration.load(self._calibration_file)
+                    if self._calibration_file else None)
+        key = calibration.channel_key(self._current_channel, self._gain_channel_A)
+        entry = (channels or {}).get(key)
+        if entry:
+            zero_reading = self.get_raw_data_mean(readings)
+            if zero_reading is False:
+                return None
+            tare, drift = calibration.needs_tare(entry, zero_reading, max_drift,
+                                                 temperature, max_temp_delta)
+            if self._debug_mode:
+                print('Drift of the saved offset: {}'.format(drift))
+            if not tare:
+                return False
+        if self.zero(tare_readings):
+            return None
+        if self._calibration_file:
+            self.save_calibration(temperature=temperature)
+        return True
+
     def get_current_channel(self):
         """
         get current channel returns the value of current channel.
@@ -635,15 +1016,15 @@ class HX711:
         """
         power down method turns off the hx711.
         """
-        GPIO.output(self._pd_sck, False)
-        GPIO.output(self._pd_sck, True)
+        self._gpio.output(self._pd_sck, False)
+        self._gpio.output(self._pd_sck, True)
         time.sleep(0.01)
 
     def power_up(self):
         """
         power up function turns on the hx711.
         """
-        GPIO.output(self._pd_sck, False)
+        self._gpio.output(self._pd_sck, False)
         time.sleep(0.01)
 
     def reset(self):
@@ -0,0 +1,128 @@
+"""
+asyncio adapter for HX711, so one event loop can wait on the scale,
+the thermal stream (thermal/thermal_async.py) and camera subprocesses
+at the same time.
+
+    scale = AsyncHX711(hx)
+    weight = await scale.weight(30, timeout=5)
+
+While the background sampler runs (HX711.start_sampling()) the buffered
+samples are used and nothing blocks. Otherwise the chip is read one
+sample per executor call, so cancelling the task or a timeout stops the
+reading after the current sample instead of after all of them.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncHX711:
+    """
+    AsyncHX711 wraps an HX711 with coroutines.
+    """
+
+    def __init__(self, hx, executor=None):
+        """
+        Args:
+            hx(HX711): the scale
+            executor(Executor): Optional, by default a single thread
+                executor owned by this instance. One thread is enough,
+                the chip is read under the HX711 lock anyway.
+        """
+        self.hx = hx
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='hx711-async')
+
+    def close(self):
+        """
+        close shuts down the executor if this instance created it.
+        """
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _read_raw(self, readings):
+        hx = self.hx
+        channel = hx._current_channel
+        gain = hx._gain_channel_A
+        if hx.is_sampling():
+            # buffered samples answer at once, an empty buffer is waited
+            # for in the executor
+            samples = hx.get_samples(readings, hx._max_age, timeout=0)
+            if samples:
+                return hx._raw_mean([data for _, data in samples], channel, gain)
+            return await self._call(hx.get_raw_data_mean, readings)
+        data_list = []
+        for _ in range(readings):
+            data_list.append(await self._call(hx._read_locked))
+        return hx._raw_mean(data_list, channel, gain)
+
+    async def raw(self, readings=30, timeout=None):
+        """
+        raw is the async get_raw_data_mean.
+
+        Args:
+            readings(int): Optional, number of readings for mean. By default 30
+            timeout(float): Optional, seconds. By default no timeout
+
+        Raises:
+            asyncio.TimeoutError: if the readings took longer than timeout
+
+        Returns: (bool || int) False if reading was not ok.
+        """
+        return await asyncio.wait_for(self._read_raw(readings), timeout)
+
+    async def data(self, readings=30, timeout=None):
+        """
+        data is the async get_data_mean.
+
+        Returns: (bool || int) False if reading was not ok.
+        """
+        result = await self.raw(readings, timeout)
+        if result is False:
+            return False
+        return result - self.hx.get_current_offset()
+
+    async def weight(self, readings=30, timeout=None):
+        """
+        weight is the async get_weight_mean.
+
+        Args:
+            readings(int): Optional, number of readings for mean. By default 30
+            timeout(float): Optional, seconds. By default no timeout
+
+        Raises:
+            asyncio.TimeoutError: if the readings took longer than timeout
+
+        Returns: (bool || float) False if reading was not ok.
+        """
+        result = await self.raw(readings, timeout)
+        if result is False:
+            return False
+        return float((result - self.hx.get_current_offset()) /
+                     self.hx.get_current_scale_ratio())
+
+    async def weight_estimate(self, tolerance, timeout=None, **kwargs):
+        """
+        weight_estimate is the async get_weight_estimate, run in the
+        executor. keyword arguments are passed on.
+
+        Raises:
+            asyncio.TimeoutError: if it took longer than timeout. The
+                estimate still finishes in the executor thread.
+
+        Returns: (bool || (float, float, int)) see HX711.get_weight_estimate
+        """
+        return await asyncio.wait_for(
+            self._call(lambda: self.hx.get_weight_estimate(tolerance, **kwargs)),
+            timeout)
@@ -0,0 +1,391 @@
+"""
+This file holds HX711Multi class
+"""
+
+import statistics as stat
+import time
+
+from gpio_backend import POWER_DOWN_S, get_backend
+from hx711 import HX711
+
+# extra clock pulses after the 24 data bits select channel and gain
+# for the next conversion
+GAIN_PULSES = {('A', 128): 1, ('B', 32): 2, ('A', 64): 3}
+
+
+def _to_signed(data_in):
+    """
+    _to_signed validates 24 bits from the HX711 and converts them from
+    2's complement.
+
+    Returns: (bool || int) False if the data is the min or max value
+        (saturated or no chip), else the signed value
+    """
+    if data_in == 0x7fffff or data_in == 0x800000:
+        return False
+    if data_in & 0x800000:
+        return -((data_in ^ 0xffffff) + 1)
+    return data_in
+
+
+class HX711Multi:
+    """
+    HX711Multi reads several HX711 chips which share one PD_SCK line.
+    Each clock pulse samples every DOUT pin, so all load cells are read
+    in one 25/26/27 pulse transaction instead of one per cell.
+
+    All chips use the same channel and gain (the pulses are shared).
+    Offsets, scale ratios and data filters are kept per cell.
+    """
+
+    outliers_filter = HX711.outliers_filter
+
+    def __init__(self,
+                 dout_pins,
+                 pd_sck_pin,
+                 gain_channel_A=128,
+                 select_channel='A',
+                 wait_for_edge=True,
+                 gpio=None):
+        """
+        Init a new instance of HX711Multi
+
+        Args:
+            dout_pins([int]): Raspberry Pi pin numbers of the Data pins, one per HX711.
+            pd_sck_pin(int): Raspberry Pi pin number of the shared Clock line.
+            gain_channel_A(int): Optional, by default value 128. Options (128 || 64)
+            select_channel(str): Optional, by default 'A'. Options ('A' || 'B')
+            wait_for_edge(bool): Optional, by default True. Block on the falling
+                edge of DOUT instead of polling while waiting for data
+            gpio(GPIOBackend): Optional, by default gpio_backend.get_backend()
+
+        Raises:
+            TypeError: if pd_sck_pin or dout_pins are not int type
+            ValueError: if dout_pins is empty
+        """
+        if not isinstance(pd_sck_pin, int):
+            raise TypeError('pd_sck_pin must be type int. '
+                            'Received pd_sck_pin: {}'.format(pd_sck_pin))
+        if not dout_pins:
+            raise ValueError('dout_pins must contain at least one pin. '
+                             'Received: {}'.format(dout_pins))
+        for pin in dout_pins:
+            if not isinstance(pin, int):
+                raise TypeError('dout_pins must be type int. '
+                                'Received dout_pin: {}'.format(pin))
+
+        self._pd_sck = pd_sck_pin
+        self._douts = list(dout_pins)
+        cells = len(self._douts)
+        self._channel = 'A'
+        self._gain_channel_A = 128
+        # per cell values for every channel and gain, like HX711 keeps them
+        self._offsets = {key: [0] * cells for key in GAIN_PULSES}
+        self._scale_ratios = {key: [1] * cells for key in GAIN_PULSES}
+        self._last_raw_data = {key: [0] * cells for key in GAIN_PULSES}
+        self._data_filters = [self.outliers_filter] * cells
+        self._debug_mode = False
+        self._wait_for_edge = wait_for_edge
+
+        self._gpio = gpio or get_backend()
+        self._gpio.setup(self._pd_sck, self._gpio.OUT)  # pin _pd_sck is output only
+        for pin in self._douts:
+            self._gpio.setup(pin, self._gpio.IN)  # pins _douts are input only
+        self.select_channel(select_channel)
+        self.set_gain_A(gain_channel_A)
+
+    def __len__(self):
+        return len(self._douts)
+
+    def _key(self):
+        if self._channel == 'B':
+            return ('B', 32)
+        return ('A', self._gain_channel_A)
+
+    def select_channel(self, channel):
+        """
+        select_channel selects the channel of all chips.
+
+        Args:
+            channel(str): the channel to select. Options ('A' || 'B')
+        Raises:
+            ValueError: if channel is not 'A' or 'B'
+        """
+        channel = channel.capitalize()
+        if channel not in ('A', 'B'):
+            raise ValueError('Parameter "channel" has to be "A" or "B". '
+                             'Received: {}'.format(channel))
+        self._channel = channel
+        # the next conversion uses the new setting, the one after is valid
+        self.read()
+        time.sleep(0.5)
+
+    def set_gain_A(self, gain):
+        """
+        set_gain_A sets gain for channel A of all chips.
+
+        Args:
+            gain(int): Gain for channel A (128 || 64)
+
+        Raises:
+            ValueError: if gain is different than 128 or 64
+        """
+        if gain not in (128, 64):
+            raise ValueError('gain has to be 128 or 64. '
+                             'Received: {}'.format(gain))
+        self._gain_channel_A = gain
+        self.read()
+        time.sleep(0.5)
+
+    def set_debug_mode(self, flag=False):
+        """
+        set_debug_mode turns debug output on or off.
+
+        Args:
+            flag(bool): True turns on the debug mode. False turns it off.
+        """
+        self._debug_mode = bool(flag)
+
+    def _cells(self, cell):
+        """Indices addressed by cell (None = all cells)."""
+        if cell is None:
+            return range(len(self._douts))
+        if not 0 <= cell < len(self._douts):
+            raise ValueError('Parameter "cell" has to be in range 0..{}. '
+                             'Received: {}'.format(len(self._douts) - 1, cell))
+        return [cell]
+
+    def set_offset(self, offset, cell=None):
+        """
+        set_offset sets the offset of a cell for the current channel and gain.
+
+        Args:
+            offset(int): offset
+            cell(int): Optional, cell index. By default all cells.
+
+        Raises:
+            TypeError: if offset is not int type
+        """
+        if not isinstance(offset, int):
+            raise TypeError('Parameter "offset" has to be integer. '
+                            'Received: {}'.format(offset))
+        for i in self._cells(cell):
+            self._offsets[self._key()][i] = offset
+
+    def set_scale_ratio(self, scale_ratio, cell=None):
+        """
+        set_scale_ratio sets the ratio for converting a cell's data to
+        weight units for the current channel and gain.
+
+        Args:
+            scale_ratio(float): number != 0.0
+            cell(int): Optional, cell index. By default all cells.
+        """
+        for i in self._cells(cell):
+            self._scale_ratios[self._key()][i] = scale_ratio
+
+    def set_data_filter(self, data_filter, cell=None):
+        """
+        set_data_filter sets the data filter of a cell.
+
+        Args:
+            data_filter(data_filter): takes a list of int and returns the filtered list
+            cell(int): Optional, cell index. By default all cells.
+
+        Raises:
+            TypeError: if filter is not a function.
+        """
+        if not callable(data_filter):
+            raise TypeError('Parameter "data_filter" must be a function. '
+                            'Received: {}'.format(data_filter))
+        for i in self._cells(cell):
+            self._data_filters[i] = data_filter
+
+    def get_current_offset(self, cell):
+        return self._offsets[self._key()][cell]
+
+    def get_current_scale_ratio(self, cell):
+        return self._scale_ratios[self._key()][cell]
+
+    def get_last_raw_data(self, cell):
+        return self._last_raw_data[self._key()][cell]
+
+    def _ready(self):
+        """
+        Returns: bool True if every chip has data ready (all DOUT low)
+        """
+        return all(self._gpio.input(pin) == 0 for pin in self._douts)
+
+    def _wait_ready(self, timeout=0.5):
+        """
+        _wait_ready waits until all chips are ready. Like HX711._wait_ready
+        it blocks on the falling edge of a DOUT that is still high if edge
+        detection works, otherwise it polls every 1 ms.
+
+        Returns: bool True if ready else False after timeout
+        """
+        if self._ready():
+            return True
+        deadline = time.perf_counter() + timeout
+        if self._wait_for_edge:
+            try:
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return self._ready()
+                    busy = [pin for pin in self._douts if self._gpio.input(pin) != 0]
+                    if not busy:
+                        return True
+                    # short slices, as in HX711._wait_ready
+                    timeout_ms = max(1, int(min(remaining, 0.05) * 1000))
+                    self._gpio.wait_for_edge(busy[0], self._gpio.FALLING,
+                                             timeout=timeout_ms)
+                    if self._ready():
+                        return True
+            except RuntimeError as error:
+                if self._debug_mode:
+                    print('wait_for_edge failed, polling DOUT instead: {}'.format(error))
+                self._wait_for_edge = False
+        while not self._ready():
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def read(self):
+        """
+        read clocks one transaction out of all chips.
+
+        Returns: list of (bool || int) per cell, False for an invalid reading
+        """
+        self._gpio.output(self._pd_sck, False)
+        if not self._wait_ready():
+            if self._debug_mode:
+                print('HX711Multi.read() not ready: {}'.format(
+                    [self._gpio.input(pin) for pin in self._douts]))
+            return [False] * len(self._douts)
+
+        # every chip shifts out its next bit on the same edge; None means a
+        # pulse took 60 us or more and the chips went into power down
+        data_in = self._gpio.clock_in(self._pd_sck, self._douts, 24)
+        if data_in is None:
+            if self._debug_mode:
+                print('Not enough fast while reading data')
+            return [False] * len(self._douts)
+
+        for _ in range(GAIN_PULSES[self._key()]):
+            start_counter = time.perf_counter()
+            self._gpio.output(self._pd_sck, True)
+            self._gpio.output(self._pd_sck, False)
+            if time.perf_counter() - start_counter >= POWER_DOWN_S:
+                # as in HX711._set_channel_gain: the chips may be powered
+                # down or on the wrong channel/gain for the next conversion
+                if self._debug_mode:
+                    print('Not enough fast while setting gain and channel')
+                return [False] * len(self._douts)
+
+        if self._debug_mode:
+            print('Binary values as received: {}'.format([bin(d) for d in data_in]))
+        return [_to_signed(d) for d in data_in]
+
+    def get_raw_data_mean(self, readings=30):
+        """
+        get_raw_data_mean returns the mean of readings for every cell.
+
+        Args:
+            readings(int): Number of transactions for mean.
+
+        Returns: list of (bool || int) per cell, False if a cell had no valid reading
+        """
+        key = self._key()
+        per_cell = list(zip(*[self.read() for _ in range(readings)]))
+        means = []
+        for i, data_list in enumerate(per_cell):
+            data_filter = self._data_filters[i]
+            if readings > 2 and data_filter:
+                data = data_filter(list(data_list))
+            else:
+                data = [num for num in data_list if num is not False]
+            if not data:
+                means.append(False)
+                continue
+            data_mean = stat.mean(data)
+            self._last_raw_data[key][i] = data_mean
+            means.append(int(data_mean))
+        return means
+
+    def get_data_mean(self, readings=30):
+        """
+        get_data_mean returns the mean of readings minus offset for every cell.
+
+        Returns: list of (bool || int) per cell
+        """
+        offsets = self._offsets[self._key()]
+        return [False if raw is False else raw - offset
+                for raw, offset in zip(self.get_raw_data_mean(readings), offsets)]
+
+    def get_weight_mean(self, readings=30):
+        """
+        get_weight_mean returns the mean of readings minus offset divided
+        by scale ratio for every cell.
+
+        Returns: list of (bool || float) per cell
+        """
+        key = self._key()
+        return [False if raw is False else float((raw - offset) / ratio)
+                for raw, offset, ratio in zip(self.get_raw_data_mean(readings),
+                                              self._offsets[key],
+                                              self._scale_ratios[key])]
+
+    def zero(self, readings=30, cell=None):
+        """
+        zero sets the current data as offset (tare) of the cells.
+
+        Args:
+            readings(int): Number of readings for mean. Allowed values 1..99
+            cell(int): Optional, cell index. By default all cells.
+
+        Raises:
+            ValueError: if readings are not in range 1..99
+
+        Returns: True if error occured for any of the cells.
+        """
+        if not 0 < readings < 100:
+            raise ValueError('Parameter "readings" '
+                             'can be in range 1 up to 99. '
+                             'Received: {}'.format(readings))
+        means = self.get_raw_data_mean(readings)
+        error = False
+        for i in self._cells(cell):
+            if means[i] is False:
+                if self._debug_mode:
+                    print('zero(): cell {} has no valid reading'.format(i))
+                error = True
+            else:
+                self._offsets[self._key()][i] = means[i]
+        return error
+
+    def power_down(self):
+        """
+        power down method turns off all chips.
+        """
+        self._gpio.output(self._pd_sck, False)
+        self._gpio.output(self._pd_sck, True)
+        time.sleep(0.01)
+
+    def power_up(self):
+        """
+        power up function turns on all chips.
+        """
+        self._gpio.output(self._pd_sck, False)
+        time.sleep(0.01)
+
+    def reset(self):
+        """
+        reset method resets the chips and prepares them for the next reading.
+
+        Returns: True if error encountered
+        """
+        self.power_down()
+        self.power_up()
+        return False in self.get_raw_data_mean(6)
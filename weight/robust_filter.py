@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Robust outlier filters for HX711 readings.
+
+HampelFilter works one sample at a time over a bounded window and can be
+given to HX711.start_sampling() or, as a list filter, to
+HX711.set_data_filter(). hampel_filter() is the plain list version for
+get_raw_data_mean().
+
+On the synthetic benchmark (known weight, 2 % spikes) both list filters
+are faster than HX711.outliers_filter and their means are closer to the
+true weight, because outliers_filter also drops good readings further
+than one deviation from the median. Neither is a default: compare on a
+recording of your own scale before switching:
+    python3 robust_filter.py [recording]   # one reading per line, last column used
+"""
+
+import bisect
+from collections import deque
+
+import numpy as np
+
+MAD_SCALE = 1.4826  # MAD to standard deviation for normally distributed noise
+
+
+def _valid(data_list):
+    """
+    Drop the values HX711 uses for failed readings (False, True and -1).
+    """
+    return [num for num in data_list
+            if not isinstance(num, bool) and num != -1]
+
+
+def _median(ordered):
+    """
+    Median of an already sorted list.
+    """
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def _row_median(ordered):
+    """
+    Median of each row of a row-wise sorted 2-D array.
+    """
+    mid = ordered.shape[1] // 2
+    if ordered.shape[1] % 2:
+        return ordered[:, mid]
+    return (ordered[:, mid - 1] + ordered[:, mid]) / 2
+
+
+def hampel_filter(data_list, n_sigmas=3.0, min_scale=1.0):
+    """
+    hampel_filter keeps readings within n_sigmas robust standard
+    deviations (MAD based) of the median. Drop-in for
+    HX711.set_data_filter().
+
+    Args:
+        data_list([int]): List of int. It can contain Bool False that is removed.
+        n_sigmas(float): Optional, by default 3.0
+        min_scale(float): Optional, lower bound of the deviation scale so
+            that a run of identical readings does not reject everything else
+
+    Returns: list of filtered data. Excluding outliers.
+    """
+    data = _valid(data_list)
+    if not data:
+        return []
+    # plain Python: for the 30 or so readings of a mean, numpy's
+    # per call overhead costs more than the two sorts
+    median = _median(sorted(data))
+    scale = max(MAD_SCALE * _median(sorted(abs(num - median) for num in data)),
+                min_scale)
+    limit = n_sigmas * scale
+    return [num for num in data if abs(num - median) <= limit]
+
+
+class HampelFilter:
+    """
+    Streaming Hampel filter over the last `window` samples.
+
+    The window is kept sorted as samples come and go (bisect), so the
+    median is a lookup. The MAD walks outwards from the median over half
+    of the window, so a sample costs O(window), a few us for the default
+    window of 15. Outliers still enter the window, so a real step in
+    weight is accepted once it fills half of the window.
+    """
+
+    def __init__(self, window=15, n_sigmas=3.0, min_scale=1.0, replace=False):
+        """
+        Args:
+            window(int): Optional, number of samples in the window. By default 15
+            n_sigmas(float): Optional, by default 3.0
+            min_scale(float): Optional, lower bound of the deviation scale
+            replace(bool): Optional, by default False. If True, outliers are
+                replaced by the window median instead of dropped.
+
+        Raises:
+            ValueError: if window is smaller than 3
+        """
+        if window < 3:
+            raise ValueError('Parameter "window" has to be >= 3. '
+                             'Received: {}'.format(window))
+        self.window = window
+        self.n_sigmas = n_sigmas
+        self.min_scale = min_scale
+        self.replace = replace
+        self._fifo = deque()
+        self._sorted = []
+        self._index_cache = {}
+
+    def reset(self):
+        """
+        reset empties the window.
+        """
+        self._fifo.clear()
+        self._sorted = []
+
+    def update(self, sample):
+        """
+        update filters one sample.
+
+        Args:
+            sample(int): raw reading
+
+        Returns: (int || float || None) the sample, the window median if it
+            was an outlier and replace is set, or None if it was dropped
+        """
+        result = sample
+        if len(self._sorted) >= 3:
+            median = _median(self._sorted)
+            mad = self._mad(median)
+            scale = max(MAD_SCALE * mad, self.min_scale)
+            if abs(sample - median) > self.n_sigmas * scale:
+                result = median if self.replace else None
+        self._push(sample)
+        return result
+
+    def _push(self, sample):
+        if len(self._fifo) == self.window:
+            oldest = self._fifo.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._fifo.append(sample)
+        bisect.insort(self._sorted, sample)
+
+    def _mad(self, median):
+        # median of |x - median| by merging the two sorted halves
+        # around the median, walking outwards from the middle:
+        # n // 2 + 1 steps, no sort
+        data = self._sorted
+        n = len(data)
+        lo = bisect.bisect_left(data, median) - 1
+        hi = lo + 1
+        target = n // 2
+        dev = prev = 0
+        for _ in range(target + 1):
+            prev = dev
+            if lo < 0 or (hi < n and data[hi] - median <= median - data[lo]):
+                dev = data[hi] - median
+                hi += 1
+            else:
+                dev = median - data[lo]
+                lo -= 1
+        return dev if n % 2 else (prev + dev) / 2
+
+    def __call__(self, data_list):
+        """
+        Filter a whole list, for HX711.set_data_filter(). Unlike update(),
+        the whole list is known, so every sample is judged against its
+        `window` nearest neighbours on both sides (shifted inwards at the
+        ends), never including itself: a single spike cannot widen its
+        own MAD. The streaming window is not touched.
+
+        Returns: list of filtered data. Excluding outliers.
+        """
+        data = np.asarray(_valid(data_list), dtype=float)
+        n = data.size
+        if n < 4:
+            return data.tolist()  # fewer than 3 neighbours
+        neighbours = np.sort(data[self._neighbour_index(n)], axis=1)
+        # sort + middle column: np.median's partitioning is slower on rows this short
+        median = _row_median(neighbours)
+        mad = _row_median(np.sort(np.abs(neighbours - median[:, None]), axis=1))
+        scale = np.maximum(MAD_SCALE * mad, self.min_scale)
+        outlier = np.abs(data - median) > self.n_sigmas * scale
+        if self.replace:
+            return np.where(outlier, median, data).tolist()
+        return data[~outlier].tolist()
+
+    def _neighbour_index(self, n):
+        """
+        Index array (n, width) of the neighbours of each of n samples.
+        Means are usually of the same length, so it is kept per n.
+        """
+        if n not in self._index_cache:
+            width = min(self.window, n - 1)
+            rows = np.arange(n)[:, None]
+            # window of width + 1 samples around each sample, then drop the sample
+            idx = np.clip(rows - width // 2, 0, n - width - 1) + np.arange(width + 1)
+            self._index_cache[n] = idx[idx != rows].reshape(n, width)
+        return self._index_cache[n]
+
+
+def _load_recording(path):
+    """One reading per line; with several columns (e.g. 'timestamp,value') the last one."""
+    values = []
+    with open(path) as recording:
+        for line in recording:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                values.append(int(float(line.replace(',', ' ').split()[-1])))
+    return values
+
+
+def _synthetic_recording(count=3000, seed=0):
+    """Readings with noise and 2 % spikes, and the true value of each reading."""
+    rng = np.random.default_rng(seed)
+    truth = np.full(count, 100000)
+    truth[count // 2:] += 25000  # something stepped on the scale
+    data = truth + rng.normal(0, 40, count)
+    spikes = rng.choice(count, count // 50, replace=False)
+    data[spikes] += rng.choice([-1, 1], spikes.size) * rng.uniform(2000, 60000, spikes.size)
+    return data.astype(int).tolist(), truth.tolist()
+
+
+def _benchmark(path=None, readings=30):
+    import time
+    import statistics as stat
+
+    from hx711 import HX711
+
+    if path:
+        # no ground truth in a recording: how far outliers pull each mean
+        # away from the median of its readings
+        data = _load_recording(path)
+        truth = None
+    else:
+        data, truth = _synthetic_recording()
+    starts = range(0, len(data) - readings + 1, readings)
+    chunks = [data[i:i + readings] for i in starts]
+    references = ([truth[i] for i in starts] if truth
+                  else [stat.median(chunk) for chunk in chunks])
+
+    filters = [('outliers_filter', lambda chunk: HX711.outliers_filter(None, chunk)),
+               ('hampel_filter', hampel_filter),
+               ('HampelFilter', HampelFilter())]
+    print('{} readings, {} means of {}, error against the {}'.format(
+        len(data), len(chunks), readings, 'true weight' if truth else 'chunk median'))
+    for name, data_filter in filters:
+        start = time.perf_counter()
+        kept = [data_filter(chunk) for chunk in chunks]
+        took = time.perf_counter() - start
+        means = [stat.mean(chunk or [0]) for chunk in kept]
+        error = stat.mean(abs(mean - ref) for mean, ref in zip(means, references))
+        print('{:>16}: {:8.1f} us/chunk, mean error {:.1f}'.format(
+            name, took / len(chunks) * 1e6, error))
+
+    stream = HampelFilter()
+    start = time.perf_counter()
+    for num in data:
+        stream.update(num)
+    took = time.perf_counter() - start
+    print('{:>16}: {:8.2f} us/sample (streaming)'.format('HampelFilter', took / len(data) * 1e6))
+
+
+if __name__ == '__main__':
+    import sys
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
-import time, sys, statistics, argparse
-import RPi.GPIO as GPIO
+import time, sys, os, statistics, argparse
+from gpio_backend import get_backend  # RPi.GPIO, gpiod or simulator (HX711_GPIO)
+import calibration
+
+GPIO = get_backend()
 
 # === Wiring (BCM) ===
 DOUT = 5   # HX711 DOUT -> Raspberry Pi GPIO 5
@@ -65,10 +68,12 @@ def read_raw_24():
         val -= 1 << 24
     return val
 
-def read_mean(n=6, trim=0):
+def read_mean(n=6, trim=0, raw_out=None):
     vals = []
     for _ in range(n):
         vals.append(read_raw_24())
+    if raw_out is not None:
+        raw_out.extend(vals)
     vals.sort()
     if trim > 0 and len(vals) > 2*trim:
         vals = vals[trim:-trim]
@@ -115,8 +120,18 @@ def main():
     ap.add_argument("--scale", type=float, default=1.0, help="Counts per unit (set after calibration).")
     ap.add_argument("--unit", default="g", help="Unit label.")
     ap.add_argument("--debug", action="store_true", help="Print diagnostics on abnormal reads.")
+    ap.add_argument("--telemetry", metavar="DIR", help="Also store raw samples and weights (telemetry.py).")
+    ap.add_argument("--calibration", metavar="FILE", help="Load/save zero and scale (calibration.py).")
+    ap.add_argument("--max_drift", type=float, default=2.0,
+                    help="Keep the saved zero if the empty scale is within this many units.")
     args = ap.parse_args()
 
+    store = None
+    if args.telemetry:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from telemetry import TelemetryStore
+        store = TelemetryStore(args.telemetry)
+
     gpio_setup()
     zero = 0.0
     scale = float(args.scale)
@@ -128,11 +143,25 @@ def main():
         probe = quick_gpio_probe()
         print(f"[Probe] ready={probe['ready_now']} highs={probe['highs']} lows={probe['lows']} transitions={probe['transitions']}")
 
-        # Tare
+        saved = calibration.load(args.calibration) if args.calibration else None
+        entry = (saved or {}).get("A128")
+        if entry and abs(scale - 1.0) < 1e-9 and "scale_ratio" in entry:
+            scale = float(entry["scale_ratio"])
+            print(f"Saved scale: {scale:.6f} counts/{args.unit}")
+
+        # Tare, skipped if the saved zero still fits (empty scale assumed)
         print("Taring... remove all weight.")
         time.sleep(0.5)
-        zero = read_mean(n=max(args.samples, 8), trim=min(args.trim, 2))
-        print(f"Zero offset: {zero:.2f} counts")
+        tare = True
+        if entry:
+            quick = read_mean(n=4)
+            tare, drift = calibration.needs_tare(dict(entry, scale_ratio=scale), quick, args.max_drift)
+            if not tare:
+                zero = float(entry["offset"])
+                print(f"Zero offset: {zero:.2f} counts (saved, drift {drift:.2f}{args.unit})")
+        if tare:
+            zero = read_mean(n=max(args.samples, 8), trim=min(args.trim, 2))
+            print(f"Zero offset: {zero:.2f} counts")
 
         # Optional one-shot calibration (if no scale supplied)
         if abs(scale - 1.0) < 1e-9:
@@ -149,13 +178,20 @@ def main():
             except KeyboardInterrupt:
                 print("\nCalibration skipped.")
 
+        if args.calibration:
+            values = {"offset": zero}
+            if abs(scale - 1.0) > 1e-9:
+                values["scale_ratio"] = scale
+            calibration.save(args.calibration, {"A128": values})
+
         print("\nReading... (Ctrl+C to stop)")
         consec_allones = 0
         consec_timeouts = 0
 
         while True:
             try:
-                avg = read_mean(n=args.samples, trim=args.trim)
+                raw = []
+                avg = read_mean(n=args.samples, trim=args.trim, raw_out=raw)
                 consec_timeouts = 0
                 # Detect special patterns
                 if avg == -1.0:
@@ -164,6 +200,10 @@ def main():
                     consec_allones = 0
 
                 units = (avg - zero) / (scale if scale != 0 else 1.0)
+                if store:
+                    now = time.time()
+                    store.append_rows("hx711", [{"ts": now, "cell": 0, "raw": v} for v in raw])
+                    store.append("weight", ts=now, cell=0, weight=units, readings=len(raw))
                 sys.stdout.write(f"\rWeight: {units:9.2f}{args.unit}   (raw:{avg:10.2f})")
                 sys.stdout.flush()
 
@@ -190,6 +230,8 @@ def main():
                 break
 
     finally:
+        if store:
+            store.close()
         gpio_cleanup()
 
 if __name__ == "__main__":
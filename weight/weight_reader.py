@@ -1,5 +1,7 @@
 import time
-import RPi.GPIO as GPIO  # import GPIO
+from gpio_backend import get_backend  # RPi.GPIO, gpiod or simulator (HX711_GPIO)
+
+GPIO = get_backend()
 
 '''
 from hx711 import HX711  # import the class HX711
@@ -0,0 +1,198 @@
+"""
+Weight-triggered pipeline runs: watch the scale and run run_pipeline.sh
+when a bird steps on it, instead of on fixed or manual runs.
+
+The HX711 is read by its background sampler; every `interval` seconds
+the mean of the newest buffered readings (outliers_filter, the HX711
+default) goes through StepTrigger:
+
+    idle      weight - baseline > threshold     -> settling
+    settling  stayed above threshold settle_s   -> TRIGGER, occupied
+              (during the cooldown it stays settling and triggers
+              once the cooldown is over, if the bird is still there)
+              dropped below threshold           -> idle (debounce)
+    occupied  below threshold * release for
+              release_s                         -> idle
+
+The baseline follows the empty scale slowly while idle, so zero drift
+does not trigger. After a run no new one starts for cooldown_s, and only
+once the previous bird has left (occupied -> idle).
+
+    python3 weight_trigger.py --calibration weight/hx711_calibration.json
+    HX711_GPIO=sim python3 weight_trigger.py --dry-run   # simulator
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR / "weight"))
+from gpio_backend import get_backend  # RPi.GPIO, gpiod or simulator (HX711_GPIO)
+from hx711 import HX711
+
+PIPELINE_SH = BASE_DIR / "run_pipeline.sh"
+LED_PIN = 27
+LED_WARMUP_S = 2.0  # LED on before the cameras start, as run_pipeline.py does
+DOUT_PIN = 5
+SCK_PIN = 6
+
+
+class StepTrigger:
+    """
+    Detects a weight step held for a settle time, with hysteresis and a
+    cooldown. Pure logic: feed it (ts, weight), it says when to trigger.
+    """
+
+    def __init__(self, threshold, settle_s=1.0, release=0.5, release_s=2.0,
+                 cooldown_s=30.0, baseline_alpha=0.02, baseline=0.0):
+        """
+        Args:
+            threshold(float): step above the baseline that counts as a bird
+            settle_s(float): Optional, seconds the step must hold
+            release(float): Optional, fraction of threshold below which the
+                scale counts as empty again
+            release_s(float): Optional, seconds it must stay empty
+            cooldown_s(float): Optional, seconds after a trigger (or after
+                the end of the run, see busy_until) without a new one
+            baseline_alpha(float): Optional, EMA weight of the empty scale
+                reading, per update while idle
+            baseline(float): Optional, empty scale weight to start from,
+                0 for a tared scale (not the first reading: a bird may
+                already be standing on it)
+        """
+        self.threshold = threshold
+        self.settle_s = settle_s
+        self.release = release
+        self.release_s = release_s
+        self.cooldown_s = cooldown_s
+        self.baseline_alpha = baseline_alpha
+        self.state = "idle"
+        self.baseline = baseline
+        self.since = None  # start of the settling/releasing period
+        self.cooldown_until = 0.0
+
+    def busy_until(self, ts):
+        """Start the cooldown at ts (e.g. when the pipeline run ended)."""
+        self.cooldown_until = max(self.cooldown_until, ts + self.cooldown_s)
+
+    def update(self, ts, weight):
+        """
+        Args:
+            ts(float): time of the reading
+            weight(float): weight in calibrated units
+
+        Returns: bool True if a run should start now
+        """
+        step = weight - self.baseline
+
+        if self.state == "idle":
+            if step > self.threshold:
+                self.state, self.since = "settling", ts
+            else:
+                self.baseline += self.baseline_alpha * step
+        elif self.state == "settling":
+            if step <= self.threshold:
+                self.state = "idle"  # a bump, not a bird
+            elif ts - self.since >= self.settle_s and ts >= self.cooldown_until:
+                # a bird that settled during the cooldown stays pending
+                # here and is photographed once the cooldown is over
+                self.state, self.since = "occupied", None
+                self.busy_until(ts)
+                return True
+        elif self.state == "occupied":
+            if step < self.threshold * self.release:
+                if self.since is None:
+                    self.since = ts
+                elif ts - self.since >= self.release_s:
+                    self.state, self.since = "idle", None
+            else:
+                self.since = None
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline when a bird steps on the scale.")
+    parser.add_argument("--threshold", type=float, default=200.0, help="weight step that triggers (scale units)")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds the step must hold")
+    parser.add_argument("--release", type=float, default=2.0, help="seconds empty before the next bird counts")
+    parser.add_argument("--cooldown", type=float, default=30.0, help="seconds after a run without a new one")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between checks")
+    parser.add_argument("--readings", type=int, default=5, help="buffered readings per check")
+    parser.add_argument("--calibration", metavar="FILE", help="HX711 calibration file (weight/calibration.py)")
+    parser.add_argument("--scale", type=float, help="scale ratio if there is no calibration file")
+    parser.add_argument("--max_drift", type=float, default=20.0, help="re-tare if the saved zero drifted more")
+    parser.add_argument("--dry-run", action="store_true", help="log triggers, do not run the pipeline")
+    args = parser.parse_args()
+
+    gpio = get_backend()
+    gpio.setmode(gpio.BCM)
+    gpio.setup(LED_PIN, gpio.OUT)
+    saved = bool(args.calibration) and os.path.exists(args.calibration)
+    hx = HX711(DOUT_PIN, SCK_PIN, gpio=gpio, calibration_file=args.calibration)  # loads it
+    if saved:
+        print(f"[INFO] calibration loaded from {args.calibration}")
+    elif args.scale:
+        hx.set_scale_ratio(args.scale)
+    if args.calibration:
+        # keeps the saved zero unless it drifted; a new tare is saved, so the
+        # next start does not have to tare with a bird on the scale
+        tared = hx.tare_if_drifted(args.max_drift)
+        if tared:
+            print(f"[INFO] tared, saved to {args.calibration}")
+    else:
+        tared = None if hx.zero(30) else True
+    if tared is None:
+        print("[ERROR] tare failed, check the HX711 wiring")
+        sys.exit(1)
+    hx.start_sampling(max_age=5 * args.interval)
+
+    trigger = StepTrigger(args.threshold, settle_s=args.settle,
+                          release_s=args.release, cooldown_s=args.cooldown)
+    running = {"stop": False}
+    signal.signal(signal.SIGTERM, lambda *_: running.update(stop=True))
+    proc = None
+    print(f"[INFO] watching the scale, threshold {args.threshold}")
+    try:
+        while not running["stop"]:
+            time.sleep(args.interval)
+            now = time.time()
+            if proc is not None:
+                # while the pipeline runs the cooldown keeps moving, so a
+                # bird that lands meanwhile stays settling and triggers
+                # once the run (and its cooldown) is over
+                trigger.busy_until(now)
+                if proc.poll() is not None:
+                    print(f"[INFO] pipeline finished (exit {proc.returncode})")
+                    gpio.output(LED_PIN, 0)
+                    proc = None
+            weight = hx.get_weight_mean(args.readings)
+            if weight is False:
+                continue
+            if trigger.update(now, weight):
+                print(f"[INFO] bird on the scale: {weight:.1f} "
+                      f"(baseline {trigger.baseline:.1f})")
+                if args.dry_run:
+                    print("[INFO] dry run: not starting run_pipeline.sh")
+                else:
+                    gpio.output(LED_PIN, 1)
+                    time.sleep(LED_WARMUP_S)
+                    proc = subprocess.Popen(
+                        ["bash", str(PIPELINE_SH)],
+                        env=dict(os.environ, TRIGGER_WEIGHT=f"{weight:.1f}"))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[INFO] stopping")
+        if proc is not None:
+            proc.wait()
+        hx.stop_sampling()
+        gpio.output(LED_PIN, 0)
+        gpio.cleanup()
+
+
+if __name__ == "__main__":
+    main()